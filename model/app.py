@@ -1,80 +1,200 @@
 import os
 import os
+import time
+import logging
 import threading
 import json
-from flask import Flask, request, render_template, jsonify
+from flask import Flask, Response, request, render_template, jsonify, stream_with_context
 import pandas as pd
 import io
-from recommender import Recommender
-from leetcode_client import LeetCodeClient
+from model_registry import ModelRegistry
+from profile_cache import ProfileCache
+from leetcode_client import CoalescingLeetCodeClient
 from llm_client import LLMClient
+from history_store import HistoryStore
+from rf_models import ForestCache
+from cursor_store import CursorStore
+from serialization import frame_records, problem_records
+from filter_index import parse_filters
+from upload_parser import MAX_UPLOAD_BYTES, USER_COLUMNS, UploadTooLarge, read_csv_stream
+from metrics import REGISTRY, finish_profile, server_timing, stage, start_profile
+from serving import StagePool, serve
 from dotenv import load_dotenv
 
 
 BASE_DIR = os.path.dirname(__file__)
 TEMPLATE_DIR = os.path.join(BASE_DIR, 'templates')
 app = Flask(__name__, template_folder=TEMPLATE_DIR)
+# Whole request bodies are bounded too (upload cap plus room for the other form fields), so an
+# oversized multipart upload is refused before it is spooled
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES + (1 << 20)
 
 # Load .env file (if present) so environment variables like OPENAI_API_KEY are available
 env_path = os.path.join(BASE_DIR, '.env')
 load_dotenv(env_path)
 
-# Use the cleaned CSV located in the model folder
-system_csv = os.path.join(BASE_DIR, 'cleaned_leetcode_dataset.csv')
-recommender = Recommender(system_csv=system_csv)
-leetcode = LeetCodeClient()
-llm = LLMClient()
-HISTORY_PATH = os.path.join(BASE_DIR, 'user_history.json')
-recommender_ready = False
+# Use the cleaned CSV located in the model folder (SYSTEM_CSV points elsewhere, e.g. for benchmarks)
+system_csv = os.environ.get('SYSTEM_CSV', os.path.join(BASE_DIR, 'cleaned_leetcode_dataset.csv'))
+# Fitted TF-IDF state is shared between workers through memory-mapped files in this directory
+artifact_dir = os.environ.get('MODEL_ARTIFACT_DIR', os.path.join(BASE_DIR, 'artifacts'))
+# `rf_models` trains in spawned processes, which re-import this script as `__mp_main__` before
+# running a job; the service state below (model fit, SQLite stores, clients, pools) is only
+# built in the serving process
+IS_SERVICE = __name__ != '__mp_main__'
+if IS_SERVICE:
+    registry = ModelRegistry(system_csv=system_csv, artifact_dir=artifact_dir)
+    profiles = ProfileCache()
+    # Per-user RandomForests are trained in a process pool; TF-IDF results are served until ready
+    forests = ForestCache()
+    # Recommendation history lives in SQLite (WAL); the old JSON file is imported once on first start
+    HISTORY_DB = os.environ.get('HISTORY_DB', os.path.join(BASE_DIR, 'user_history.db'))
+    # Ranked candidate lists behind /recommend/more cursors, shared by the workers through the history DB
+    cursors = CursorStore(path=HISTORY_DB)
+    # Problem metadata is synced into this local catalog instead of paged through per request
+    # Concurrent /analyze + /recommend calls for one username share a single upstream fetch
+    leetcode = CoalescingLeetCodeClient(
+        catalog_path=os.environ.get('LEETCODE_CATALOG', os.path.join(BASE_DIR, 'leetcode_catalog.json')))
+    llm = LLMClient()
+    HISTORY_PATH = os.path.join(BASE_DIR, 'user_history.json')
+    history = HistoryStore(HISTORY_DB, legacy_json=HISTORY_PATH)
+    # Independent request stages run concurrently: upstream/SQLite on the IO pool, scoring on the CPU pool
+    pool = StagePool()
 
 
-def load_user_history():
+def get_user_history(username: str):
+    if not username:
+        return set()
     try:
-        if os.path.exists(HISTORY_PATH):
-            with open(HISTORY_PATH, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        with stage('history_read'):
+            return history.get(username)
     except Exception:
-        pass
-    return {}
+        return set()
 
 
-def save_user_history(hist):
+def update_user_history(username: str, titles):
+    if not username:
+        return
     try:
-        with open(HISTORY_PATH, 'w', encoding='utf-8') as f:
-            json.dump(hist, f, indent=2)
+        with stage('history_write'):
+            history.add(username, titles)
     except Exception:
         pass
 
 
-def get_user_history(username: str):
-    if not username:
-        return set()
-    hist = load_user_history()
-    items = hist.get(username, [])
-    return set([t.lower().strip() for t in items])
+def _request_filters(params):
+    """(filter spec or None, None), or (None, error response) for malformed filter values.
 
+    Filters are `company`, `difficulty`, `faang`, `min_acceptance` and `max_acceptance`
+    (see `filter_index.parse_filters`), from the form or the JSON body.
+    """
+    try:
+        return parse_filters(params), None
+    except ValueError as e:
+        return None, (jsonify({"error": str(e)}), 400)
 
-def update_user_history(username: str, titles):
-    if not username:
-        return
-    hist = load_user_history()
-    cur = set(hist.get(username, []))
-    cur.update([t for t in titles if t])
-    hist[username] = list(cur)
-    save_user_history(hist)
+
+def _drop_history(recommender, recs: pd.DataFrame, history_titles) -> pd.DataFrame:
+    """Drop result rows whose normalized title was already recommended to this user."""
+    if not history_titles or recs.empty:
+        return recs
+    keep = [t not in history_titles for t in recommender.title_norm[recs.index.to_numpy()]]
+    return recs[keep]
 
 
 def _fit_background():
-    global recommender_ready
     try:
-        recommender.fit()
-        recommender_ready = True
+        model = registry.get()
+        # the neighbour graph only serves mode=similar and its build is quadratic in the catalog,
+        # so by default it is built (or loaded from the artifact dir) on first use;
+        # MODEL_WARM_NEIGHBORS=1 builds it at startup instead
+        if os.environ.get('MODEL_WARM_NEIGHBORS', '0') == '1':
+            model.neighbor_graph()
     except Exception:
-        recommender_ready = False
+        pass
 
 
 # Start building vectorizer in background to improve responsiveness on first request
-threading.Thread(target=_fit_background, daemon=True).start()
+if IS_SERVICE:
+    threading.Thread(target=_fit_background, daemon=True).start()
+
+
+# Requests sending `X-Profile: 1` get a `Server-Timing` header with their stage breakdown
+PROFILE_HEADER = os.environ.get('PROFILE_HEADER', 'X-Profile')
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', '1') != '0'
+REQUEST_SECONDS = REGISTRY.histogram(
+    'ultron_request_seconds', 'Request latency by endpoint.', ('endpoint', 'method', 'status'))
+
+
+@app.before_request
+def _start_request():
+    request.started_at = time.perf_counter()
+    start_profile(PROFILING_ENABLED and request.headers.get(PROFILE_HEADER) == '1')
+
+
+@app.after_request
+def _finish_request(response):
+    elapsed = time.perf_counter() - getattr(request, 'started_at', time.perf_counter())
+    if request.endpoint != 'metrics':
+        REQUEST_SECONDS.observe(elapsed, endpoint=request.endpoint or 'unknown',
+                                method=request.method, status=response.status_code)
+    stages = finish_profile()
+    if stages is not None:
+        response.headers['Server-Timing'] = server_timing(stages + [('total', elapsed)])
+    return response
+
+
+@app.errorhandler(413)
+def _too_large(e):
+    return jsonify({"error": f"Request body is larger than {app.config['MAX_CONTENT_LENGTH']} bytes"}), 413
+
+
+def _service_metrics():
+    """Point-in-time values for /metrics: model snapshot, cache and upstream client state."""
+    status = registry.status()
+    yield ('ultron_model_info', 'Active model snapshot.', 'gauge',
+           {'version': str(status['version']), 'feature_version': str(status['feature_version'])},
+           1 if status['ready'] else 0)
+    for key, help in (('fit_seconds', 'Duration of the fit or ingest that built the active snapshot.'),
+                      ('fitted_at', 'Unix time the active snapshot was built.'),
+                      ('rows', 'Catalog rows in the active snapshot.'),
+                      ('appended_rows', 'Rows ingested into the active snapshot without a refit.'),
+                      ('vocab_drift', 'Share of ingested terms missing from the fitted vocabulary.')):
+        yield (f'ultron_model_{key}', help, 'gauge', {}, status[key])
+    yield ('ultron_model_fits_total', 'Full model fits.', 'counter', {}, status['fit_count'])
+    yield ('ultron_model_ingests_total', 'Incremental model updates.', 'counter', {}, status['ingest_count'])
+
+    caches = {
+        'profile': profiles.stats(),
+        'forest': forests.stats()['models'],
+        'cursor': cursors.stats(),
+        'leetcode_result': leetcode.stats()['result_cache'],
+        'llm_reply': llm.stats()['cache'],
+    }
+    for name, stats in caches.items():
+        labels = {'cache': name}
+        yield ('ultron_cache_hit_ratio', 'Cache hits / lookups since start.', 'gauge', labels, stats['hit_ratio'])
+        yield ('ultron_cache_hits_total', 'Cache hits.', 'counter', labels, stats['hits'])
+        yield ('ultron_cache_misses_total', 'Cache misses.', 'counter', labels, stats['misses'])
+        yield ('ultron_cache_size', 'Entries currently cached.', 'gauge', labels, stats['size'])
+
+    lc = leetcode.stats()
+    yield ('ultron_leetcode_coalesced_total', 'User fetches that joined an in-flight fetch.', 'counter', {},
+           lc['single_flight']['coalesced'])
+    yield ('ultron_leetcode_retries_total', 'LeetCode HTTP retries.', 'counter', {}, lc['http']['retries'])
+    llm_stats = llm.stats()
+    for key in ('completions', 'timeouts', 'rejected', 'errors'):
+        yield (f'ultron_llm_{key}_total', f'LLM calls that ended as {key}.', 'counter', {}, llm_stats[key])
+    forest_stats = forests.stats()
+    yield ('ultron_forest_trainings_pending', 'Per-user forests being trained.', 'gauge', {}, forest_stats['pending'])
+    pool_stats = pool.stats()
+    for kind in ('io', 'cpu'):
+        yield ('ultron_stage_pool_inflight', 'Request stages queued or running on each pool.', 'gauge',
+               {'pool': kind}, pool_stats['inflight'][kind])
+        yield ('ultron_stage_pool_submitted_total', 'Request stages submitted to each pool.', 'counter',
+               {'pool': kind}, pool_stats['submitted'][kind])
+
+
+REGISTRY.add_collector(_service_metrics)
 
 
 @app.route('/')
@@ -82,44 +202,117 @@ def index():
     return render_template('index.html')
 
 
-def read_uploaded_csv(file_storage):
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/model/status', methods=['GET'])
+def model_status():
+    status = registry.status()
+    status['profile_cache'] = profiles.stats()
+    status['leetcode'] = leetcode.stats()
+    status['forests'] = forests.stats()
+    status['cursors'] = cursors.stats()
+    status['llm'] = llm.stats()
+    status['stage_pool'] = pool.stats()
+    return jsonify(status)
+
+
+def read_uploaded_csv(stream, columns=USER_COLUMNS):
+    """Parse an uploaded CSV byte stream in chunks, keeping only `columns`.
+
+    Returns (df, None), or (None, (message, status)) with 413 past the upload caps.
+    """
     try:
-        stream = io.StringIO(file_storage.stream.read().decode("utf-8"))
-        df = pd.read_csv(stream)
-        return df, None
+        with stage('upload_parse'):
+            return read_csv_stream(stream, columns), None
+    except UploadTooLarge as e:
+        return None, (str(e), 413)
     except Exception as e:
-        return None, str(e)
+        return None, (str(e), 400)
 
 
-@app.route('/analyze', methods=['POST'])
-def analyze():
-    # First try LeetCode username
-    username = request.form.get('leetcode_username')
-    if username:
-        try:
-            user_df = leetcode.get_user_solved_problems(username)
-        except Exception as e:
-            return jsonify({"error": f"LeetCode API error: {e}"}), 400
+def _uploaded_csv(missing: str, columns=USER_COLUMNS):
+    """The CSV of this request: a multipart `file` field or a raw `text/csv` body.
+
+    Returns (df, None), or (None, error response); `missing` is the message when neither is sent.
+    """
+    if request.mimetype in ('text/csv', 'application/csv'):
+        stream = request.stream
+    elif 'file' in request.files:
+        stream = request.files['file'].stream
     else:
-        # Fall back to CSV upload
-        if 'file' not in request.files:
-            return jsonify({"error": "No file uploaded and no LeetCode username provided"}), 400
-        file = request.files['file']
-        user_df, err = read_uploaded_csv(file)
-        if err:
-            return jsonify({"error": err}), 400
+        return None, (jsonify({"error": missing}), 400)
+    df, err = read_uploaded_csv(stream, columns)
+    if err:
+        message, status = err
+        return None, (jsonify({"error": message}), status)
+    return df, None
+
 
-    # Ensure recommender is ready (try background-loaded flag first)
-    global recommender_ready
-    if not recommender_ready:
+def _user_and_model(username, load_user):
+    """(user context, recommender, None), or (None, None, error response).
+
+    With a username the LeetCode fetch runs on the IO pool while this thread gets the model
+    snapshot (which blocks only until the background fit has finished). Without one,
+    `load_user()` returns (df, None) or (None, error response), as `_uploaded_csv` does.
+    The user's rows are resolved against the snapshot once, as a `UserContext` that every
+    stage of the request reads.
+    """
+    fetch = pool.io(leetcode.get_user_solved_problems, username) if username else None
+    if fetch is None:
+        user_df, err = load_user()
+        if err:
+            return None, None, err
+    recommender, model_error = None, None
+    try:
+        recommender = registry.get()
+    except Exception as e:
+        model_error = e
+    if fetch is not None:
         try:
-            # fallback blocking fit if background thread hasn't finished
-            recommender.fit()
-            recommender_ready = True
+            user_df = fetch.result()
         except Exception as e:
-            return jsonify({"error": f"System data load error: {e}. Try again shortly."}), 500
+            return None, None, (jsonify({"error": f"LeetCode API error: {e}"}), 400)
+    if model_error is not None:
+        return None, None, (jsonify({"error": f"System data load error: {model_error}. Try again shortly."}), 500)
+    return recommender.user_context(user_df), recommender, None
+
+
+# "Others" samples are repeatable for the same user and catalog
+OTHERS_SEED = 42
+
+
+def _score(recommender, username: str, user, top_n: int, filters=None, mode=None, history_titles=()):
+    """Recommendations for one user (a `UserContext`): neighbour graph for mode=similar, else the
+    user's forest when it is trained, else TF-IDF similarity. Runs on the CPU pool."""
+    recs = None
+    if mode == 'similar':
+        recs = recommender.recommend_similar(user, top_n=top_n, exclude_titles=history_titles, filters=filters)
+    if recs is None or recs.empty:
+        # try RF first (only if this user's model is already trained)
+        clf = forests.get(username, recommender, user)
+        rf_recs = recommender.recommend_with_rf(user, top_n=top_n, model=clf, filters=filters) if clf is not None else None
+        if rf_recs is None or rf_recs.empty:
+            recs = recommender.recommend(user, top_n=top_n, profile=profiles.get(username, user, recommender),
+                                         filters=filters)
+        else:
+            recs = rf_recs
+    return recs
+
+
+@app.route('/analyze', methods=['POST'])
+def analyze():
+    # First try LeetCode username
+    username = request.form.get('leetcode_username')
+    # Fall back to CSV upload without a username
+    user, recommender, err = _user_and_model(
+        username, lambda: _uploaded_csv("No file uploaded and no LeetCode username provided"))
+    if err:
+        return err
 
-    weak = recommender.analyze_weak_topics(user_df, top_k=8)
+    weak = pool.cpu(recommender.analyze_weak_topics, user, top_k=8).result()
     rows = []
     for topic, score in weak:
         rows.append({
@@ -135,79 +328,31 @@ def analyze():
 def recommend():
     # First try LeetCode username
     username = request.form.get('leetcode_username')
-    if username:
-        try:
-            user_df = leetcode.get_user_solved_problems(username)
-        except Exception as e:
-            return jsonify({"error": f"LeetCode API error: {e}"}), 400
-    else:
-        # Fall back to CSV upload
-        if 'file' not in request.files:
-            return jsonify({"error": "No file uploaded and no LeetCode username provided"}), 400
-        file = request.files['file']
-        user_df, err = read_uploaded_csv(file)
-        if err:
-            return jsonify({"error": err}), 400
+    # respect user history (previously recommended); read while the user is fetched
+    history_read = pool.io(get_user_history, username) if username else None
+    user, recommender, err = _user_and_model(
+        username, lambda: _uploaded_csv("No file uploaded and no LeetCode username provided"))
+    if err:
+        return err
 
-    try:
-        recommender.fit()
-    except Exception as e:
-        return jsonify({"error": f"System data load error: {e}"}), 500
+    filters, err = _request_filters(request.form)
+    if err:
+        return err
+    history_titles = history_read.result() if history_read else set()
 
-    # respect user history (previously recommended)
-    history_titles = get_user_history(username) if username else set()
+    # mode=similar: "more like these solved problems" from the neighbour graph
+    recs = pool.cpu(_score, recommender, username, user, 12, filters=filters,
+                    mode=request.form.get('mode'), history_titles=history_titles).result()
 
-    # try RF first
-    rf_recs = recommender.recommend_with_rf(user_df, top_n=12)
-    if rf_recs is None or rf_recs.empty:
-        recs = recommender.recommend(user_df, top_n=12)
-    else:
-        recs = rf_recs
-
-    # Build recommended list
-    recommended = []
-    rec_titles = set()
-    for _, row in recs.iterrows():
-        topics = str(row.get('topic_tags', '')).split(',') if pd.notna(row.get('topic_tags', None)) else ['']
-        primary_topic = topics[0].strip() if topics and topics[0] else ''
-        title_norm = str(row.get('title', '')).lower().strip()
-        # Skip if already recommended previously for this user
-        if title_norm in history_titles:
-            continue
-        rec_titles.add(title_norm)
-        recommended.append({
-            'title': row.get('title', ''),
-            'difficulty': row.get('difficulty', ''),
-            'topic_tags': row.get('topic_tags', ''),
-            'company': row.get('company', ''),
-            'score': float(row.get('score', 0)),
-            'gfg_link': recommender.gfg_link_for_topic(primary_topic) if primary_topic else '',
-            'striver_link': recommender.striver_search_link(primary_topic) if primary_topic else ''
-        })
+    # Build recommended list, skipping titles already recommended previously for this user
+    recs = _drop_history(recommender, recs, history_titles)
+    rec_titles = set(recommender.title_norm[recs.index.to_numpy()])
+    recommended = frame_records(recommender, recs)
+
+    # Non-recommended problems: random catalog rows outside the user's solved and recommended titles
+    others = problem_records(recommender, recommender.sample_others(
+        user, 20, exclude_titles=rec_titles, filters=filters, seed=OTHERS_SEED))
 
-    # Build non-recommended list (sample from system excluding user's solved and recommended)
-    system = recommender.system_df.copy().reset_index(drop=True)
-    user_titles = set(user_df.get('title', pd.Series([], dtype=object)).astype(str).str.lower().str.strip())
-    exclude_titles = user_titles.union(rec_titles)
-    candidates = system[~system.get('title', '').astype(str).str.lower().str.strip().isin(exclude_titles)].copy()
-    # choose up to 20 non-recommended problems
-    others = []
-    if not candidates.empty:
-        try:
-            sample = candidates.sample(n=min(20, len(candidates)), random_state=42)
-        except Exception:
-            sample = candidates.head(20)
-        for _, row in sample.iterrows():
-            topics = str(row.get('topic_tags', '')).split(',') if pd.notna(row.get('topic_tags', None)) else ['']
-            primary_topic = topics[0].strip() if topics and topics[0] else ''
-            others.append({
-                'title': row.get('title', ''),
-                'difficulty': row.get('difficulty', ''),
-                'topic_tags': row.get('topic_tags', ''),
-                'company': row.get('company', ''),
-                'gfg_link': recommender.gfg_link_for_topic(primary_topic) if primary_topic else '',
-                'striver_link': recommender.striver_search_link(primary_topic) if primary_topic else ''
-            })
     # Persist recommended titles to user history
     if username and rec_titles:
         update_user_history(username, list(rec_titles))
@@ -215,208 +360,273 @@ def recommend():
     return jsonify({"recommended": recommended, "others": others})
 
 
+MAX_CURSOR_ITEMS = int(os.environ.get('MAX_CURSOR_ITEMS', 1000))
+
+
 @app.route('/recommend/more', methods=['POST'])
 def recommend_more():
     """Return additional recommendations excluding already-seen titles.
 
-    Accepts JSON body: { leetcode_username: str, seen: [titles], page_size: int }
+    Accepts JSON body: { leetcode_username: str, seen: [titles], page_size: int, cursor: str }
     Falls back to form/multipart like /recommend when JSON is not provided.
+
+    The first call (no `cursor`) ranks the user's candidates once and stores them server-side;
+    the response carries a `cursor` token, and passing it back returns the next page as a plain
+    slice without refetching the profile or rescoring. Cursors are kept in the history DB, so
+    any worker can serve the next page. Expired cursors, and cursors ranked with a model
+    version the serving worker no longer has, get HTTP 410.
     """
     data = request.get_json(silent=True) or {}
+    page_size = max(1, int(data.get('page_size', 12)))
+
+    token = data.get('cursor')
+    if token:
+        cursor = cursors.get(token, registry.current())
+        if cursor is None:
+            return jsonify({"error": "Cursor expired; request again without a cursor", "expired": True}), 410
+        row_ids, scores = cursor.next_page(page_size)
+        page = problem_records(cursor.recommender, row_ids, scores)
+        if cursor.username and page:
+            update_user_history(cursor.username, [f['title'] for f in page])
+        if not cursor.has_more:
+            cursors.discard(token)
+        return jsonify({"recommended": page, "cursor": token if cursor.has_more else None, "has_more": cursor.has_more})
+
     username = data.get('leetcode_username') or request.form.get('leetcode_username')
     seen = set([s.lower().strip() for s in (data.get('seen') or []) if s])
-    page_size = int(data.get('page_size', 12))
-
-    # load user_df same as /recommend
-    if username:
-        try:
-            user_df = leetcode.get_user_solved_problems(username)
-        except Exception as e:
-            return jsonify({"error": f"LeetCode API error: {e}"}), 400
-    else:
-        if 'file' not in request.files:
-            return jsonify({"error": "No file uploaded and no LeetCode username provided"}), 400
-        file = request.files['file']
-        user_df, err = read_uploaded_csv(file)
-        if err:
-            return jsonify({"error": err}), 400
+    filters, err = _request_filters(data or request.form)
+    if err:
+        return err
 
-    # Ensure recommender is ready (non-blocking if possible)
-    global recommender_ready
-    if not recommender_ready:
-        try:
-            recommender.fit()
-            recommender_ready = True
-        except Exception as e:
-            return jsonify({"error": f"System data load error: {e}. Try again shortly."}), 500
-
-    # Get a larger pool and then filter
-    pool = recommender.recommend(user_df, top_n=200)
-    if pool is None or pool.empty:
-        return jsonify({"recommended": []})
-
-    history_titles = get_user_history(username) if username else set()
-    user_titles = set(user_df.get('title', pd.Series([], dtype=object)).astype(str).str.lower().str.strip())
-
-    filtered = []
-    for _, row in pool.iterrows():
-        title_norm = str(row.get('title', '')).lower().strip()
-        if not title_norm or title_norm in seen or title_norm in history_titles or title_norm in user_titles:
-            continue
-        topics = str(row.get('topic_tags', '')).split(',') if pd.notna(row.get('topic_tags', None)) else ['']
-        primary_topic = topics[0].strip() if topics and topics[0] else ''
-        filtered.append({
-            'title': row.get('title', ''),
-            'difficulty': row.get('difficulty', ''),
-            'topic_tags': row.get('topic_tags', ''),
-            'company': row.get('company', ''),
-            'score': float(row.get('score', 0)) if 'score' in row else 0.0,
-            'gfg_link': recommender.gfg_link_for_topic(primary_topic) if primary_topic else '',
-            'striver_link': recommender.striver_search_link(primary_topic) if primary_topic else ''
-        })
-        if len(filtered) >= page_size:
-            break
+    # load the user same as /recommend
+    history_read = pool.io(get_user_history, username) if username else None
+    user, recommender, err = _user_and_model(
+        username, lambda: _uploaded_csv("No file uploaded and no LeetCode username provided"))
+    if err:
+        return err
+
+    # Rank every remaining candidate once; later pages are slices of this list
+    history_titles = history_read.result() if history_read else set()
+    row_ids, scores = pool.cpu(lambda: recommender.rank(
+        user, MAX_CURSOR_ITEMS,
+        profile=profiles.get(username, user, recommender),
+        exclude_titles=seen | history_titles | {''},
+        filters=filters,
+    )).result()
+    if len(row_ids) == 0:
+        return jsonify({"recommended": [], "cursor": None, "has_more": False})
+
+    token = cursors.create(recommender, row_ids, scores, username=username or '')
+    cursor = cursors.get(token)
+    row_ids, scores = cursor.next_page(page_size)
+    filtered = problem_records(recommender, row_ids, scores)
 
     # persist these to history
     if username and filtered:
         update_user_history(username, [f['title'] for f in filtered])
 
-    return jsonify({"recommended": filtered})
+    return jsonify({"recommended": filtered, "cursor": token if cursor.has_more else None, "has_more": cursor.has_more})
 
 
-@app.route('/append', methods=['POST'])
-def append():
-    if 'file' not in request.files:
-        return jsonify({"error": "No file uploaded"}), 400
-    file = request.files['file']
-    user_df, err = read_uploaded_csv(file)
+def _positive_int(value):
+    """`value` (a JSON integer or a string of digits) as an int >= 1, or None."""
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        return None
+    return value
+
+
+MAX_BATCH_USERS = int(os.environ.get('MAX_BATCH_USERS', 5000))
+
+
+@app.route('/recommend/batch', methods=['POST'])
+def recommend_batch():
+    """Recommend for many users in one call (cohort jobs).
+
+    Accepts JSON body: { users: [{ id, solved: [titles] } or { id, problems: [{title, topic_tags, ...}] }],
+    top_n: int }. Returns { results: [{ id, recommended: [...] }] } in request order.
+    """
+    data = request.get_json(silent=True) or {}
+    users = data.get('users') or []
+    if not isinstance(users, list) or not users:
+        return jsonify({"error": "Provide a non-empty 'users' list"}), 400
+    if len(users) > MAX_BATCH_USERS:
+        return jsonify({"error": f"At most {MAX_BATCH_USERS} users per batch"}), 400
+    top_n = _positive_int(data.get('top_n', 12))
+    if top_n is None:
+        return jsonify({"error": f"'top_n' must be a positive integer, got {data.get('top_n')!r}"}), 400
+    filters, err = _request_filters(data)
     if err:
-        return jsonify({"error": err}), 400
+        return err
+
+    try:
+        recommender = registry.get()
+    except Exception as e:
+        return jsonify({"error": f"System data load error: {e}"}), 500
+
+    user_dfs = []
+    for u in users:
+        u = u if isinstance(u, dict) else {}
+        if u.get('problems'):
+            user_dfs.append(pd.DataFrame(u['problems']))
+        else:
+            user_dfs.append(pd.DataFrame({'title': [t for t in (u.get('solved') or []) if t]}))
+
+    results = []
+    batch = pool.cpu(recommender.recommend_many, user_dfs, top_n=top_n, filters=filters).result()
+    for u, recs in zip(users, batch):
+        results.append({'id': u.get('id') if isinstance(u, dict) else None, 'recommended': frame_records(recommender, recs)})
 
+    return jsonify({"results": results})
+
+
+@app.route('/append', methods=['POST'])
+def append():
     try:
-        count = recommender.append_new_problems(user_df)
+        # keep the columns the catalog has; everything else in the upload is never parsed
+        header = pd.read_csv(registry.system_csv, nrows=0).columns.tolist()
+        user_df, err = _uploaded_csv("No file uploaded", columns=header)
+        if err:
+            return err
+
+        count = registry.get().append_new_problems(user_df)
+        if count:
+            # ingest the appended rows into the live snapshot now rather than on the next check
+            registry.sync()
         return jsonify({"appended": int(count)})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+CHAT_HELP = "I can recommend problems — try asking 'Recommend problems' or 'Give me problems to practice'"
+
+
+def _wants_recommendations(message: str) -> bool:
+    lower = message.lower()
+    return 'recommend' in lower or 'problems' in lower or 'practice' in lower
+
+
+def _chat_context(data: dict):
+    """Recommendations, others and weak topics for a chat request (shared by /chat and /chat/stream).
+
+    Returns (context, None), or (None, error response).
+    """
+    username = data.get('leetcode_username')
+    filters, err = _request_filters(data)
+    if err:
+        return None, err
+
+    def load_upload():
+        file_content = data.get('file_content')
+        if not file_content:
+            return pd.DataFrame(), None
+        user_df, err = read_uploaded_csv(io.BytesIO(file_content.encode("utf-8")))
+        if err and err[1] == 413:
+            return None, (jsonify({"error": err[0]}), 413)
+        return (pd.DataFrame() if err else user_df), None
+
+    history_read = pool.io(get_user_history, username) if username else None
+    user, recommender, err = _user_and_model(username, load_upload)
+    if err:
+        return None, err
+    history_titles = history_read.result() if history_read else set()
+
+    # Scoring and the weak-topic summary are independent of each other
+    scoring = pool.cpu(_score, recommender, username, user, 8, filters=filters)
+    weak_topics = pool.cpu(recommender.analyze_weak_topics, user, top_k=3)
+    try:
+        recs = scoring.result()
+    except Exception as e:
+        return None, (jsonify({"error": str(e)}), 500)
+
+    # Build recommended list for chat response, skipping history
+    recs = _drop_history(recommender, recs, history_titles)
+    rec_titles = set(recommender.title_norm[recs.index.to_numpy()])
+    recommended = frame_records(recommender, recs)
+
+    # Build others (non-recommended) similar to /recommend, also skipping history
+    others = problem_records(recommender, recommender.sample_others(
+        user, 12, exclude_titles=rec_titles | history_titles, filters=filters, seed=OTHERS_SEED))
+
+    # Persist history for this user
+    if username and rec_titles:
+        update_user_history(username, list(rec_titles))
+
+    # Also include a small conversational summary: weak topics and top 3 rec titles
+    return {"recommended": recommended, "others": others, "weak": weak_topics.result()}, None
+
+
+def _template_reply(weak, recommended) -> str:
+    """Reply used when the LLM is disabled, busy or over its latency budget."""
+    weak_text = ', '.join([t for t, _ in weak]) if weak else ''
+    top_titles = [r['title'] for r in recommended[:3]]
+    reply = ''
+    if weak_text:
+        reply += f"Based on your profile I suggest focusing on: {weak_text}. "
+    if top_titles:
+        reply += f"Here are a few problems to start with: {', '.join(top_titles)}."
+    if not reply:
+        reply = f"Here are {len(recommended)} recommended problems."
+    return reply
+
+
 @app.route('/chat', methods=['POST'])
 def chat():
     data = request.json or {}
     message = data.get('message', '')
-    username = data.get('leetcode_username')
-    
-    user_df = pd.DataFrame()
-    if username:
-        try:
-            user_df = leetcode.get_user_solved_problems(username)
-        except Exception as e:
-            return jsonify({"error": f"LeetCode API error: {e}"}), 400
-    else:
-        file_content = data.get('file_content')
-        if file_content:
-            try:
-                stream = io.StringIO(file_content)
-                user_df = pd.read_csv(stream)
-            except Exception:
-                user_df = pd.DataFrame()
+    if not _wants_recommendations(message):
+        return jsonify({"reply": CHAT_HELP})
 
-    lower = message.lower()
-    if 'recommend' in lower or 'problems' in lower or 'practice' in lower:
-        # Ensure recommender ready
-        global recommender_ready
-        if not recommender_ready:
-            try:
-                recommender.fit()
-                recommender_ready = True
-            except Exception as e:
-                return jsonify({"error": f"System data load error: {e}. Try again shortly."}), 500
+    ctx, err = _chat_context(data)
+    if err:
+        return err
 
-        try:
-            history_titles = get_user_history(username) if username else set()
-            rf_recs = recommender.recommend_with_rf(user_df, top_n=8)
-            if rf_recs is None or rf_recs.empty:
-                recs = recommender.recommend(user_df, top_n=8)
-            else:
-                recs = rf_recs
-        except Exception as e:
-            return jsonify({"error": str(e)}), 500
-
-        # Build recommended list for chat response, skipping history
-        recommended = []
-        rec_titles = set()
-        for _, row in recs.iterrows():
-            topics = str(row.get('topic_tags', '')).split(',') if pd.notna(row.get('topic_tags', None)) else ['']
-            primary_topic = topics[0].strip() if topics and topics[0] else ''
-            title_norm = str(row.get('title', '')).lower().strip()
-            if title_norm in history_titles:
-                continue
-            rec_titles.add(title_norm)
-            recommended.append({
-                'title': row.get('title', ''),
-                'difficulty': row.get('difficulty', ''),
-                'topic_tags': row.get('topic_tags', ''),
-                'company': row.get('company', ''),
-                'score': float(row.get('score', 0)),
-                'gfg_link': recommender.gfg_link_for_topic(primary_topic) if primary_topic else '',
-                'striver_link': recommender.striver_search_link(primary_topic) if primary_topic else ''
-            })
-
-        # Build others (non-recommended) similar to /recommend
-        system = recommender.system_df.copy().reset_index(drop=True)
-        user_titles = set(user_df.get('title', pd.Series([], dtype=object)).astype(str).str.lower().str.strip())
-        exclude_titles = user_titles.union(rec_titles).union(history_titles)
-        candidates = system[~system.get('title', '').astype(str).str.lower().str.strip().isin(exclude_titles)].copy()
-        others = []
-        if not candidates.empty:
-            try:
-                sample = candidates.sample(n=min(12, len(candidates)), random_state=42)
-            except Exception:
-                sample = candidates.head(12)
-            for _, row in sample.iterrows():
-                topics = str(row.get('topic_tags', '')).split(',') if pd.notna(row.get('topic_tags', None)) else ['']
-                primary_topic = topics[0].strip() if topics and topics[0] else ''
-                others.append({
-                    'title': row.get('title', ''),
-                    'difficulty': row.get('difficulty', ''),
-                    'topic_tags': row.get('topic_tags', ''),
-                    'company': row.get('company', ''),
-                    'gfg_link': recommender.gfg_link_for_topic(primary_topic) if primary_topic else '',
-                    'striver_link': recommender.striver_search_link(primary_topic) if primary_topic else ''
-                })
-
-        # Persist history for this user
-        if username and rec_titles:
-            update_user_history(username, list(rec_titles))
-
-        # Also include a small conversational summary: weak topics and top 3 rec titles
-        weak = recommender.analyze_weak_topics(user_df, top_k=3)
-        # If an LLM is enabled, use it to craft a more natural reply
+    # If an LLM is enabled, use it to craft a more natural reply (bounded by LLM_TIMEOUT)
+    reply_text = None
+    try:
+        reply_text = llm.generate_reply(user_message=message, context_text=None,
+                                        recommendations=ctx['recommended'], weak_topics=ctx['weak'])
+    except Exception:
         reply_text = None
-        try:
-            if llm.is_enabled():
-                reply_text = llm.generate_reply(user_message=message, context_text=None, recommendations=recommended, weak_topics=weak)
-        except Exception:
-            reply_text = None
-
-        if not reply_text:
-            weak_text = ', '.join([t for t, _ in weak]) if weak else ''
-            top_titles = [r['title'] for r in recommended[:3]]
-            reply = ''
-            if weak_text:
-                reply += f"Based on your profile I suggest focusing on: {weak_text}. "
-            if top_titles:
-                reply += f"Here are a few problems to start with: {', '.join(top_titles)}."
-            if not reply:
-                reply = f"Here are {len(recommended)} recommended problems."
-        else:
-            reply = reply_text
+    reply = reply_text or _template_reply(ctx['weak'], ctx['recommended'])
+    return jsonify({"reply": reply, "recommended": ctx['recommended'], "others": ctx['others']})
 
-        return jsonify({"reply": reply, "recommended": recommended, "others": others})
 
-    else:
-        return jsonify({"reply": "I can recommend problems — try asking 'Recommend problems' or 'Give me problems to practice'"})
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Streamed variant of /chat for progressive rendering.
+
+    Responds with newline-delimited JSON: a `context` line carrying `recommended`/`others`,
+    `token` lines with reply text as the LLM produces it, then a `done` line with the full reply
+    (the template reply when no LLM text arrived). Errors are plain JSON, as in /chat.
+    """
+    data = request.get_json(silent=True) or {}
+    message = data.get('message', '')
+    if not _wants_recommendations(message):
+        return jsonify({"reply": CHAT_HELP})
+
+    ctx, err = _chat_context(data)
+    if err:
+        return err
+
+    def generate():
+        yield json.dumps({"type": "context", "recommended": ctx['recommended'], "others": ctx['others']}) + "\n"
+        parts = []
+        for piece in llm.stream_reply(message, recommendations=ctx['recommended'], weak_topics=ctx['weak']):
+            parts.append(piece)
+            yield json.dumps({"type": "token", "text": piece}) + "\n"
+        reply = ''.join(parts) or _template_reply(ctx['weak'], ctx['recommended'])
+        yield json.dumps({"type": "done", "reply": reply}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8501, debug=True)
+    # SERVE_MODE=production: fixed worker pool, no debugger or reloader (see serving.py)
+    port = int(os.environ.get('PORT', 8501))
+    if os.environ.get('SERVE_MODE', 'dev') == 'production':
+        logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'), format='%(asctime)s %(name)s %(levelname)s %(message)s')
+        serve(app, host='0.0.0.0', port=port)
+    else:
+        app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,76 @@
+"""Crash-safe on-disk artifacts shared between worker processes.
+
+An artifact is a directory of raw `.npy` arrays plus one JSON metadata file that records its
+format version. Paths are named after the content the artifact derives from (dataset hash,
+dimension, ...), so two workers writing the same path produce equivalent artifacts:
+
+- `write_artifact` builds the directory under a temporary name and renames it into place, so
+  readers never see a partial artifact; if another worker published it first, ours is dropped.
+- `read_meta` returns None for a missing artifact or one in another format version, which
+  callers treat as "rebuild it".
+- `load_arrays` memory-maps the arrays read-only, so every worker maps the same page-cache
+  pages instead of holding its own copy.
+- `prune_artifacts` removes superseded artifacts of one kind.
+"""
+import os
+import json
+import shutil
+import tempfile
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+
+def write_artifact(path: str, arrays: Dict[str, np.ndarray], meta: dict, format_version: int,
+                   meta_file: str = "meta.json") -> str:
+    """Write `arrays` (one `<name>.npy` each) and `meta` (plus `format`) to `path` atomically.
+
+    Returns `path`; an artifact already there is kept as is.
+    """
+    if os.path.isdir(path):
+        return path
+    root = os.path.dirname(path)
+    os.makedirs(root, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".tmp-", dir=root)
+    try:
+        for name, arr in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), arr)
+        with open(os.path.join(tmp, meta_file), "w", encoding="utf-8") as f:
+            json.dump({"format": format_version, **meta}, f)
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            # lost the race to another worker; its artifact is equivalent
+            shutil.rmtree(tmp, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return path
+
+
+def read_meta(path: str, format_version: int, meta_file: str = "meta.json") -> Optional[dict]:
+    """The metadata of the artifact at `path`, or None if it is missing or another format version."""
+    full = os.path.join(path, meta_file)
+    if not os.path.exists(full):
+        return None
+    with open(full, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    return meta if meta.get("format") == format_version else None
+
+
+def load_arrays(path: str, names: Iterable[str]) -> Dict[str, np.ndarray]:
+    """The arrays `names` of the artifact at `path`, memory-mapped read-only."""
+    return {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in names}
+
+
+def prune_artifacts(root: str, keep: Optional[str], prefix: str) -> None:
+    """Remove artifacts named `prefix...` under `root` other than `keep`.
+
+    Mapped files stay readable until the workers still using them drop them.
+    """
+    if not os.path.isdir(root):
+        return
+    for name in os.listdir(root):
+        full = os.path.join(root, name)
+        if name.startswith(prefix) and full != keep:
+            shutil.rmtree(full, ignore_errors=True)
@@ -0,0 +1,951 @@
+"""Micro-benchmarks for the recommender hot paths.
+
+Run from the model folder, e.g.:
+
+    python benchmark.py topk --sizes 2000 10000 100000 500000
+
+Each benchmark builds synthetic LeetCode-shaped catalogs so it can scale past the bundled CSV,
+times the current code path against the implementation it replaced, and prints one row per
+size (add `--json` for machine-readable output).
+
+`suite` times the main entry points (and the Flask routes against local LeetCode/LLM fakes)
+for regression tracking; save a run per commit and diff two of them:
+
+    python benchmark.py --out base.json suite --catalogs 2000 100000 1000000
+    python benchmark.py --out head.json suite --catalogs 2000 100000 1000000
+    python benchmark.py compare base.json head.json   # exits 1 on a >10% slowdown
+"""
+import io
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics.pairwise import linear_kernel
+
+from dataset_store import ColumnarDataset, build_dataset
+from recommender import Recommender
+from serialization import frame_records
+from synthetic import leetcode_problems, synthetic_catalog, synthetic_user, write_catalog
+from upload_parser import read_csv_stream
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    """Best wall-clock time of `repeat` calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def legacy_recommend(rec: Recommender, user_df: pd.DataFrame, top_n: int = 10) -> pd.DataFrame:
+    """The pre-argpartition ranking path: full copy, full argsort and a per-row Python loop."""
+    system = rec.system_df.copy().reset_index(drop=True)
+    user_vec = rec.user_profile(user_df)
+    cosine_similarities = linear_kernel(user_vec, rec.tfidf_matrix).flatten()
+    top_idx = cosine_similarities.argsort()[::-1]
+    user_titles = set(user_df.get("title", pd.Series([], dtype=object)).astype(str).str.lower())
+    recommendations = []
+    for idx in top_idx:
+        title = str(system.at[idx, "title"]).lower()
+        if title in user_titles:
+            continue
+        recommendations.append((idx, cosine_similarities[idx]))
+        if len(recommendations) >= top_n:
+            break
+    recs = system.iloc[[i for i, _ in recommendations]].copy()
+    recs["score"] = [s for _, s in recommendations]
+    return recs
+
+
+def legacy_analyze_weak_topics(rec: Recommender, user_df: pd.DataFrame, top_k: int = 5) -> list:
+    """The pre-incidence-matrix weak-topic scoring: one pandas `apply` per catalog topic."""
+    from collections import Counter
+
+    def split_topics(x):
+        return [t.strip().lower() for t in str(x).split(",") if t.strip()]
+
+    system = rec.system_df.copy()
+    system["_topics_list"] = system["topic_tags"].apply(split_topics)
+    global_counter = Counter()
+    for lst in system["_topics_list"]:
+        global_counter.update(lst)
+    user_df = user_df.fillna("")
+    user_df["_topics_list"] = user_df.get("topic_tags", "").apply(split_topics)
+    solved_col = next((c for c in ["status", "solved", "is_solved", "result"] if c in user_df.columns), None)
+    topic_scores = {}
+    for topic in global_counter:
+        rows_with_topic = user_df[user_df["_topics_list"].apply(lambda L, t=topic: t in L)]
+        if rows_with_topic.empty:
+            topic_scores[topic] = 0.0
+        elif solved_col:
+            solved_vals = rows_with_topic[solved_col].astype(str).str.lower()
+            success_count = solved_vals.apply(lambda x: x in ["1", "true", "t", "yes", "solved"]).sum()
+            topic_scores[topic] = success_count / len(rows_with_topic)
+        else:
+            topic_scores[topic] = 0.4 + min(0.5, len(rows_with_topic) / 50)
+    return sorted(topic_scores.items(), key=lambda x: x[1])[:top_k]
+
+
+def legacy_records(rec: Recommender, recs: pd.DataFrame) -> list:
+    """Per-row `iterrows()` serialization the routes used before `serialization.frame_records`."""
+    records = []
+    for _, row in recs.iterrows():
+        topics = str(row.get('topic_tags', '')).split(',') if pd.notna(row.get('topic_tags', None)) else ['']
+        primary_topic = topics[0].strip() if topics and topics[0] else ''
+        records.append({
+            'title': row.get('title', ''),
+            'difficulty': row.get('difficulty', ''),
+            'topic_tags': row.get('topic_tags', ''),
+            'company': row.get('company', ''),
+            'score': float(row.get('score', 0)),
+            'gfg_link': rec.gfg_link_for_topic(primary_topic) if primary_topic else '',
+            'striver_link': rec.striver_search_link(primary_topic) if primary_topic else ''
+        })
+    return records
+
+
+def bench_topk(args) -> list:
+    results = []
+    for size in args.sizes:
+        rec = Recommender.from_dataframe(synthetic_catalog(size))
+        user = synthetic_user(rec.system_df, args.solved)
+        profile = rec.user_profile(user)
+        legacy = best_of(lambda: legacy_recommend(rec, user, args.top_n), args.repeat)
+        current = best_of(lambda: rec.recommend(user, args.top_n, profile=profile), args.repeat)
+        # both paths score identically; only the ranking/filtering differs
+        same = set(legacy_recommend(rec, user, args.top_n)["score"].round(12)) == \
+            set(rec.recommend(user, args.top_n, profile=profile)["score"].round(12))
+        results.append({
+            "benchmark": "topk", "size": size, "solved": args.solved, "top_n": args.top_n,
+            "legacy_ms": legacy * 1000, "current_ms": current * 1000,
+            "speedup": legacy / current if current else None, "same_scores": bool(same),
+        })
+    return results
+
+
+def bench_weak_topics(args) -> list:
+    results = []
+    rec = Recommender.from_dataframe(synthetic_catalog(args.catalog))
+    for solved in args.solved:
+        user = synthetic_user(rec.system_df, solved)
+        # mark a slice as attempted-but-unsolved so the solved ratio path is exercised
+        user.loc[user.index % 4 == 0, "status"] = "attempted"
+        legacy = best_of(lambda: legacy_analyze_weak_topics(rec, user, args.top_k), args.repeat)
+        current = best_of(lambda: rec.analyze_weak_topics(user, args.top_k), args.repeat)
+        expected = [(t, round(float(s), 12)) for t, s in legacy_analyze_weak_topics(rec, user, args.top_k)]
+        got = [(t, round(s, 12)) for t, s in rec.analyze_weak_topics(user, args.top_k)]
+        results.append({
+            "benchmark": "weak_topics", "catalog": args.catalog, "solved": solved,
+            "topics": len(rec.topic_names), "legacy_ms": legacy * 1000, "current_ms": current * 1000,
+            "speedup": legacy / current if current else None, "same_output": expected == got,
+        })
+    return results
+
+
+def bench_fetch(args) -> list:
+    from fake_leetcode import FakeLeetCode, make_problems
+    from leetcode_client import LeetCodeClient
+
+    results = []
+    for size in args.sizes:
+        with FakeLeetCode(make_problems(size), latency=args.latency) as fake:
+            row = {"benchmark": "fetch", "problems": size, "latency_ms": args.latency * 1000}
+            # one request per second, one at a time: the old `sleep(1)` pagination loop
+            for label, concurrency, rate in (("legacy", 1, 1.0), ("current", args.concurrency, args.rate)):
+                client = LeetCodeClient(base_url=fake.url, page_size=args.page_size, concurrency=concurrency, rate=rate)
+                started = time.perf_counter()
+                client.sync_catalog(force=True)
+                elapsed = time.perf_counter() - started
+                assert len(client.catalog.problems) == size
+                row[f"{label}_s"] = elapsed
+                row[f"{label}_req_per_s"] = client.http.requests / elapsed
+            row["speedup"] = row["legacy_s"] / row["current_s"]
+            results.append(row)
+    return results
+
+
+def bench_batch(args) -> list:
+    results = []
+    rec = Recommender.from_dataframe(synthetic_catalog(args.catalog))
+    rng = np.random.default_rng(7)
+    users = [synthetic_user(rec.system_df, int(n), seed=i) for i, n in enumerate(rng.integers(10, args.max_solved, size=args.users))]
+    started = time.perf_counter()
+    loop = [rec.recommend(u, args.top_n) for u in users]
+    loop_s = time.perf_counter() - started
+    started = time.perf_counter()
+    batch = rec.recommend_many(users, args.top_n)
+    batch_s = time.perf_counter() - started
+    # compare scores rather than row ids: ties at the k-th place may pick different rows
+    same = all(np.allclose(a["score"].to_numpy(), b["score"].to_numpy()) for a, b in zip(loop, batch))
+    results.append({
+        "benchmark": "batch", "catalog": args.catalog, "users": args.users,
+        "loop_s": loop_s, "batch_s": batch_s,
+        "loop_users_per_s": args.users / loop_s, "batch_users_per_s": args.users / batch_s,
+        "speedup": loop_s / batch_s, "same_results": same,
+    })
+    return results
+
+
+def bench_serialize(args) -> list:
+    results = []
+    rec = Recommender.from_dataframe(synthetic_catalog(args.catalog))
+    user = synthetic_user(rec.system_df, args.solved)
+    for n in args.rows:
+        recs = rec.recommend(user, n)
+        legacy_s = best_of(lambda: json.dumps(legacy_records(rec, recs)), args.repeat)
+        columnar_s = best_of(lambda: json.dumps(frame_records(rec, recs)), args.repeat)
+        results.append({
+            "benchmark": "serialize", "catalog": args.catalog, "rows": n,
+            "legacy_ms": legacy_s * 1e3, "columnar_ms": columnar_s * 1e3,
+            "speedup": legacy_s / columnar_s, "same_results": legacy_records(rec, recs) == frame_records(rec, recs),
+        })
+    return results
+
+
+def replicated_dataset(path: str, n: int) -> None:
+    """Write the bundled CSV repeated to `n` rows (titles made unique) to `path`."""
+    base = pd.read_csv(os.path.join(os.path.dirname(os.path.abspath(__file__)), "cleaned_leetcode_dataset.csv"))
+    reps = -(-n // len(base))
+    df = pd.concat([base] * reps, ignore_index=True).head(n)
+    df["title"] = df["title"] + [f" #{i // len(base)}" if i >= len(base) else "" for i in range(len(df))]
+    df["id"] = np.arange(1, len(df) + 1)
+    df.to_csv(path, index=False)
+
+
+def _peak_rss_kb() -> int:
+    # VmHWM starts fresh in a spawned process, unlike ru_maxrss which survives fork/exec
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    return 0
+
+
+def _load_rss(kind: str, path: str, columns, out) -> None:
+    before = _peak_rss_kb()
+    if kind == "csv":
+        wanted = None if columns is None else set(columns)
+        df = pd.read_csv(path, usecols=None if wanted is None else (lambda c: c in wanted))
+    else:
+        df = ColumnarDataset(path).read(columns)
+    after = _peak_rss_kb()
+    out.put(((after - before) / 1024, df.memory_usage(deep=True).sum() / 2**20))
+
+
+def measure_load(kind: str, path: str, columns, repeat: int) -> dict:
+    """Best wall time of one load, plus the resident-set growth it causes in a fresh process
+    (peak RSS after minus before, so parser buffers count too) and the frame's deep size."""
+    if kind == "csv":
+        wanted = None if columns is None else set(columns)
+        seconds = best_of(lambda: pd.read_csv(path, usecols=None if wanted is None else (lambda c: c in wanted)), repeat)
+    else:
+        seconds = best_of(lambda: ColumnarDataset(path).read(columns), repeat)
+    ctx = multiprocessing.get_context("spawn")
+    out = ctx.Queue()
+    proc = ctx.Process(target=_load_rss, args=(kind, path, columns, out))
+    proc.start()
+    rss_mb, frame_mb = out.get()
+    proc.join()
+    return {"s": seconds, "rss_mb": rss_mb, "frame_mb": frame_mb}
+
+
+def bench_load(args) -> list:
+    results = []
+    columns = list(Recommender.DATA_COLUMNS)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            csv = os.path.join(tmp, f"catalog-{n}.csv")
+            replicated_dataset(csv, n)
+            started = time.perf_counter()
+            dataset = ColumnarDataset(build_dataset(csv, os.path.join(tmp, f"dataset-{n}")))
+            build_s = time.perf_counter() - started
+            runs = {
+                "csv_all": ("csv", csv, None),
+                "csv_cols": ("csv", csv, columns),
+                "columnar_all": ("columnar", dataset.path, None),
+                "columnar_cols": ("columnar", dataset.path, columns),
+            }
+            for name, (kind, path, cols) in runs.items():
+                m = measure_load(kind, path, cols, args.repeat)
+                results.append({"benchmark": "load", "rows": n, "path": name, "load_ms": m["s"] * 1e3,
+                                "rss_mb": m["rss_mb"], "frame_mb": m["frame_mb"], "build_s": build_s})
+    return results
+
+
+def bench_similar(args) -> list:
+    results = []
+    for n in args.sizes:
+        rec = Recommender.from_dataframe(synthetic_catalog(n))
+        started = time.perf_counter()
+        rec.neighbor_graph(k=args.k)
+        build_s = time.perf_counter() - started
+        user = synthetic_user(rec.system_df, args.solved)
+        scan_s = best_of(lambda: rec.recommend(user, args.top_n), args.repeat)
+        graph_s = best_of(lambda: rec.recommend_similar(user, args.top_n), args.repeat)
+        results.append({
+            "benchmark": "similar", "catalog": n, "solved": args.solved, "build_s": build_s,
+            "edges": int(rec.neighbor_graph().nnz), "scan_ms": scan_s * 1e3, "graph_ms": graph_s * 1e3,
+            "speedup": scan_s / graph_s,
+        })
+    return results
+
+
+FILTER_SPECS = {
+    "google_medium": {"companies": ["Google"], "difficulty": ["Medium"]},
+    "hard_low_acceptance": {"difficulty": ["Hard"], "max_acceptance": 30.0},
+    "faang": {"faang": True},
+}
+
+
+def legacy_filtered(rec: Recommender, user_df: pd.DataFrame, spec: dict, top_n: int) -> pd.DataFrame:
+    """Post-filtering: rank the whole catalog, then filter the result frame with string ops."""
+    recs = rec.recommend(user_df, len(rec.system_df))
+    keep = pd.Series(True, index=recs.index)
+    if spec.get("companies"):
+        companies = recs["companies"].fillna("").str.lower().str.split(",")
+        wanted = {c.lower() for c in spec["companies"]}
+        keep &= companies.map(lambda cs: bool(wanted.intersection(cs)))
+    if spec.get("difficulty"):
+        keep &= recs["difficulty"].str.lower().isin([d.lower() for d in spec["difficulty"]])
+    if spec.get("faang") is not None:
+        keep &= recs["asked_by_faang"].astype(bool) == spec["faang"]
+    if spec.get("max_acceptance") is not None:
+        keep &= recs["acceptance_rate"] <= spec["max_acceptance"]
+    return recs[keep].head(top_n)
+
+
+def bench_filters(args) -> list:
+    results = []
+    for n in args.sizes:
+        rec = Recommender.from_dataframe(synthetic_catalog(n, full=True))
+        user = synthetic_user(rec.system_df, args.solved)
+        profile = rec.user_profile(user)
+        unfiltered_s = best_of(lambda: rec.recommend(user, args.top_n, profile=profile), args.repeat)
+        for name, spec in FILTER_SPECS.items():
+            legacy_s = best_of(lambda: legacy_filtered(rec, user, spec, args.top_n), args.repeat)
+            select_s = best_of(lambda: rec.candidate_rows(spec), args.repeat)
+            indexed_s = best_of(lambda: rec.recommend(user, args.top_n, profile=profile, filters=spec), args.repeat)
+            expected = legacy_filtered(rec, user, spec, args.top_n)["score"].round(12).tolist()
+            got = rec.recommend(user, args.top_n, profile=profile, filters=spec)["score"].round(12).tolist()
+            results.append({
+                "benchmark": "filters", "catalog": n, "filter": name,
+                "matching": len(rec.candidate_rows(spec)), "legacy_ms": legacy_s * 1e3,
+                "select_ms": select_s * 1e3, "indexed_ms": indexed_s * 1e3, "unfiltered_ms": unfiltered_s * 1e3,
+                "speedup": legacy_s / indexed_s, "same_scores": expected == got,
+            })
+    return results
+
+
+def legacy_upload(stream) -> pd.DataFrame:
+    """The pre-streaming upload path: whole body read, decoded to one str, every column parsed."""
+    return pd.read_csv(io.StringIO(stream.read().decode("utf-8")))
+
+
+def _traced(fn):
+    """(result, peak Python-tracked bytes allocated while running `fn`)."""
+    tracemalloc.start()
+    try:
+        result = fn()
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_upload(args) -> list:
+    results = []
+    catalog = synthetic_catalog(max(args.rows), full=True)
+    for n in args.rows:
+        # a history export as users upload it: every catalog column plus a status column
+        user = catalog.head(n).assign(status="solved")
+        body = user.to_csv(index=False).encode("utf-8")
+        legacy_s = best_of(lambda: legacy_upload(io.BytesIO(body)), args.repeat)
+        stream_s = best_of(lambda: read_csv_stream(io.BytesIO(body), max_bytes=len(body), max_rows=n), args.repeat)
+        old, legacy_peak = _traced(lambda: legacy_upload(io.BytesIO(body)))
+        new, stream_peak = _traced(lambda: read_csv_stream(io.BytesIO(body), max_bytes=len(body), max_rows=n))
+        results.append({
+            "benchmark": "upload", "rows": n, "upload_mb": len(body) / 2**20,
+            "legacy_ms": legacy_s * 1e3, "stream_ms": stream_s * 1e3, "speedup": legacy_s / stream_s,
+            "legacy_peak_mb": legacy_peak / 2**20, "stream_peak_mb": stream_peak / 2**20,
+            "frame_mb": new.memory_usage(deep=True).sum() / 2**20,
+            "same_titles": old["title"].astype(str).tolist() == new["title"].tolist(),
+        })
+    return results
+
+
+def legacy_others(rec: Recommender, user_df: pd.DataFrame, exclude_titles: set, n: int) -> list:
+    """The pre-context "others" sample: catalog copy, every title lowercased per request."""
+    system = rec.system_df.copy().reset_index(drop=True)
+    user_titles = set(user_df.get("title", pd.Series([], dtype=object)).astype(str).str.lower().str.strip())
+    candidates = system[~system["title"].astype(str).str.lower().str.strip().isin(user_titles | exclude_titles)]
+    return candidates.sample(n=min(n, len(candidates)), random_state=42).index.tolist()
+
+
+def chat_work(rec: Recommender, user_df: pd.DataFrame, shared: bool) -> tuple:
+    """The recommender work of one /chat request (forest lookup, recommend, weak topics, others).
+
+    With `shared`, every call gets one `UserContext`; otherwise each gets the raw frame and
+    derives titles, rows, labels and topics itself, and "others" uses the old catalog scan.
+    """
+    user = rec.user_context(user_df) if shared else user_df
+    rec.rf_training_data(user)
+    recs = rec.recommend(user, 8)
+    weak = rec.analyze_weak_topics(user, 3)
+    others = rec.sample_others(user, 20, seed=42) if shared else legacy_others(rec, user_df, set(), 20)
+    return recs.index.tolist(), weak, len(others)
+
+
+def _matrix_mb(matrix) -> float:
+    if hasattr(matrix, "indptr"):
+        return (matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes) / 2**20
+    return matrix.nbytes / 2**20
+
+
+def bench_engine(args) -> list:
+    results = []
+    catalogs = [("bundled", pd.read_csv(os.path.join(os.path.dirname(__file__), "cleaned_leetcode_dataset.csv")))]
+    catalogs += [(n, synthetic_catalog(n)) for n in args.sizes]
+    for name, catalog in catalogs:
+        sparse = Recommender.from_dataframe(catalog)
+        solved = min(args.solved, len(catalog) // 4)
+        users = [synthetic_user(sparse.system_df, solved, seed=i) for i in range(args.users)]
+        sparse_profiles = [sparse.user_profile(u) for u in users]
+        sparse_rank_s = best_of(lambda: sparse.rank(users[0], args.top_n, profile=sparse_profiles[0]), args.repeat)
+        sparse_batch_s = best_of(lambda: sparse.recommend_many(users, args.top_n, profiles=sparse_profiles), 3)
+        sparse_top = [set(sparse.rank(u, args.top_n, profile=p)[0].tolist()) for u, p in zip(users, sparse_profiles)]
+        for dim in args.dims:
+            started = time.perf_counter()
+            lsa = Recommender.from_dataframe(catalog, engine="lsa", lsa_dim=dim)
+            fit_s = time.perf_counter() - started
+            lsa_profiles = [lsa.user_profile(u) for u in users]
+            lsa_rank_s = best_of(lambda: lsa.rank(users[0], args.top_n, profile=lsa_profiles[0]), args.repeat)
+            lsa_batch_s = best_of(lambda: lsa.recommend_many(users, args.top_n, profiles=lsa_profiles), 3)
+            overlap = [len(top & set(lsa.rank(u, args.top_n, profile=p)[0].tolist())) / args.top_n
+                       for top, u, p in zip(sparse_top, users, lsa_profiles)]
+            results.append({
+                "benchmark": "engine", "catalog": name, "engine": lsa.engine_label,
+                "features": sparse.tfidf_matrix.shape[1], "nnz_per_row": sparse.tfidf_matrix.nnz / len(catalog),
+                "sparse_mb": _matrix_mb(sparse.score_matrix), "lsa_mb": _matrix_mb(lsa.score_matrix),
+                "sparse_rank_ms": sparse_rank_s * 1e3, "lsa_rank_ms": lsa_rank_s * 1e3,
+                "sparse_batch_ms": sparse_batch_s * 1e3, "lsa_batch_ms": lsa_batch_s * 1e3,
+                "lsa_fit_s": fit_s, f"overlap@{args.top_n}": float(np.mean(overlap)),
+            })
+        del sparse
+    return results
+
+
+def mask_others(rec: Recommender, user, exclude_titles: set, n: int) -> list:
+    """The catalog-wide "others" sample: exclusion mask over every row, then a pandas sample."""
+    candidates = np.flatnonzero(~user.exclusion_mask(exclude_titles))
+    return pd.Series(candidates).sample(n=min(n, len(candidates)), random_state=42).tolist()
+
+
+def bench_others(args) -> list:
+    results = []
+    for n in args.sizes:
+        rec = Recommender.from_dataframe(synthetic_catalog(n, full=True))
+        for solved in [s for s in args.solved if s * 2 <= n]:
+            user = rec.user_context(synthetic_user(rec.system_df, solved))
+            # the 12 recommended titles are excluded as well, as in /recommend
+            recommended = set(rec.title_norm[rec.recommend(user, 12).index])
+            mask_s = best_of(lambda: mask_others(rec, user, recommended, args.n), args.repeat)
+            sample_s = best_of(lambda: rec.sample_others(user, args.n, exclude_titles=recommended), args.repeat)
+            rows = rec.sample_others(user, args.n, exclude_titles=recommended)
+            excluded = set(user.rows) | {int(i) for t in recommended for i in rec.title_index[t]}
+            results.append({
+                "benchmark": "others", "catalog": n, "solved": solved, "n": args.n,
+                "mask_ms": mask_s * 1e3, "sample_ms": sample_s * 1e3, "speedup": mask_s / sample_s,
+                "valid": len(set(rows.tolist())) == len(rows) == args.n and not excluded & set(rows.tolist()),
+            })
+    return results
+
+
+def bench_context(args) -> list:
+    results = []
+    for n in args.sizes:
+        rec = Recommender.from_dataframe(synthetic_catalog(n, full=True))
+        for solved in [s for s in args.solved if s * 2 <= n]:
+            user = synthetic_user(rec.system_df, solved, attempted=solved // 4)
+            per_call_s = best_of(lambda: chat_work(rec, user, False), args.repeat)
+            shared_s = best_of(lambda: chat_work(rec, user, True), args.repeat)
+            before, per_call_peak = _traced(lambda: chat_work(rec, user, False))
+            after, shared_peak = _traced(lambda: chat_work(rec, user, True))
+            results.append({
+                "benchmark": "context", "catalog": n, "solved": solved,
+                "per_call_ms": per_call_s * 1e3, "shared_ms": shared_s * 1e3, "speedup": per_call_s / shared_s,
+                "per_call_peak_mb": per_call_peak / 2**20, "shared_peak_mb": shared_peak / 2**20,
+                "same_results": before == after,
+            })
+    return results
+
+
+ROUTES = ("analyze", "recommend", "recommend_more", "chat")
+
+
+def _percentile(values: list, q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def _server_timing(header: str) -> dict:
+    stages = {}
+    for part in (header or "").split(","):
+        name, _, dur = part.strip().partition(";dur=")
+        if dur:
+            stages[name] = float(dur)
+    return stages
+
+
+def _route_worker(csv: str, tmp: str, solved: list, attempted_share: float, requests: int,
+                  upstream_latency: float, llm_latency: float, out) -> None:
+    """Time the Flask routes end to end in a fresh process configured for the synthetic catalog.
+
+    LeetCode and the LLM provider are the local fakes; each request uses a new username, so the
+    upstream fetch, profile and history work are all cold (the UI's follow-up calls for the same
+    user then share the coalesced LeetCode result, as in production).
+    """
+    from fake_leetcode import FakeLeetCode
+    from fake_llm import FakeCompletions
+
+    catalog = pd.read_csv(csv)
+    with FakeLeetCode(leetcode_problems(catalog), latency=upstream_latency) as fake, \
+            FakeCompletions("Start with the weakest topic, then mix in mediums.", latency=llm_latency) as llm:
+        os.environ.update({
+            "SYSTEM_CSV": csv,
+            "MODEL_ARTIFACT_DIR": os.path.join(tmp, "artifacts"),
+            "MODEL_WARM_NEIGHBORS": "0",
+            "HISTORY_DB": os.path.join(tmp, "history.db"),
+            "LEETCODE_CATALOG": os.path.join(tmp, "leetcode_catalog.json"),
+            "LEETCODE_GRAPHQL_URL": fake.url,
+            "LEETCODE_RATE": "100000",
+            "OPENAI_BASE_URL": llm.url,
+            "OPENAI_API_KEY": "benchmark",
+        })
+        import app as service
+
+        rows = []
+        started = time.perf_counter()
+        service.registry.get()
+        rows.append({"case": "route_startup_fit", "ms": (time.perf_counter() - started) * 1e3})
+        started = time.perf_counter()
+        service.leetcode.sync_catalog(force=True)
+        rows.append({"case": "catalog_sync", "ms": (time.perf_counter() - started) * 1e3})
+
+        client = service.app.test_client()
+        headers = {"X-Profile": "1"}
+        for n_solved in solved:
+            user = synthetic_user(catalog, n_solved, attempted=int(n_solved * attempted_share))
+            fake.solved = set(user.loc[user["status"] == "solved", "title"])
+            times = {route: [] for route in ROUTES}
+            stages = {route: [] for route in ROUTES}
+            for i in range(requests):
+                name = f"bench-{n_solved}-{i}"
+                calls = {
+                    "analyze": lambda: client.post("/analyze", data={"leetcode_username": name}, headers=headers),
+                    "recommend": lambda: client.post("/recommend", data={"leetcode_username": name}, headers=headers),
+                    "recommend_more": lambda: client.post("/recommend/more", json={"leetcode_username": name, "page_size": 12},
+                                                          headers=headers),
+                    "chat": lambda: client.post("/chat", json={"leetcode_username": name, "message": "recommend problems"},
+                                                headers=headers),
+                }
+                for route, call in calls.items():
+                    t = time.perf_counter()
+                    resp = call()
+                    times[route].append((time.perf_counter() - t) * 1e3)
+                    if resp.status_code != 200:
+                        raise RuntimeError(f"{route} returned {resp.status_code}: {resp.get_data(as_text=True)[:200]}")
+                    stages[route].append(_server_timing(resp.headers.get("Server-Timing")))
+            for route in ROUTES:
+                names = {s for st in stages[route] for s in st}
+                rows.append({
+                    "case": f"route_{route}", "solved": n_solved, "ms": _percentile(times[route], 50),
+                    "p95_ms": _percentile(times[route], 95), "requests": requests,
+                    "stages_ms": {s: _percentile([st.get(s, 0.0) for st in stages[route]], 50) for s in sorted(names)},
+                })
+    out.put(rows)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(env: dict, timeout: float = 600.0):
+    """Start `app.py` in production mode with `env`; returns (process, base url) once the model is ready."""
+    import requests
+
+    port = _free_port()
+    proc = subprocess.Popen([sys.executable, "app.py"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env={**os.environ, **env, "SERVE_MODE": "production", "PORT": str(port)},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"app.py exited with {proc.returncode}")
+        try:
+            if requests.get(f"{url}/model/status", timeout=5).json().get("ready"):
+                return proc, url
+        except (requests.RequestException, ValueError):
+            pass
+        time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("app.py did not become ready")
+
+
+def _drive(url: str, route: str, users: int, duration: float, tag: str) -> dict:
+    """`users` closed-loop clients calling `route` for `duration` seconds, each call as a new user."""
+    import requests
+
+    calls = {
+        "recommend": lambda s, name: s.post(f"{url}/recommend", data={"leetcode_username": name}, timeout=120),
+        "chat": lambda s, name: s.post(f"{url}/chat", json={"leetcode_username": name, "message": "recommend problems"},
+                                       timeout=120),
+        "analyze": lambda s, name: s.post(f"{url}/analyze", data={"leetcode_username": name}, timeout=120),
+    }
+    call = calls[route]
+    stop = time.perf_counter() + duration
+
+    def client(i):
+        times, errors, n = [], 0, 0
+        with requests.Session() as session:
+            while time.perf_counter() < stop:
+                started = time.perf_counter()
+                try:
+                    ok = call(session, f"{tag}-{i}-{n}").status_code == 200
+                except requests.RequestException:
+                    ok = False
+                times.append((time.perf_counter() - started) * 1e3)
+                errors += not ok
+                n += 1
+        return times, errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=users) as clients:
+        outcomes = list(clients.map(client, range(users)))
+    elapsed = time.perf_counter() - started
+    times = [t for ts, _ in outcomes for t in ts]
+    return {"requests": len(times), "errors": sum(e for _, e in outcomes), "rps": len(times) / elapsed,
+            "p50_ms": _percentile(times, 50), "p95_ms": _percentile(times, 95)}
+
+
+def bench_loadtest(args) -> list:
+    """Closed-loop load against `app.py` in production mode, with stages run in sequence vs overlapped.
+
+    LeetCode and the LLM are the local fakes with injected latency; every call is a new user,
+    so each one pays the upstream fetch. Both modes hold a server thread per request (see
+    `serving.py`), so capacity under slow upstreams scales with `--threads`, not with overlap.
+    """
+    from fake_leetcode import FakeLeetCode
+    from fake_llm import FakeCompletions
+
+    catalog = synthetic_catalog(args.catalog, full=True)
+    user = synthetic_user(catalog, args.solved)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp, \
+            FakeLeetCode(leetcode_problems(catalog), solved=set(user["title"]), latency=args.upstream_latency) as fake, \
+            FakeCompletions("Start with the weakest topic, then mix in mediums.", latency=args.llm_latency) as llm:
+        csv = write_catalog(os.path.join(tmp, "catalog.csv"), catalog)
+        for mode, overlap in (("sequential", "0"), ("overlapped", "1")):
+            env = {
+                "SYSTEM_CSV": csv,
+                "MODEL_ARTIFACT_DIR": os.path.join(tmp, "artifacts"),
+                "MODEL_WARM_NEIGHBORS": "0",
+                "HISTORY_DB": os.path.join(tmp, f"history-{mode}.db"),
+                "LEETCODE_CATALOG": os.path.join(tmp, "leetcode_catalog.json"),
+                "LEETCODE_GRAPHQL_URL": fake.url,
+                "LEETCODE_RATE": "100000",
+                "OPENAI_BASE_URL": llm.url,
+                "OPENAI_API_KEY": "benchmark",
+                "LLM_MAX_CONCURRENCY": "64",
+                "SERVE_OVERLAP": overlap,
+                # every pool a waiting request holds a thread of, so --threads sets the capacity
+                "SERVE_THREADS": str(args.threads),
+                "SERVE_IO_WORKERS": str(args.threads),
+                "LEETCODE_LOOKUP_WORKERS": str(args.threads),
+            }
+            proc, url = _start_server(env)
+            try:
+                for route in args.routes:
+                    # warm-up: catalog sync, lazy model state, connection pools
+                    _drive(url, route, 2, 1.0, f"warm-{mode}")
+                    for users in args.users:
+                        row = _drive(url, route, users, args.duration, f"{mode}-{route}-{users}")
+                        results.append({"benchmark": "loadtest", "mode": mode, "route": route,
+                                        "users": users, **row})
+            finally:
+                proc.terminate()
+                proc.wait(timeout=30)
+
+    # the most concurrent users each mode served within the latency objective
+    for route in args.routes:
+        for mode in ("sequential", "overlapped"):
+            ok = [r["users"] for r in results if r["route"] == route and r["mode"] == mode
+                  and r["p95_ms"] <= args.slo_ms and not r["errors"]]
+            results.append({"benchmark": "loadtest_capacity", "mode": mode, "route": route,
+                            "slo_p95_ms": args.slo_ms, "users": max(ok) if ok else 0})
+    return results
+
+
+def bench_suite(args) -> list:
+    """End-to-end timings for regression tracking: one row per (case, catalog size, history size).
+
+    In-process cases report the best of `--repeat` runs; route cases report the median (and
+    p95) of `--requests` calls through the Flask app, run in a spawned process per catalog.
+    """
+    results = []
+    for n in args.catalogs:
+        catalog = synthetic_catalog(n, full=True)
+        with tempfile.TemporaryDirectory() as tmp:
+            csv = write_catalog(os.path.join(tmp, "catalog.csv"), catalog)
+            base = {"benchmark": "suite", "catalog": n}
+
+            started = time.perf_counter()
+            rec = Recommender(system_csv=csv)
+            rec.fit()
+            results.append({**base, "case": "fit", "ms": (time.perf_counter() - started) * 1e3})
+
+            for n_solved in args.solved:
+                user = synthetic_user(rec.system_df, n_solved, attempted=int(n_solved * args.attempted))
+                row = {**base, "solved": n_solved}
+                results.append({**row, "case": "recommend", "ms": best_of(lambda: rec.recommend(user, args.top_n), args.repeat) * 1e3})
+                results.append({**row, "case": "analyze_weak_topics",
+                                "ms": best_of(lambda: rec.analyze_weak_topics(user, top_k=8), args.repeat) * 1e3})
+                trained = {}
+                rf_s = best_of(lambda: trained.update(result=rec.train_random_forest(user, min_samples=1)),
+                               min(args.repeat, 3))
+                ok, info = trained["result"]
+                if ok:
+                    results.append({**row, "case": "rf_train", "ms": rf_s * 1e3})
+                    results.append({**row, "case": "recommend_with_rf", "ms": best_of(
+                        lambda: rec.recommend_with_rf(user, args.top_n, model=info["model"]), args.repeat) * 1e3})
+
+            if args.routes:
+                ctx = multiprocessing.get_context("spawn")
+                out = ctx.Queue()
+                proc = ctx.Process(target=_route_worker, args=(
+                    csv, tmp, args.solved, args.attempted, args.requests, args.upstream_latency, args.llm_latency, out))
+                proc.start()
+                rows = out.get()
+                proc.join()
+                results.extend({**base, **r} for r in rows)
+    return results
+
+
+METRIC_FIELDS = {"ms", "p95_ms", "stages_ms", "requests"}
+
+
+def _load_results(path: str) -> list:
+    """Rows from a `--out` file (or from `--json` lines)."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+    return data["results"] if isinstance(data, dict) else data
+
+
+def _result_key(row: dict) -> tuple:
+    return tuple(sorted((k, v) for k, v in row.items() if k not in METRIC_FIELDS and not k.endswith(("_ms", "_s"))))
+
+
+def bench_compare(args) -> list:
+    """Match rows of two result files and report head/base time ratios; flags regressions."""
+    base = {_result_key(r): r for r in _load_results(args.base) if "ms" in r}
+    results = []
+    for row in _load_results(args.head):
+        key = _result_key(row)
+        if "ms" not in row or key not in base:
+            continue
+        ratio = row["ms"] / base[key]["ms"] if base[key]["ms"] else float("inf")
+        results.append({
+            "case": row.get("case", row.get("benchmark")), "catalog": row.get("catalog"), "solved": row.get("solved"),
+            "base_ms": base[key]["ms"], "head_ms": row["ms"], "ratio": ratio,
+            "regression": ratio > 1 + args.threshold and row["ms"] - base[key]["ms"] > args.min_ms,
+        })
+    args.regressions = sum(r["regression"] for r in results)
+    return results
+
+
+def run_metadata() -> dict:
+    """Where and on what a result file was produced, so comparisons can be qualified."""
+    import platform
+    import subprocess
+    import sklearn
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit, "timestamp": time.time(), "python": platform.python_version(),
+        "numpy": np.__version__, "pandas": pd.__version__, "sklearn": sklearn.__version__,
+        "machine": platform.machine(), "cpus": os.cpu_count(), "argv": sys.argv[1:],
+    }
+
+
+def print_results(results: list) -> None:
+    if not results:
+        return
+    # union of columns in first-seen order; nested values (stage breakdowns) stay in --json/--out
+    cols = []
+    for row in results:
+        cols.extend(c for c, v in row.items() if c not in cols and not isinstance(v, dict))
+    print("  ".join(f"{c:>12}" for c in cols))
+    for row in results:
+        cells = []
+        for c in cols:
+            v = row.get(c)
+            cells.append(f"{v:>12.3f}" if isinstance(v, float) else f"{str(v):>12}")
+        print("  ".join(cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--json", action="store_true", help="print results as JSON lines")
+    parser.add_argument("--out", help="also write results plus run metadata (commit, versions) to this JSON file")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("topk", help="recommend() ranking: argpartition + exclusion mask vs full argsort loop")
+    p.add_argument("--sizes", type=int, nargs="+", default=[2000, 10000, 50000, 100000, 500000])
+    p.add_argument("--solved", type=int, default=200)
+    p.add_argument("--top-n", type=int, default=12)
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=bench_topk)
+
+    p = sub.add_parser("weak-topics", help="analyze_weak_topics(): sparse incidence products vs per-topic apply")
+    p.add_argument("--catalog", type=int, default=10000)
+    p.add_argument("--solved", type=int, nargs="+", default=[100, 500, 2000, 5000])
+    p.add_argument("--top-k", type=int, default=8)
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_weak_topics)
+
+    p = sub.add_parser("fetch", help="full problem-list fetch: pooled concurrent pages vs sequential sleep(1) loop")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1000, 3000])
+    p.add_argument("--page-size", type=int, default=100)
+    p.add_argument("--latency", type=float, default=0.2, help="injected upstream latency per request (s)")
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--rate", type=float, default=10.0, help="token-bucket rate for the pooled client")
+    p.set_defaults(func=bench_fetch)
+
+    p = sub.add_parser("batch", help="recommend_many() for a cohort vs one recommend() call per user")
+    p.add_argument("--catalog", type=int, default=10000)
+    p.add_argument("--users", type=int, default=1000)
+    p.add_argument("--max-solved", type=int, default=300)
+    p.add_argument("--top-n", type=int, default=12)
+    p.set_defaults(func=bench_batch)
+
+    p = sub.add_parser("serialize", help="response building + JSON encoding: precomputed columns vs iterrows()")
+    p.add_argument("--catalog", type=int, default=10000)
+    p.add_argument("--rows", type=int, nargs="+", default=[12, 100, 1000])
+    p.add_argument("--solved", type=int, default=200)
+    p.add_argument("--repeat", type=int, default=20)
+    p.set_defaults(func=bench_serialize)
+
+    p = sub.add_parser("load", help="catalog load: CSV (all / needed columns) vs typed columnar copy")
+    p.add_argument("--sizes", type=int, nargs="+", default=[1825, 20000, 200000])
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_load)
+
+    p = sub.add_parser("similar", help="recommend_similar() over the neighbour graph vs recommend() full scan")
+    p.add_argument("--sizes", type=int, nargs="+", default=[2000, 10000, 50000])
+    p.add_argument("--solved", type=int, default=200)
+    p.add_argument("--k", type=int, default=20)
+    p.add_argument("--top-n", type=int, default=12)
+    p.add_argument("--repeat", type=int, default=5)
+    p.set_defaults(func=bench_similar)
+
+    p = sub.add_parser("filters", help="filtered recommend(): inverted-index candidates vs rank-all then post-filter")
+    p.add_argument("--sizes", type=int, nargs="+", default=[2000, 100000, 1000000])
+    p.add_argument("--solved", type=int, default=200)
+    p.add_argument("--top-n", type=int, default=12)
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_filters)
+
+    p = sub.add_parser("context", help="one /chat request's recommender work: shared UserContext vs per-call re-derivation")
+    p.add_argument("--sizes", type=int, nargs="+", default=[2000, 100000, 1000000])
+    p.add_argument("--solved", type=int, nargs="+", default=[50, 500, 3000])
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_context)
+
+    p = sub.add_parser("engine", help="scoring engines: dense LSA embedding vs sparse TF-IDF (latency, memory, top-k overlap)")
+    p.add_argument("--sizes", type=int, nargs="+", default=[20_000, 200_000])
+    p.add_argument("--dims", type=int, nargs="+", default=[64, 128])
+    p.add_argument("--solved", type=int, default=200)
+    p.add_argument("--users", type=int, default=32)
+    p.add_argument("--top-n", type=int, default=10)
+    p.add_argument("--repeat", type=int, default=20)
+    p.set_defaults(func=bench_engine)
+
+    p = sub.add_parser("others", help="\"others\" sampling: rejection sampling over row ids vs catalog-wide exclusion mask")
+    p.add_argument("--sizes", type=int, nargs="+", default=[2_000, 100_000, 1_000_000])
+    p.add_argument("--solved", type=int, nargs="+", default=[50, 500])
+    p.add_argument("--n", type=int, default=20)
+    p.add_argument("--repeat", type=int, default=20)
+    p.set_defaults(func=bench_others)
+
+    p = sub.add_parser("upload", help="user CSV upload: streamed, column-projected parse vs read-all + every column")
+    p.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_upload)
+
+    p = sub.add_parser("suite", help="fit / recommend / analyze / RF and Flask routes end to end, for regression tracking")
+    p.add_argument("--catalogs", type=int, nargs="+", default=[2000, 20000])
+    p.add_argument("--solved", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    p.add_argument("--attempted", type=float, default=0.25, help="unsolved rows per solved row in each history")
+    p.add_argument("--top-n", type=int, default=12)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--no-routes", dest="routes", action="store_false", help="skip the Flask route timings")
+    p.add_argument("--requests", type=int, default=20, help="calls per route and history size")
+    p.add_argument("--upstream-latency", type=float, default=0.0, help="injected LeetCode latency per request (s)")
+    p.add_argument("--llm-latency", type=float, default=0.0, help="injected LLM latency per completion (s)")
+    p.set_defaults(func=bench_suite)
+
+    p = sub.add_parser("loadtest", help="concurrent users against app.py (production mode): stages in sequence vs overlapped")
+    p.add_argument("--catalog", type=int, default=20000)
+    p.add_argument("--solved", type=int, default=200)
+    p.add_argument("--routes", nargs="+", default=["recommend", "chat"], choices=["recommend", "chat", "analyze"])
+    p.add_argument("--users", type=int, nargs="+", default=[1, 8, 16, 32, 128])
+    p.add_argument("--duration", type=float, default=10.0, help="seconds per load level")
+    p.add_argument("--threads", type=int, default=64, help="server, IO and LeetCode lookup threads (SERVE_THREADS, SERVE_IO_WORKERS, LEETCODE_LOOKUP_WORKERS)")
+    p.add_argument("--upstream-latency", type=float, default=0.1, help="injected LeetCode latency per request (s)")
+    p.add_argument("--llm-latency", type=float, default=0.3, help="injected LLM latency per completion (s)")
+    p.add_argument("--slo-ms", type=float, default=500.0, help="p95 latency objective for the capacity summary")
+    p.set_defaults(func=bench_loadtest)
+
+    p = sub.add_parser("compare", help="compare two result files (from --out or --json) and flag regressions")
+    p.add_argument("base")
+    p.add_argument("head")
+    p.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown ratio before flagging")
+    p.add_argument("--min-ms", type=float, default=0.5, help="ignore slowdowns smaller than this (noise)")
+    p.set_defaults(func=bench_compare)
+
+    args = parser.parse_args(argv)
+    results = args.func(args)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"meta": run_metadata(), "results": results}, f, indent=1)
+    if args.json:
+        for row in results:
+            print(json.dumps(row))
+    else:
+        print_results(results)
+    if getattr(args, "regressions", 0):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,170 @@
+import time
+import secrets
+import sqlite3
+import threading
+from functools import partial
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from cache import TTLCache
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cursors (
+    token TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    version TEXT,
+    row_ids BLOB NOT NULL,
+    scores BLOB NOT NULL,
+    position INTEGER NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cursors_expiry ON cursors (expires_at);
+"""
+
+
+class Cursor:
+    """A materialized ranking plus the read position of one paging session.
+
+    Holds a reference to the recommender snapshot the row ids point into, so pages stay
+    consistent even if the registry swaps in a new model mid-session. With `advance` (set by a
+    shared `CursorStore`), the position lives in the store so any worker continues the session.
+    """
+
+    def __init__(self, recommender, row_ids: np.ndarray, scores: np.ndarray, username: str = "",
+                 offset: int = 0, advance: Optional[Callable[[int, int], Tuple[int, int]]] = None):
+        self.recommender = recommender
+        self.row_ids = row_ids
+        self.scores = scores
+        self.username = username
+        self.offset = offset
+        self._advance = advance
+        self._lock = threading.Lock()
+
+    def next_page(self, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        if self._advance is not None:
+            start, self.offset = self._advance(size, len(self.row_ids))
+        else:
+            with self._lock:
+                start = self.offset
+                self.offset = min(len(self.row_ids), start + size)
+        return self.row_ids[start:self.offset], self.scores[start:self.offset]
+
+    @property
+    def has_more(self) -> bool:
+        return self.offset < len(self.row_ids)
+
+
+class CursorStore:
+    """Expiring store of `Cursor`s keyed by opaque random tokens.
+
+    Without `path`, cursors live in this process only. With `path` (an SQLite file shared by
+    the workers, e.g. the history DB), each ranking and its read position are also stored
+    there, so a page request may land on any worker: one that did not create the cursor loads
+    it, provided it serves the same model version the ranking was computed with. The local
+    cache still keeps the creating worker's snapshot across a model swap.
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 900.0, path: Optional[str] = None,
+                 timeout: float = 10.0):
+        self.ttl = ttl
+        self.path = path
+        self.timeout = timeout
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._local = threading.local()
+        if path:
+            self._conn().executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # one connection per thread, as in `HistoryStore`
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, fn):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _cursor(self, token: str, recommender, row_ids, scores, username: str, offset: int = 0) -> Cursor:
+        advance = None
+        if self.path:
+            advance = partial(self._advance, token)
+        return Cursor(recommender, row_ids, scores, username, offset=offset, advance=advance)
+
+    def _advance(self, token: str, size: int, total: int) -> Tuple[int, int]:
+        """Move the shared read position forward by `size`; returns (start, stop) of the page."""
+        def advance(conn):
+            row = conn.execute("SELECT position FROM cursors WHERE token = ?", (token,)).fetchone()
+            start = total if row is None else row[0]
+            stop = min(total, start + size)
+            conn.execute("UPDATE cursors SET position = ?, expires_at = ? WHERE token = ?",
+                         (stop, time.time() + self.ttl, token))
+            return start, stop
+        return self._write(advance)
+
+    def create(self, recommender, row_ids: np.ndarray, scores: np.ndarray, username: str = "") -> str:
+        token = secrets.token_urlsafe(16)
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        scores = np.asarray(scores, dtype=np.float64)
+        if self.path:
+            now = time.time()
+
+            def insert(conn):
+                conn.execute("DELETE FROM cursors WHERE expires_at <= ?", (now,))
+                conn.execute(
+                    "INSERT INTO cursors (token, username, version, row_ids, scores, position, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?, 0, ?)",
+                    (token, username, recommender.version, row_ids.tobytes(), scores.tobytes(), now + self.ttl))
+            self._write(insert)
+        self._cache.set(token, self._cursor(token, recommender, row_ids, scores, username))
+        return token
+
+    def get(self, token: str, recommender=None) -> Optional[Cursor]:
+        """The cursor for `token`, or None when it expired or is unknown.
+
+        With a shared store, a cursor created by another worker is loaded when `recommender`
+        (this worker's snapshot) has the version the ranking was computed with.
+        """
+        cursor = self._cache.get(token)
+        if not self.path:
+            if cursor is not None:
+                # reading a page keeps an active session alive
+                self._cache.set(token, cursor)
+            return cursor
+
+        row = self._conn().execute(
+            "SELECT username, version, row_ids, scores, position FROM cursors WHERE token = ? AND expires_at > ?",
+            (token, time.time())).fetchone()
+        if row is None:
+            self._cache.pop(token)
+            return None
+        username, version, row_ids, scores, position = row
+        if cursor is None:
+            if recommender is None or version != recommender.version:
+                return None
+            cursor = self._cursor(token, recommender, np.frombuffer(row_ids, dtype=np.int64),
+                                  np.frombuffer(scores, dtype=np.float64), username, position)
+        else:
+            cursor.offset = position
+        self._cache.set(token, cursor)
+        return cursor
+
+    def discard(self, token: str) -> None:
+        self._cache.pop(token)
+        if self.path:
+            self._write(lambda conn: conn.execute("DELETE FROM cursors WHERE token = ?", (token,)))
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "shared": bool(self.path)}
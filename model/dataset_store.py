@@ -0,0 +1,208 @@
+"""Typed columnar copy of the problem catalog CSV.
+
+`build_dataset` converts the CSV once into a directory with one or more `.npy` files per
+column plus `schema.json`; `ColumnarDataset` reads back just the columns a code path asks for.
+Column kinds:
+
+- numeric: stored with their native dtype.
+- category (`difficulty`): int8 codes into a list of categories, read back as `pd.Categorical`.
+- count (`accepted`, `submissions`): text like "4.1M" parsed to int64 (-1 when missing).
+- list (`companies`, `related_topics`, `topic_tags`): comma-joined names interned into a
+  vocabulary and stored CSR-style (`indptr`/`indices`), available without building strings.
+- text (everything else): UTF-8 bytes plus offsets, memory-mapped, so heavy columns such as
+  `similar_questions` cost nothing until read (and `text()` decodes single rows on demand).
+
+Missing list/text values are recorded in a `null` mask and read back as NaN, like the CSV.
+"""
+import os
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from artifact_store import load_arrays, read_meta, write_artifact
+
+
+# Bump when the on-disk layout changes so old datasets are rebuilt instead of misread
+FORMAT_VERSION = 1
+CATEGORY_COLUMNS = ("difficulty",)
+COUNT_COLUMNS = ("accepted", "submissions")
+LIST_COLUMNS = ("companies", "related_topics", "topic_tags")
+
+_COUNT_RE = re.compile(r"^\s*([0-9]*\.?[0-9]+)\s*([KMB]?)\s*$", re.IGNORECASE)
+_SCALE = {"": 1, "K": 1_000, "M": 1_000_000, "B": 1_000_000_000}
+
+
+def dataset_path(root: str, digest: str) -> str:
+    """Directory holding the columnar copy of the CSV with content hash `digest`."""
+    return os.path.join(root, f"dataset-v{FORMAT_VERSION}-{digest[:16]}")
+
+
+def parse_count(value) -> int:
+    """Parse LeetCode's abbreviated counts ("4.1M", "999K", "1,234"); -1 if missing/unparseable."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return -1
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    m = _COUNT_RE.match(str(value).replace(",", ""))
+    if not m:
+        return -1
+    return int(round(float(m.group(1)) * _SCALE[m.group(2).upper()]))
+
+
+def _split_list(value) -> List[str]:
+    if not isinstance(value, str):
+        return []
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def _encode_text(values: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [b"" if pd.isna(v) else str(v).encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def build_dataset(csv_path: str, path: str) -> str:
+    """Convert `csv_path` into the columnar layout at `path` (see `artifact_store.write_artifact`)."""
+    if os.path.isdir(path):
+        return path
+    df = pd.read_csv(csv_path)
+    columns = []
+    arrays = {}
+    for name in df.columns:
+        col = df[name]
+        nulls = col.isna().to_numpy()
+        spec = {"name": name}
+        if name in CATEGORY_COLUMNS:
+            cat = pd.Categorical(col)
+            spec.update(kind="category", categories=[str(c) for c in cat.categories])
+            arrays[f"{name}.codes"] = cat.codes.astype(np.int8)
+        elif name in COUNT_COLUMNS:
+            spec["kind"] = "count"
+            arrays[name] = np.array([parse_count(v) for v in col], dtype=np.int64)
+        elif name in LIST_COLUMNS:
+            vocab = {}
+            lists = [[vocab.setdefault(v, len(vocab)) for v in _split_list(x)] for x in col]
+            indptr = np.zeros(len(lists) + 1, dtype=np.int64)
+            np.cumsum([len(l) for l in lists], out=indptr[1:])
+            spec.update(kind="list", vocabulary=list(vocab))
+            arrays[f"{name}.indptr"] = indptr
+            arrays[f"{name}.indices"] = np.fromiter((i for l in lists for i in l), dtype=np.int32, count=int(indptr[-1]))
+        elif pd.api.types.is_numeric_dtype(col):
+            spec.update(kind="numeric", dtype=str(col.dtype))
+            arrays[name] = col.to_numpy()
+        else:
+            spec["kind"] = "text"
+            arrays[f"{name}.offsets"], arrays[f"{name}.bytes"] = _encode_text(col.tolist())
+        if nulls.any() and spec["kind"] in ("list", "text"):
+            spec["nullable"] = True
+            arrays[f"{name}.null"] = nulls
+        columns.append(spec)
+
+    schema = {"rows": int(len(df)), "columns": columns, "source": os.path.abspath(csv_path)}
+    return write_artifact(path, arrays, schema, FORMAT_VERSION, meta_file="schema.json")
+
+
+class TextColumn:
+    """Memory-mapped text column; rows are decoded only when indexed."""
+
+    def __init__(self, offsets: np.ndarray, data: np.ndarray, nulls: Optional[np.ndarray] = None):
+        self.offsets = offsets
+        self.data = data
+        self.nulls = nulls
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int):
+        if self.nulls is not None and self.nulls[i]:
+            return np.nan
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def to_list(self) -> list:
+        blob = bytes(self.data)
+        offsets = self.offsets.tolist()
+        values = [blob[a:b].decode("utf-8") for a, b in zip(offsets[:-1], offsets[1:])]
+        if self.nulls is not None:
+            for i in np.flatnonzero(self.nulls):
+                values[i] = np.nan
+        return values
+
+
+class ColumnarDataset:
+    """Read side of `build_dataset`. Arrays are memory-mapped; nothing is decoded up front."""
+
+    def __init__(self, path: str):
+        schema = read_meta(path, FORMAT_VERSION, meta_file="schema.json")
+        if schema is None:
+            raise ValueError(f"Missing or unsupported dataset in {path}")
+        self.path = path
+        self.rows = schema["rows"]
+        self.specs: Dict[str, dict] = {c["name"]: c for c in schema["columns"]}
+
+    @classmethod
+    def open(cls, path: str) -> Optional["ColumnarDataset"]:
+        """Open the dataset at `path`, or return None if it is missing or incompatible."""
+        try:
+            return cls(path)
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.specs)
+
+    def _array(self, key: str) -> np.ndarray:
+        return load_arrays(self.path, (key,))[key]
+
+    def _nulls(self, name: str) -> Optional[np.ndarray]:
+        return self._array(f"{name}.null") if self.specs[name].get("nullable") else None
+
+    def text(self, name: str) -> TextColumn:
+        return TextColumn(self._array(f"{name}.offsets"), self._array(f"{name}.bytes"), self._nulls(name))
+
+    def list_column(self, name: str) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """(indptr, indices, vocabulary) of an interned list column; row i's names are
+        `vocabulary[j] for j in indices[indptr[i]:indptr[i + 1]]`."""
+        spec = self.specs[name]
+        return self._array(f"{name}.indptr"), self._array(f"{name}.indices"), spec["vocabulary"]
+
+    def column(self, name: str):
+        """One column in its pandas form (list columns come back comma-joined, as in the CSV)."""
+        spec = self.specs[name]
+        kind = spec["kind"]
+        if kind in ("numeric", "count"):
+            return np.asarray(self._array(name))
+        if kind == "category":
+            return pd.Categorical.from_codes(np.asarray(self._array(f"{name}.codes")), spec["categories"])
+        if kind == "list":
+            indptr, indices, vocab = self.list_column(name)
+            names = np.asarray(vocab, dtype=object)[np.asarray(indices)]
+            bounds = indptr.tolist()
+            values = [",".join(names[a:b]) for a, b in zip(bounds[:-1], bounds[1:])]
+            nulls = self._nulls(name)
+            if nulls is not None:
+                for i in np.flatnonzero(nulls):
+                    values[i] = np.nan
+            return values
+        return self.text(name).to_list()
+
+    def read(self, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """DataFrame of the requested columns (all when None); unknown names are skipped."""
+        names = self.columns if columns is None else [c for c in columns if c in self.specs]
+        return pd.DataFrame({name: self.column(name) for name in names}, index=pd.RangeIndex(self.rows))
+
+
+if __name__ == "__main__":
+    import argparse
+    import hashlib
+
+    parser = argparse.ArgumentParser(description="Build the columnar copy of a catalog CSV.")
+    parser.add_argument("csv", nargs="?", default=os.path.join(os.path.dirname(__file__), "cleaned_leetcode_dataset.csv"))
+    parser.add_argument("--out", default=os.environ.get("MODEL_ARTIFACT_DIR", os.path.join(os.path.dirname(__file__), "artifacts")))
+    args = parser.parse_args()
+    with open(args.csv, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    print(build_dataset(args.csv, dataset_path(args.out, digest)))
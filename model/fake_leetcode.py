@@ -0,0 +1,140 @@
+"""Local stand-in for the LeetCode GraphQL endpoint, for tests and benchmarks.
+
+Serves the two operations `LeetCodeClient` uses (`userProblemsSolved` and
+`problemsetQuestionList`) from an in-memory problem list:
+
+    with FakeLeetCode(problems, solved={"Two Sum"}) as fake:
+        client = LeetCodeClient(base_url=fake.url, rate=1000)
+        ...
+        fake.calls  # list of (operation, variables) seen so far
+
+`latency` adds a fixed delay to every response and `fail_next(n, status)` makes the next
+`n` requests fail, to exercise concurrency, rate limiting and retries.
+"""
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional
+
+
+DEFAULT_LIMIT = 50
+
+
+class FakeLeetCode:
+    """In-process GraphQL stand-in; `problems` are dicts with title/difficulty/topicTags/acRate."""
+
+    def __init__(self, problems: List[Dict], solved: Optional[Iterable[str]] = None,
+                 host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.problems = list(problems)
+        self.solved = set(solved or [])
+        self.latency = latency
+        self.calls = []
+        self._failures = []
+        self._accepted_cache = None
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                status, payload = fake.handle(body.get("query", ""), body.get("variables") or {})
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/graphql"
+
+    def handle(self, query: str, variables: Dict):
+        """Answer one GraphQL request; returns (http_status, json_payload)."""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            failure = self._failures.pop(0) if self._failures else None
+        if failure is not None:
+            with self._lock:
+                self.calls.append(("failed", variables))
+            return failure, {"errors": [{"message": f"injected {failure}"}]}
+        if "userProblemsSolved" in query:
+            op = "userProblemsSolved"
+            payload = {"data": {
+                "allQuestionsCount": [{"difficulty": "All", "count": len(self.problems)}],
+                "matchedUser": {"submitStats": {"acSubmissionNum": [{"difficulty": "All", "count": len(self.solved)}]}},
+                "userContestRanking": None,
+            }}
+        elif "problemsetQuestionList" in query:
+            op = "problemsetQuestionList"
+            payload = {"data": {"problemsetQuestionList": self._question_list(variables)}}
+        else:
+            op = "unknown"
+            payload = {"errors": [{"message": "unsupported query"}]}
+        with self._lock:
+            self.calls.append((op, variables))
+        return 200, payload
+
+    def _question_list(self, variables: Dict) -> Dict:
+        problems = self.problems
+        if (variables.get("filters") or {}).get("status") == "AC":
+            problems = self._accepted()
+        skip = variables.get("skip") or 0
+        limit = variables.get("limit") or DEFAULT_LIMIT
+        page = []
+        for p in problems[skip:skip + limit]:
+            q = dict(p)
+            q["status"] = "ac" if p["title"] in self.solved else None
+            page.append(q)
+        return {"total": len(problems), "questions": page}
+
+    def _accepted(self) -> List[Dict]:
+        # the AC list is paged too; filter the catalog once per change of `solved`/`problems`
+        key = (frozenset(self.solved), len(self.problems))
+        with self._lock:
+            if self._accepted_cache is None or self._accepted_cache[0] != key:
+                self._accepted_cache = (key, [p for p in self.problems if p["title"] in self.solved])
+            return self._accepted_cache[1]
+
+    def fail_next(self, n: int = 1, status: int = 429):
+        """Make the next `n` requests return HTTP `status`."""
+        with self._lock:
+            self._failures.extend([status] * n)
+
+    def start(self) -> "FakeLeetCode":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def make_problems(n: int) -> List[Dict]:
+    """`n` LeetCode-shaped problem entries with predictable titles ("Problem 0", ...)."""
+    diffs = ["Easy", "Medium", "Hard"]
+    tags = ["Array", "String", "Hash Table", "Dynamic Programming", "Graph", "Tree"]
+    return [{
+        "title": f"Problem {i}",
+        "difficulty": diffs[i % 3],
+        "topicTags": [{"name": tags[i % len(tags)]}, {"name": tags[(i + 1) % len(tags)]}],
+        "acRate": 40.0 + (i % 50),
+    } for i in range(n)]
@@ -0,0 +1,100 @@
+"""Local stand-in for an OpenAI-compatible `/chat/completions` endpoint, for tests and benchmarks.
+
+    with FakeCompletions("Start with arrays.") as fake:
+        client = LLMClient(base_url=fake.url, api_key="test")
+        ...
+        fake.calls  # list of request bodies seen so far
+
+`latency` delays the response (before the first chunk when streaming) and `token_delay`
+spaces out streamed chunks, to exercise timeouts and progressive rendering.
+"""
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeCompletions:
+    """In-process completion server that always answers with `reply`."""
+
+    def __init__(self, reply: str = "Here is a short study plan.", host: str = "127.0.0.1", port: int = 0,
+                 latency: float = 0.0, token_delay: float = 0.0):
+        self.reply = reply
+        self.latency = latency
+        self.token_delay = token_delay
+        self.calls = []
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with fake._lock:
+                    fake.calls.append(body)
+                if fake.latency:
+                    time.sleep(fake.latency)
+                try:
+                    if body.get("stream"):
+                        self._stream(body)
+                    else:
+                        self._complete(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def _complete(self, body):
+                data = json.dumps({
+                    "model": body.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": fake.reply},
+                                 "finish_reason": "stop"}],
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, body):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                for piece in fake.chunks():
+                    event = {"model": body.get("model"), "choices": [{"index": 0, "delta": {"content": piece}}]}
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                    if fake.token_delay:
+                        time.sleep(fake.token_delay)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def chunks(self):
+        """The reply split into word-sized streamed pieces."""
+        words = self.reply.split(" ")
+        return [w + (" " if i < len(words) - 1 else "") for i, w in enumerate(words)]
+
+    def start(self) -> "FakeCompletions":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,219 @@
+"""Inverted indexes for filtered recommendations ("Google mediums", "FAANG, under 40% acceptance").
+
+Built once per fitted model and aligned with the catalog rows:
+
+- company -> sorted row ids (a CSR-style postings list over the interned company names),
+- difficulty -> boolean row mask,
+- `asked_by_faang` mask and `acceptance_rate` values.
+
+`FilterIndex.select` turns a filter spec into the sorted row ids that qualify, so ranking can
+score just those rows. A spec is a plain dict (see `parse_filters`):
+
+    {"companies": ["google"], "difficulty": ["medium"], "faang": True,
+     "min_acceptance": 30.0, "max_acceptance": 60.0}
+
+Company names and difficulties are matched case-insensitively; several values of one key are
+OR-ed, different keys are AND-ed.
+"""
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+_TRUE = {"1", "true", "t", "yes", "y"}
+
+
+def _split_names(value) -> List[str]:
+    if not isinstance(value, str):
+        return []
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def _truthy(values) -> np.ndarray:
+    s = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(s):
+        return s.fillna(0).to_numpy() != 0
+    return s.astype(str).str.strip().str.lower().isin(_TRUE).to_numpy()
+
+
+def _postings(n: int, indptr: np.ndarray, indices: np.ndarray, n_names: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Invert a rows -> names CSR into names -> rows (rows ascending within each name)."""
+    rows = np.repeat(np.arange(n, dtype=np.int32), np.diff(np.asarray(indptr)))
+    order = np.argsort(np.asarray(indices), kind="stable")
+    counts = np.bincount(np.asarray(indices), minlength=n_names)
+    name_ptr = np.zeros(n_names + 1, dtype=np.int64)
+    np.cumsum(counts, out=name_ptr[1:])
+    return name_ptr, rows[order]
+
+
+class FilterIndex:
+    """Row-aligned filter structures for one catalog snapshot (never mutated; see `extend`)."""
+
+    def __init__(self, n: int, company_indptr: np.ndarray, company_indices: np.ndarray,
+                 company_names: Sequence[str], difficulty: Sequence, faang: np.ndarray, acceptance: np.ndarray):
+        self.n = n
+        # per-row company lists (kept so `extend` can rebuild the postings)
+        self.company_indptr = np.asarray(company_indptr, dtype=np.int64)
+        self.company_indices = np.asarray(company_indices, dtype=np.int32)
+        self.company_names = list(company_names)
+        # lowercased name -> vocabulary ids ("Google" and "google" are one company)
+        self.company_ids: Dict[str, List[int]] = {}
+        for i, name in enumerate(self.company_names):
+            self.company_ids.setdefault(name.lower(), []).append(i)
+        self.postings_ptr, self.postings = _postings(n, self.company_indptr, self.company_indices, len(self.company_names))
+
+        labels = pd.Series(difficulty, dtype=object).fillna("").astype(str).str.strip().str.lower()
+        self.difficulty = labels.to_numpy(dtype=object)
+        codes, uniques = pd.factorize(labels)
+        self.difficulty_masks = {name: codes == i for i, name in enumerate(uniques) if name}
+        self.faang = np.asarray(faang, dtype=bool)
+        self.acceptance = np.asarray(acceptance, dtype=np.float32)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "FilterIndex":
+        """Build from catalog columns as they appear in the CSV (missing columns match nothing)."""
+        n = len(df)
+        col = "companies" if "companies" in df.columns else "company"
+        vocab: Dict[str, int] = {}
+        lists = [[vocab.setdefault(c, len(vocab)) for c in _split_names(v)]
+                 for v in (df[col] if col in df.columns else [None] * n)]
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(l) for l in lists], out=indptr[1:])
+        indices = np.fromiter((i for l in lists for i in l), dtype=np.int32, count=int(indptr[-1]))
+        return cls(
+            n, indptr, indices, list(vocab),
+            df["difficulty"] if "difficulty" in df.columns else [""] * n,
+            _truthy(df["asked_by_faang"]) if "asked_by_faang" in df.columns else np.zeros(n, dtype=bool),
+            pd.to_numeric(df["acceptance_rate"], errors="coerce").to_numpy(dtype=float)
+            if "acceptance_rate" in df.columns else np.full(n, np.nan),
+        )
+
+    @classmethod
+    def from_dataset(cls, store) -> "FilterIndex":
+        """Build from a `dataset_store.ColumnarDataset` without materializing the company strings."""
+        n = store.rows
+        if "companies" in store.specs:
+            indptr, indices, vocab = store.list_column("companies")
+        else:
+            indptr, indices, vocab = np.zeros(n + 1, dtype=np.int64), np.zeros(0, dtype=np.int32), []
+        difficulty = np.asarray(store.column("difficulty"), dtype=object) if "difficulty" in store.specs else [""] * n
+        faang = _truthy(store.column("asked_by_faang")) if "asked_by_faang" in store.specs else np.zeros(n, dtype=bool)
+        if "acceptance_rate" in store.specs:
+            acceptance = pd.to_numeric(pd.Series(store.column("acceptance_rate")), errors="coerce").to_numpy(dtype=float)
+        else:
+            acceptance = np.full(n, np.nan)
+        return cls(n, indptr, indices, vocab, difficulty, faang, acceptance)
+
+    def extend(self, rows: pd.DataFrame) -> "FilterIndex":
+        """A new index with `rows` (CSV-shaped) appended after the current rows."""
+        tail = FilterIndex.from_frame(rows)
+        names = list(self.company_names)
+        ids = dict(zip(names, range(len(names))))
+        remap = np.array([ids.setdefault(c, len(ids)) for c in tail.company_names], dtype=np.int32)
+        names = list(ids)
+        return FilterIndex(
+            self.n + tail.n,
+            np.concatenate([self.company_indptr, tail.company_indptr[1:] + self.company_indptr[-1]]),
+            np.concatenate([self.company_indices, remap[tail.company_indices]]),
+            names,
+            np.concatenate([self.difficulty, tail.difficulty]),
+            np.concatenate([self.faang, tail.faang]),
+            np.concatenate([self.acceptance, tail.acceptance]),
+        )
+
+    def company_rows(self, name: str) -> np.ndarray:
+        """Sorted row ids of problems asked by company `name` (empty if unknown)."""
+        ids = self.company_ids.get(name.strip().lower(), ())
+        parts = [self.postings[self.postings_ptr[i]:self.postings_ptr[i + 1]] for i in ids]
+        if len(parts) == 1:
+            return parts[0]
+        return np.unique(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int32)
+
+    def select(self, filters: Optional[Mapping]) -> Optional[np.ndarray]:
+        """Sorted row ids matching every filter in `filters`, or None when nothing is filtered.
+
+        Company postings are unioned first (they are short) and the other predicates are then
+        checked only at those rows; without a company filter they are AND-ed over the catalog.
+        """
+        if not filters:
+            return None
+        rows = None
+        companies = filters.get("companies")
+        if companies:
+            parts = [self.company_rows(c) for c in companies]
+            rows = parts[0] if len(parts) == 1 else np.unique(np.concatenate(parts))
+            rows = rows.astype(np.int64)
+
+        # each check is evaluated at `rows` only, or over the whole catalog without a company filter
+        def at(values):
+            return values if rows is None else values[rows]
+
+        checks = []
+        difficulty = filters.get("difficulty")
+        if difficulty:
+            masks = [self.difficulty_masks.get(d.strip().lower()) for d in difficulty]
+            masks = [at(m) for m in masks if m is not None]
+            checks.append(np.logical_or.reduce(masks) if masks else np.zeros(self.n if rows is None else len(rows), dtype=bool))
+        if filters.get("faang") is not None:
+            checks.append(at(self.faang) if filters["faang"] else ~at(self.faang))
+        lo, hi = filters.get("min_acceptance"), filters.get("max_acceptance")
+        if lo is not None or hi is not None:
+            acceptance = at(self.acceptance)
+            # NaN (unknown acceptance) never passes a range
+            with np.errstate(invalid="ignore"):
+                ok = np.isfinite(acceptance)
+                if lo is not None:
+                    ok &= acceptance >= lo
+                if hi is not None:
+                    ok &= acceptance <= hi
+            checks.append(ok)
+
+        if not checks:
+            return rows
+        keep = np.logical_and.reduce(checks) if len(checks) > 1 else checks[0]
+        return np.flatnonzero(keep) if rows is None else rows[keep]
+
+    def stats(self) -> dict:
+        return {"rows": self.n, "companies": len(self.company_names),
+                "company_postings": int(len(self.postings)), "difficulties": sorted(self.difficulty_masks)}
+
+
+def _values(params: Mapping, key: str) -> List[str]:
+    """All values of `key`: repeated form fields, JSON lists or a comma-separated string."""
+    getlist = getattr(params, "getlist", None)
+    raw = getlist(key) if getlist is not None else params.get(key)
+    if raw is None:
+        return []
+    if isinstance(raw, str):
+        raw = [raw]
+    out = []
+    for item in raw:
+        out.extend(_split_names(item) if isinstance(item, str) else [str(item)])
+    return out
+
+
+def parse_filters(params: Mapping) -> Optional[dict]:
+    """Filter spec from request parameters (form or JSON); None when no filter is given.
+
+    Accepts `company`/`companies`, `difficulty`, `faang` and `min_acceptance`/`max_acceptance`
+    (percent, as in the catalog). Raises ValueError for malformed numbers.
+    """
+    spec = {}
+    companies = _values(params, "companies") + _values(params, "company")
+    if companies:
+        spec["companies"] = companies
+    difficulty = _values(params, "difficulty")
+    if difficulty:
+        spec["difficulty"] = difficulty
+    faang = params.get("faang")
+    if faang is not None and str(faang).strip() != "":
+        spec["faang"] = faang if isinstance(faang, bool) else str(faang).strip().lower() in _TRUE
+    for key in ("min_acceptance", "max_acceptance"):
+        value = params.get(key)
+        if value is not None and str(value).strip() != "":
+            try:
+                spec[key] = float(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{key} must be a number, got {value!r}")
+    return spec or None
@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Iterable, Optional, Set
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    username TEXT NOT NULL,
+    title TEXT NOT NULL,
+    added_at REAL NOT NULL,
+    PRIMARY KEY (username, title)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class HistoryStore:
+    """Per-user history of recommended titles, stored in SQLite in WAL mode.
+
+    Reads and appends touch only one user's rows (primary key lookups), so their cost does not
+    grow with the total number of users. WAL lets readers proceed while another process writes,
+    and `INSERT OR IGNORE` makes concurrent appends from several workers safe without losing
+    writes. Titles are stored normalized (lowercased, stripped).
+    """
+
+    def __init__(self, path: str, legacy_json: Optional[str] = None, timeout: float = 10.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        if legacy_json:
+            self.migrate_json(legacy_json)
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _norm(titles: Iterable[str]) -> Set[str]:
+        return set(t.lower().strip() for t in titles if t and t.strip())
+
+    def get(self, username: str) -> Set[str]:
+        if not username:
+            return set()
+        rows = self._conn().execute("SELECT title FROM history WHERE username = ?", (username,))
+        return set(r[0] for r in rows)
+
+    def add(self, username: str, titles: Iterable[str]) -> None:
+        if not username:
+            return
+        now = time.time()
+        rows = [(username, t, now) for t in self._norm(titles)]
+        if not rows:
+            return
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("INSERT OR IGNORE INTO history (username, title, added_at) VALUES (?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def migrate_json(self, path: str) -> int:
+        """One-time import of the old `{username: [titles]}` JSON file; returns rows imported.
+
+        The import and its completion marker commit in one write transaction, so when several
+        workers start together exactly one of them performs it.
+        """
+        if not os.path.exists(path):
+            return 0
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            done = conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+            if done is not None:
+                conn.execute("ROLLBACK")
+                return 0
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    hist = json.load(f)
+            except (OSError, ValueError):
+                hist = {}
+            now = time.time()
+            rows = [(user, t, now) for user, titles in hist.items() for t in self._norm(titles or [])]
+            conn.executemany("INSERT OR IGNORE INTO history (username, title, added_at) VALUES (?, ?, ?)", rows)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)", (os.path.abspath(path),))
+            conn.execute("COMMIT")
+            return len(rows)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
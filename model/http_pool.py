@@ -0,0 +1,94 @@
+import time
+import random
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Blocking token-bucket rate limiter shared by all threads of a client.
+
+    Allows bursts of up to `burst` requests and `rate` requests per second sustained.
+    `rate=None` disables limiting.
+    """
+
+    def __init__(self, rate: Optional[float], burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class PooledSession:
+    """`requests.Session` with a sized connection pool, a token-bucket limit and retries.
+
+    Retries connection errors and 429/5xx responses with exponential backoff plus jitter,
+    honouring `Retry-After` when the server sends one. Every attempt, including retries, takes a
+    token, so retries cannot push the client over its configured rate.
+    """
+
+    def __init__(self, pool_size: int = 8, rate: Optional[float] = 2.0, burst: int = 2,
+                 max_retries: int = 4, backoff: float = 0.5, max_backoff: float = 30.0,
+                 timeout: float = 30.0):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.limiter = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.requests = 0
+        self.retries = 0
+
+    def _delay(self, attempt: int, resp: Optional[requests.Response]) -> float:
+        if resp is not None:
+            retry_after = resp.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(self.max_backoff, float(retry_after))
+                except ValueError:
+                    pass
+        return min(self.max_backoff, self.backoff * (2 ** attempt)) * (0.5 + random.random() / 2)
+
+    def post(self, url: str, json: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """POST with rate limiting and retries; returns the last response (which may be an error)."""
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            self.requests += 1
+            resp = None
+            try:
+                resp = self.session.post(url, json=json, headers=headers, timeout=self.timeout)
+                if resp.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return resp
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+            self.retries += 1
+            time.sleep(self._delay(attempt, resp))
+            attempt += 1
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "retries": self.retries, "rate": self.limiter.rate}
@@ -1,133 +1,253 @@
-import requests
+import os
 import json
-import time
-from typing import List, Dict, Any
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import pandas as pd
 
+from cache import SingleFlight, TTLCache
+from http_pool import PooledSession
+from metrics import UPSTREAM_REQUESTS, stage, timed
+from problem_catalog import ProblemCatalog
+
+
+USER_QUERY = """
+query userProblemsSolved($username: String!) {
+  allQuestionsCount {
+    difficulty
+    count
+  }
+  matchedUser(username: $username) {
+    submitStatsGlobal {
+      acSubmissionNum {
+        difficulty
+        count
+      }
+    }
+    submissionCalendar
+    submitStats {
+      acSubmissionNum {
+        difficulty
+        count
+      }
+    }
+  }
+  userContestRanking(username: $username) {
+    attendedContestsCount
+    rating
+    globalRanking
+    topPercentage
+  }
+}
+"""
+
+# Problem metadata only; this is what the shared catalog stores
+CATALOG_QUERY = """
+query problemsetQuestionList($categorySlug: String, $limit: Int, $skip: Int, $filters: QuestionListFilterInput) {
+  problemsetQuestionList: questionList(
+    categorySlug: $categorySlug
+    limit: $limit
+    skip: $skip
+    filters: $filters
+  ) {
+    total: totalNum
+    questions: data {
+      acRate
+      difficulty
+      title
+      topicTags {
+        name
+      }
+    }
+  }
+}
+"""
+
+# User-specific part: just the accepted questions' titles and status
+STATUS_QUERY = """
+query problemsetQuestionList($categorySlug: String, $limit: Int, $skip: Int, $filters: QuestionListFilterInput) {
+  problemsetQuestionList: questionList(
+    categorySlug: $categorySlug
+    limit: $limit
+    skip: $skip
+    filters: $filters
+  ) {
+    total: totalNum
+    questions: data {
+      title
+      status
+    }
+  }
+}
+"""
+
 
 class LeetCodeClient:
-    """Client for fetching user's solved problems from LeetCode GraphQL API."""
-    
-    def __init__(self):
-        self.base_url = "https://leetcode.com/graphql"
+    """Client for fetching user's solved problems from LeetCode GraphQL API.
+
+    Problem metadata comes from a locally stored `ProblemCatalog` that is synced incrementally
+    every `catalog_refresh` seconds; per-user calls only fetch the user's accepted titles.
+    Set `LEETCODE_GRAPHQL_URL` (or pass `base_url`) to point the client at a local stand-in.
+
+    All requests share one pooled session limited to `rate` requests/second (`LEETCODE_RATE`).
+    Paginated lists read `total` from the first page and fetch the remaining offsets with up to
+    `concurrency` requests in flight. The user lookup runs alongside the accepted-titles listing
+    via `submit(fn, *args) -> Future`, by default on one executor shared by all calls. Every
+    in-flight user fetch holds one of its `lookup_workers` threads (LEETCODE_LOOKUP_WORKERS,
+    default 32 like SERVE_IO_WORKERS), so it bounds how many users are fetched at once. It must
+    not be the pool the fetch itself runs on, which could starve it.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, catalog_path: Optional[str] = None,
+                 catalog_refresh: Optional[float] = None, page_size: int = 100,
+                 concurrency: int = 4, rate: Optional[float] = None,
+                 submit: Optional[Callable[..., Future]] = None, lookup_workers: Optional[int] = None):
+        self.base_url = base_url or os.environ.get("LEETCODE_GRAPHQL_URL", "https://leetcode.com/graphql")
         self.headers = {
             "Content-Type": "application/json",
             "User-Agent": "Mozilla/5.0"  # Simple UA to avoid 403
         }
+        if catalog_refresh is None:
+            catalog_refresh = float(os.environ.get("LEETCODE_CATALOG_REFRESH", 24 * 3600))
+        self.catalog = ProblemCatalog(path=catalog_path, refresh_interval=catalog_refresh)
+        self.page_size = page_size
+        self.concurrency = max(1, concurrency)
+        if rate is None:
+            rate = float(os.environ.get("LEETCODE_RATE", 4))
+        if lookup_workers is None:
+            lookup_workers = int(os.environ.get("LEETCODE_LOOKUP_WORKERS", 32))
+        self.lookup_workers = max(1, lookup_workers)
+        # connections for the concurrent lookups as well as one fetch's pages
+        self.http = PooledSession(pool_size=max(self.concurrency, self.lookup_workers), rate=rate,
+                                  burst=self.concurrency)
+        if submit is None:
+            submit = ThreadPoolExecutor(max_workers=self.lookup_workers, thread_name_prefix="leetcode").submit
+        self._submit = submit
 
-    def get_user_solved_problems(self, username: str) -> List[Dict[str, Any]]:
-        """Get list of problems solved by user, with difficulty and topics."""
-        query = """
-        query userProblemsSolved($username: String!) {
-          allQuestionsCount {
-            difficulty
-            count
-          }
-          matchedUser(username: $username) {
-            submitStatsGlobal {
-              acSubmissionNum {
-                difficulty
-                count
-              }
-            }
-            submissionCalendar
-            submitStats {
-              acSubmissionNum {
-                difficulty
-                count
-              }
-            }
-          }
-          userContestRanking(username: $username) {
-            attendedContestsCount
-            rating
-            globalRanking
-            topPercentage
-          }
-        }
-        """
-        
-        detail_query = """
-        query problemsetQuestionList($categorySlug: String, $skip: Int, $filters: QuestionListFilterInput) {
-          problemsetQuestionList: questionList(
-            categorySlug: $categorySlug
-            skip: $skip
-            filters: $filters
-          ) {
-            total: totalNum
-            questions: data {
-              acRate
-              difficulty
-              title
-              topicTags {
-                name
-              }
-              status
-            }
-          }
-        }
+    def _post(self, query: str, variables: Dict[str, Any], what: str) -> Dict[str, Any]:
+        outcome = "error"
+        try:
+            with stage("leetcode_request"):
+                resp = self.http.post(
+                    self.base_url,
+                    headers=self.headers,
+                    json={"query": query, "variables": variables}
+                )
+            if not resp.ok:
+                outcome = "http_error"
+                raise Exception(f"Failed to fetch {what}: {resp.status_code}")
+
+            data = resp.json()
+            if "errors" in data:
+                outcome = "graphql_error"
+                raise Exception(f"GraphQL errors: {data['errors']}")
+            outcome = "ok"
+            return data
+        finally:
+            UPSTREAM_REQUESTS.inc(service="leetcode", outcome=outcome)
+
+    def _fetch_page(self, query: str, skip: int, filters: Optional[Dict] = None) -> Tuple[int, List[Dict]]:
+        data = self._post(query, {
+            "categorySlug": "",
+            "limit": self.page_size,
+            "skip": skip,
+            "filters": filters or {}
+        }, "problems")
+        page = data["data"]["problemsetQuestionList"]
+        return page["total"], page["questions"]
+
+    def _fetch_from(self, query: str, skip: int = 0, filters: Optional[Dict] = None) -> Tuple[int, List[Dict]]:
+        """Fetch every question from offset `skip` to the end of the list.
+
+        The first page tells us `total`; the remaining offsets are then fetched concurrently
+        (bounded by `concurrency` and the session's rate limit) and stitched back in order.
         """
+        total, first = self._fetch_page(query, skip, filters)
+        if not first:
+            return total, []
+        offsets = list(range(skip + len(first), total, len(first)))
+        if not offsets:
+            return total, list(first)
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(offsets))) as pool:
+            pages = list(pool.map(lambda off: self._fetch_page(query, off, filters)[1], offsets))
+        questions = list(first)
+        for page in pages:
+            questions.extend(page)
+        return total, questions
 
-        # First get overall stats
-        resp = requests.post(
-            self.base_url,
-            headers=self.headers,
-            json={"query": query, "variables": {"username": username}}
-        )
-        if not resp.ok:
-            raise Exception(f"Failed to fetch user data: {resp.status_code}")
-
-        data = resp.json()
-        if "errors" in data:
-            raise Exception(f"GraphQL errors: {data['errors']}")
-
-        # Now get problem details - paginate through all problems
-        all_problems = []
-        skip = 0
-        while True:
-            resp = requests.post(
-                self.base_url,
-                headers=self.headers,
-                json={
-                    "query": detail_query,
-                    "variables": {
-                        "categorySlug": "",
-                        "skip": skip,
-                        "filters": {}
-                    }
-                }
-            )
-            if not resp.ok:
-                raise Exception(f"Failed to fetch problems: {resp.status_code}")
+    @timed("catalog_sync")
+    def sync_catalog(self, force: bool = False) -> int:
+        """Bring the local problem catalog up to date; returns the number of new problems."""
+        return self.catalog.sync(lambda skip: self._fetch_from(CATALOG_QUERY, skip), force=force)
 
-            problems_data = resp.json()
-            if "errors" in problems_data:
-                raise Exception(f"GraphQL errors: {problems_data['errors']}")
+    def _fetch_accepted_titles(self) -> List[str]:
+        _, questions = self._fetch_from(STATUS_QUERY, 0, filters={"status": "AC"})
+        return [q["title"] for q in questions if q.get("status") == "ac"]
 
-            problems = problems_data["data"]["problemsetQuestionList"]["questions"]
-            if not problems:
-                break
+    @timed("leetcode_fetch")
+    def get_user_solved_problems(self, username: str) -> List[Dict[str, Any]]:
+        """Get list of problems solved by user, with difficulty and topics.
 
-            all_problems.extend(problems)
-            skip += len(problems)
-            time.sleep(1)  # Be nice to LC API
+        The user lookup (which validates the username) and the accepted-titles listing are
+        independent, so they are in flight together; a lookup error still wins.
+        """
+        user = self._submit(self._post, USER_QUERY, {"username": username}, "user data")
+        try:
+            if self.catalog.needs_refresh():
+                self.sync_catalog()
+            titles = self._fetch_accepted_titles()
+        finally:
+            user.result()
 
         # Convert to DataFrame matching our CSV format
         rows = []
-        for p in all_problems:
-            if p["status"] == "ac":  # Only include solved
-                rows.append({
-                    "title": p["title"],
-                    "difficulty": p["difficulty"].lower(),
-                    "topic_tags": ",".join(t["name"] for t in p["topicTags"]),
-                    "status": "solved"
-                })
+        for title in titles:
+            p = self.catalog.lookup(title) or {"title": title, "difficulty": "", "topicTags": []}
+            rows.append({
+                "title": p["title"],
+                "difficulty": (p.get("difficulty") or "").lower(),
+                "topic_tags": ",".join(p["topicTags"]),
+                "status": "solved"
+            })
 
         return pd.DataFrame(rows)
 
 
+class CoalescingLeetCodeClient(LeetCodeClient):
+    """`LeetCodeClient` that shares user fetches between concurrent and back-to-back requests.
+
+    The UI typically fires `/analyze` and `/recommend` for the same username together; with
+    this client the concurrent calls join one in-flight fetch, and calls within `result_ttl`
+    seconds afterwards are served from a short-lived result cache.
+    """
+
+    def __init__(self, *args, result_ttl: float = 30.0, max_users: int = 512, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.flight = SingleFlight()
+        self.results = TTLCache(maxsize=max_users, ttl=result_ttl)
+
+    def _fetch_and_cache(self, username: str) -> pd.DataFrame:
+        df = super().get_user_solved_problems(username)
+        self.results.set(username, df)
+        return df
+
+    @timed("leetcode_user")
+    def get_user_solved_problems(self, username: str) -> pd.DataFrame:
+        df = self.results.get(username)
+        if df is None:
+            df = self.flight.do(username, lambda: self._fetch_and_cache(username))
+        # callers may add columns; never hand out the shared frame itself
+        return df.copy()
+
+    def stats(self) -> dict:
+        return {
+            "single_flight": self.flight.stats(),
+            "result_cache": self.results.stats(),
+            "http": self.http.stats(),
+        }
+
+
 if __name__ == "__main__":
     # Quick test
     client = LeetCodeClient()
     df = client.get_user_solved_problems("someuser")
-    print(f"Found {len(df)} solved problems")
\ No newline at end of file
+    print(f"Found {len(df)} solved problems")
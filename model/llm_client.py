@@ -1,4 +1,24 @@
 import os
+import json
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache import TTLCache
+from metrics import UPSTREAM_REQUESTS, observe_stage
+
+
+SYSTEM_PROMPT = (
+    "You are a helpful coding tutor assistant. Be concise and actionable. "
+    "When a user asks for problem recommendations, provide a short study plan (2-3 steps), "
+    "explain why the recommended problems help, and list the top recommended problem titles. "
+    "Do not invent problem content; only reference titles provided in context."
+)
 
 
 class LLMClient:
@@ -7,28 +27,113 @@ class LLMClient:
     Usage:
       - Set environment variable OPENAI_API_KEY to enable OpenAI usage.
       - Optionally set LLM_MODEL to use a different model (default: gpt-3.5-turbo).
+      - OPENAI_BASE_URL points at any OpenAI-compatible `/chat/completions` server.
+
+    This wrapper provides generate_reply(...) which returns a string reply, and stream_reply(...)
+    which yields the reply as it is generated. If no API key is present, the client will be
+    disabled and generate_reply will return None.
 
-    This wrapper provides generate_reply(...) which returns a string reply.
-    If no API key is present, the client will be disabled and generate_reply will return None.
+    Calls are bounded so a slow provider cannot hold request workers:
+      - LLM_TIMEOUT: latency budget in seconds (default 5); past it generate_reply returns None
+        and the caller uses its template reply. The completion keeps running in the pool and
+        still fills the cache when it lands.
+      - LLM_MAX_CONCURRENCY: completions in flight (default 4); when all slots are busy the call
+        is skipped rather than queued.
+      - LLM_CACHE_TTL: replies are cached by a hash of the weak topics and recommended titles
+        (default 3600 seconds), so the same study plan is generated once.
     """
 
-    def __init__(self):
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None, model: Optional[str] = None,
+                 timeout: Optional[float] = None, max_concurrency: Optional[int] = None,
+                 cache_ttl: Optional[float] = None, stream_timeout: Optional[float] = None):
         self.provider = os.environ.get('LLM_PROVIDER', 'openai').lower()
-        self.api_key = os.environ.get('OPENAI_API_KEY')
-        self.model = os.environ.get('LLM_MODEL', 'gpt-3.5-turbo')
+        self.api_key = api_key if api_key is not None else os.environ.get('OPENAI_API_KEY')
+        self.model = model or os.environ.get('LLM_MODEL', 'gpt-3.5-turbo')
+        self.base_url = (base_url or os.environ.get('OPENAI_BASE_URL', 'https://api.openai.com/v1')).rstrip('/')
+        self.timeout = timeout if timeout is not None else float(os.environ.get('LLM_TIMEOUT', 5.0))
+        self.stream_timeout = stream_timeout if stream_timeout is not None else float(os.environ.get('LLM_STREAM_TIMEOUT', 30.0))
+        if max_concurrency is None:
+            max_concurrency = int(os.environ.get('LLM_MAX_CONCURRENCY', 4))
+        if cache_ttl is None:
+            cache_ttl = float(os.environ.get('LLM_CACHE_TTL', 3600))
         self.enabled = bool(self.api_key and self.provider == 'openai')
-        self._client = None
-        if self.enabled:
-            try:
-                import openai
-                openai.api_key = self.api_key
-                self._client = openai
-            except Exception:
-                self.enabled = False
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_concurrency, pool_maxsize=max_concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='llm')
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._cache = TTLCache(maxsize=1024, ttl=cache_ttl)
+        self.max_concurrency = max_concurrency
+        self.completions = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.errors = 0
 
     def is_enabled(self):
         return self.enabled
 
+    def _prompt(self, user_message: str, recommendations=None, weak_topics=None) -> Tuple[List[dict], str]:
+        """Chat messages for the request, plus the cache key (hash of weak topics + titles)."""
+        rec_titles = []
+        if recommendations:
+            for r in recommendations[:6]:
+                title = r.get('title') if isinstance(r, dict) else str(r)
+                if title:
+                    rec_titles.append(title)
+
+        weak_text = ''
+        if weak_topics:
+            if isinstance(weak_topics, (list, tuple)):
+                weak_text = ', '.join([t if isinstance(t, str) else str(t[0]) for t in weak_topics[:5]])
+            else:
+                weak_text = str(weak_topics)
+
+        user_prompt = f"User message: {user_message}\n"
+        if weak_text:
+            user_prompt += f"Weak topics: {weak_text}\n"
+        if rec_titles:
+            user_prompt += f"Candidate problems: {', '.join(rec_titles)}\n"
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt},
+        ]
+        key = hashlib.sha256(json.dumps([self.model, weak_text, rec_titles]).encode('utf-8')).hexdigest()
+        return messages, key
+
+    def _request(self, messages: List[dict], stream: bool = False) -> requests.Response:
+        try:
+            resp = self.session.post(
+                f"{self.base_url}/chat/completions",
+                json={"model": self.model, "messages": messages, "max_tokens": 300, "temperature": 0.7, "stream": stream},
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                timeout=(self.timeout, self.timeout),
+                stream=stream,
+            )
+            resp.raise_for_status()
+        except requests.HTTPError:
+            UPSTREAM_REQUESTS.inc(service="llm", outcome="http_error")
+            raise
+        except Exception:
+            UPSTREAM_REQUESTS.inc(service="llm", outcome="error")
+            raise
+        UPSTREAM_REQUESTS.inc(service="llm", outcome="ok")
+        return resp
+
+    def _complete(self, messages: List[dict], key: str) -> str:
+        try:
+            data = self._request(messages).json()
+            text = ''
+            if data and data.get('choices'):
+                text = data['choices'][0].get('message', {}).get('content', '') or ''
+            self.completions += 1
+            if text:
+                self._cache.set(key, text)
+            return text
+        finally:
+            self._slots.release()
+
     def generate_reply(self, user_message: str, context_text: str = '', recommendations=None, weak_topics=None) -> str:
         """Generate a conversational reply using the LLM.
 
@@ -37,55 +142,98 @@ class LLMClient:
         - recommendations: list of dicts with 'title' and optional fields
         - weak_topics: list of strings
 
-        Returns a string reply or None if LLM is disabled.
+        Returns a string reply, or None if the LLM is disabled, busy, over budget or failing.
         """
-        if not self.enabled or self._client is None:
+        if not self.enabled:
             return None
-
-        # Build a concise prompt using system/user messages
+        messages, key = self._prompt(user_message, recommendations, weak_topics)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            return None
+        started = time.perf_counter()
         try:
-            # Build messages for chat completion
-            rec_titles = []
-            if recommendations:
-                for r in recommendations[:6]:
-                    title = r.get('title') if isinstance(r, dict) else str(r)
-                    if title:
-                        rec_titles.append(title)
-
-            weak_text = ''
-            if weak_topics:
-                if isinstance(weak_topics, (list, tuple)):
-                    weak_text = ', '.join([t if isinstance(t, str) else str(t[0]) for t in weak_topics[:5]])
-                else:
-                    weak_text = str(weak_topics)
-
-            system_prompt = (
-                "You are a helpful coding tutor assistant. Be concise and actionable. "
-                "When a user asks for problem recommendations, provide a short study plan (2-3 steps), "
-                "explain why the recommended problems help, and list the top recommended problem titles. "
-                "Do not invent problem content; only reference titles provided in context." 
-            )
-
-            user_prompt = f"User message: {user_message}\n"
-            if weak_text:
-                user_prompt += f"Weak topics: {weak_text}\n"
-            if rec_titles:
-                user_prompt += f"Candidate problems: {', '.join(rec_titles)}\n"
-
-            # Use the OpenAI ChatCompletion API
-            resp = self._client.ChatCompletion.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=300,
-                temperature=0.7,
-            )
-            text = ''
-            if resp and 'choices' in resp and len(resp['choices']) > 0:
-                text = resp['choices'][0].get('message', {}).get('content', '')
-            return text
+            future = self._pool.submit(self._complete, messages, key)
+        except Exception:
+            self._slots.release()
+            raise
+        try:
+            return future.result(timeout=self.timeout) or None
+        except FutureTimeout:
+            self.timeouts += 1
+            return None
         except Exception:
             # If the LLM call fails, silently return None so the app falls back
+            self.errors += 1
             return None
+        finally:
+            observe_stage("llm_reply", time.perf_counter() - started)
+
+    def stream_reply(self, user_message: str, recommendations=None, weak_topics=None) -> Iterator[str]:
+        """Yield the reply in pieces as the provider streams it.
+
+        Yields nothing when the LLM is disabled, busy or fails before the first token, so callers
+        can fall back to their template reply. The wait for each chunk is bounded by LLM_TIMEOUT
+        and the whole stream by LLM_STREAM_TIMEOUT; complete replies are cached.
+        """
+        if not self.enabled:
+            return
+        messages, key = self._prompt(user_message, recommendations, weak_topics)
+        cached = self._cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            return
+        resp = None
+        started = time.perf_counter()
+        try:
+            deadline = time.monotonic() + self.stream_timeout
+            try:
+                resp = self._request(messages, stream=True)
+            except Exception:
+                self.errors += 1
+                return
+            parts = []
+            try:
+                for line in resp.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith('data:'):
+                        continue
+                    payload = line[len('data:'):].strip()
+                    if payload == '[DONE]':
+                        break
+                    choices = json.loads(payload).get('choices') or [{}]
+                    piece = (choices[0].get('delta') or {}).get('content')
+                    if piece:
+                        if not parts:
+                            observe_stage("llm_first_token", time.perf_counter() - started)
+                        parts.append(piece)
+                        yield piece
+                    if time.monotonic() > deadline:
+                        self.timeouts += 1
+                        return
+            except (requests.RequestException, ValueError):
+                self.errors += 1
+                return
+            self.completions += 1
+            if parts:
+                self._cache.set(key, ''.join(parts))
+        finally:
+            if resp is not None:
+                resp.close()
+            self._slots.release()
+            observe_stage("llm_stream", time.perf_counter() - started)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "max_concurrency": self.max_concurrency,
+            "completions": self.completions,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "cache": self._cache.stats(),
+        }
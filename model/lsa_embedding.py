@@ -0,0 +1,73 @@
+"""Dense LSA embedding of the TF-IDF space, behind the optional "lsa" scoring engine.
+
+At fit time the TF-IDF matrix is reduced to `dim` latent dimensions with truncated SVD and
+every catalog row is kept as an L2-normalized float32 vector. A query is projected once with
+the same components, so cosine similarity against the catalog is one dense float32
+matrix-vector product instead of a sparse one. The neighbour graph and the RF features stay
+on the TF-IDF matrix.
+
+Embeddings are persisted per dataset version and dimension through `artifact_store` and
+memory-mapped on load.
+"""
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.decomposition import TruncatedSVD
+
+from artifact_store import load_arrays, read_meta, write_artifact
+
+
+# Scoring engines a `Recommender` can be fitted with
+ENGINES = ("sparse", "lsa")
+# Bump when the on-disk layout changes so old embeddings are rebuilt instead of misread
+FORMAT_VERSION = 1
+ARRAYS = ("components", "embedding")
+
+
+def embedding_path(root: str, digest: str, dim: int) -> str:
+    """Directory holding the `dim`-dimensional embedding for the dataset with content hash `digest`."""
+    return os.path.join(root, f"lsa-v{FORMAT_VERSION}-{dim}-{digest[:16]}")
+
+
+def project(tfidf_rows, components: np.ndarray) -> np.ndarray:
+    """TF-IDF rows mapped to the latent space and L2-normalized (float32, one row per input row).
+
+    Rows without any latent weight (e.g. only out-of-vocabulary terms) stay all-zero.
+    """
+    dense = np.asarray(csr_matrix(tfidf_rows) @ components.T, dtype=np.float32)
+    norms = np.linalg.norm(dense, axis=1, keepdims=True)
+    return dense / np.where(norms > 0, norms, 1).astype(np.float32)
+
+
+def fit_lsa(tfidf_matrix, dim: int = 64, random_state: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """(components, embedding): a `dim` x n_features float32 projection and the projected rows.
+
+    `dim` is capped below the matrix's smaller side, which truncated SVD requires.
+    """
+    X = csr_matrix(tfidf_matrix)
+    dim = max(1, min(dim, min(X.shape) - 1))
+    if min(X.shape) < 2:
+        # nothing to reduce: an identity projection onto the (at most one) feature
+        components = np.eye(1, X.shape[1], dtype=np.float32)
+    else:
+        svd = TruncatedSVD(n_components=dim, algorithm="randomized", n_iter=5, random_state=random_state)
+        components = svd.fit(X).components_.astype(np.float32)
+    return components, project(X, components)
+
+
+def save_embedding(path: str, components: np.ndarray, embedding: np.ndarray) -> str:
+    """Write float32 `components` and `embedding` to `path` (see `artifact_store.write_artifact`)."""
+    arrays = {"components": np.asarray(components, dtype=np.float32),
+              "embedding": np.asarray(embedding, dtype=np.float32)}
+    meta = {"rows": int(embedding.shape[0]), "dim": int(embedding.shape[1]), "features": int(components.shape[1])}
+    return write_artifact(path, arrays, meta, FORMAT_VERSION)
+
+
+def load_embedding(path: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """(components, embedding) memory-mapped from `path`, or None if missing/incompatible."""
+    if read_meta(path, FORMAT_VERSION) is None:
+        return None
+    arrays = load_arrays(path, ARRAYS)
+    return arrays["components"], arrays["embedding"]
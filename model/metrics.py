@@ -0,0 +1,226 @@
+"""In-process metrics for the model service, rendered in the Prometheus text format.
+
+Hot paths wrap their work in `stage("name")` (or decorate with `@timed("name")`), which records
+the duration in the `ultron_stage_seconds` histogram. When a request opted into profiling
+(`start_profile(True)`), the same timings are also collected per request so the response can
+carry a stage breakdown. Point-in-time values (model version, cache hit ratios, ...) come from
+collector callbacks evaluated at scrape time.
+"""
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label combination."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels.get(n, "")) for n in self.labelnames), 0)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label combination (Prometheus semantics)."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # per-bucket (non-cumulative) counts, then sum and count
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(str(labels.get(n, "")) for n in self.labelnames))
+        return series[2] if series else 0
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._series.items())
+        names = self.labelnames + ("le",)
+        for key, (counts, total, n) in items:
+            running = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                running += c
+                yield f"{self.name}_bucket{_labels(names, key + (_number(bound),))} {running}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {n}"
+
+
+# A collector returns (name, help, type, labels, value) tuples evaluated at scrape time
+Collector = Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._collectors: List[Collector] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets)
+
+    def add_collector(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        # samples of one family must be contiguous, so group collector rows by name
+        families: Dict[str, list] = {}
+        for collector in self._collectors:
+            try:
+                rows = list(collector())
+            except Exception:
+                continue
+            for name, help, kind, labels, value in rows:
+                if value is None:
+                    continue
+                if name not in families:
+                    families[name] = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+                names = tuple(labels)
+                families[name].append(f"{name}{_labels(names, tuple(labels[n] for n in names))} {_number(value)}")
+        for family in families.values():
+            lines.extend(family)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+STAGE_SECONDS = REGISTRY.histogram("ultron_stage_seconds", "Time spent in each hot-path stage.", ("stage",))
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    "ultron_upstream_requests_total", "HTTP calls made to upstream services.", ("service", "outcome"))
+
+_local = threading.local()
+
+
+def start_profile(enabled: bool) -> None:
+    """Begin collecting a stage breakdown for the current request (thread) when `enabled`."""
+    _local.stages = [] if enabled else None
+
+
+def finish_profile() -> Optional[List[Tuple[str, float]]]:
+    """End the current request's profile and return its (stage, seconds) list, if any."""
+    stages = getattr(_local, "stages", None)
+    _local.stages = None
+    return stages
+
+
+def current_profile() -> Optional[List[Tuple[str, float]]]:
+    """The stage list being collected on this thread (None when not profiling)."""
+    return getattr(_local, "stages", None)
+
+
+@contextmanager
+def use_profile(stages: Optional[List[Tuple[str, float]]]):
+    """Record stages on this thread into `stages`, e.g. a request's profile in a pool worker."""
+    previous = getattr(_local, "stages", None)
+    _local.stages = stages
+    try:
+        yield
+    finally:
+        _local.stages = previous
+
+
+def observe_stage(name: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage=name)
+    stages = getattr(_local, "stages", None)
+    if stages is not None:
+        stages.append((name, seconds))
+
+
+@contextmanager
+def stage(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - started)
+
+
+def timed(name: str):
+    """Decorator form of `stage`."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def server_timing(stages: Sequence[Tuple[str, float]]) -> str:
+    """`Server-Timing` header value for a profile; repeated stages are summed, in first-seen order."""
+    totals: Dict[str, float] = {}
+    for name, seconds in stages:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ", ".join(f"{name};dur={seconds * 1e3:.3f}" for name, seconds in totals.items())
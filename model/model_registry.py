@@ -0,0 +1,256 @@
+import io
+import os
+import time
+import hashlib
+import threading
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from artifact_store import prune_artifacts
+from dataset_store import dataset_path
+from lsa_embedding import embedding_path
+from metrics import timed
+from neighbor_graph import neighbors_path
+from recommender import Recommender
+from tfidf_artifact import artifact_path
+
+
+class ModelRegistry:
+    """Versioned holder of fitted `Recommender` snapshots.
+
+    - Fits once and hands the same fitted instance to every caller.
+    - A published snapshot is never mutated; a refit builds a new instance and swaps it in.
+    - Refits only when the dataset changes: the file's mtime/size is checked cheaply and the
+      content hash (which doubles as the model version) is recomputed only when those move.
+    - With `artifact_dir` set, the fitted TF-IDF state is persisted per content hash and
+      memory-mapped by every worker, so only the first process to see a dataset fits it. The
+      CSV itself is converted once into a typed columnar copy there, which later fits load.
+    - When the file only grew by whole rows (e.g. `append_new_problems`), the new rows are
+      ingested with `Recommender.extend` against the current vocabulary. A full refit happens
+      once the vocabulary drift of ingested rows exceeds `drift_threshold`, or `refit_interval`
+      seconds after the last full fit if rows have been ingested since.
+    - Each snapshot is fitted with the scoring `engine` configured when it was built ("sparse"
+      TF-IDF, or "lsa" with an `lsa_dim`-dimensional embedding); `refresh` can switch it.
+      LSA snapshots get their own feature version, so cached profiles and forests never mix.
+    """
+
+    def __init__(self, system_csv: str = "cleaned_leetcode_dataset.csv", check_interval: float = 1.0,
+                 artifact_dir: Optional[str] = None, drift_threshold: Optional[float] = None,
+                 refit_interval: Optional[float] = None, engine: Optional[str] = None,
+                 lsa_dim: Optional[int] = None):
+        path = system_csv
+        if not os.path.isabs(path):
+            path = os.path.join(os.path.dirname(__file__), path)
+        self.system_csv = path
+        self.check_interval = check_interval
+        self.artifact_dir = artifact_dir
+        if drift_threshold is None:
+            drift_threshold = float(os.environ.get("MODEL_VOCAB_DRIFT", 0.05))
+        if refit_interval is None:
+            refit_interval = float(os.environ.get("MODEL_REFIT_INTERVAL", 6 * 3600))
+        self.drift_threshold = drift_threshold
+        self.refit_interval = refit_interval
+        self.engine = engine or os.environ.get("MODEL_ENGINE", "sparse")
+        self.lsa_dim = lsa_dim or int(os.environ.get("MODEL_LSA_DIM", 64))
+        self._model: Optional[Recommender] = None
+        self._stat = None
+        self._digest = None
+        self._ends_with_newline = False
+        self._last_check = 0.0
+        self._last_full_fit = 0.0
+        self._fit_lock = threading.Lock()
+        self.fit_count = 0
+        self.ingest_count = 0
+
+    def _file_stat(self):
+        st = os.stat(self.system_csv)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _file_digest(self, prefix_size: int = 0) -> Tuple[str, Optional[str]]:
+        """Return (digest of the file, digest of its first `prefix_size` bytes or None), in one pass."""
+        h = hashlib.sha256()
+        prefix = None
+        with open(self.system_csv, "rb") as f:
+            if prefix_size:
+                remaining = prefix_size
+                while remaining > 0:
+                    chunk = f.read(min(1 << 20, remaining))
+                    if not chunk:
+                        break
+                    h.update(chunk)
+                    remaining -= len(chunk)
+                if remaining == 0:
+                    prefix = h.hexdigest()
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest(), prefix
+
+    def _tail_is_newline(self) -> bool:
+        with open(self.system_csv, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _is_stale(self) -> bool:
+        """Return True when the dataset on disk differs from the active snapshot."""
+        now = time.time()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        stat = self._file_stat()
+        if stat == self._stat:
+            return False
+        # mtime/size moved: only a content change warrants a refit (e.g. `touch` does not)
+        digest, _ = self._file_digest()
+        if digest == self._digest:
+            self._stat = stat
+            return False
+        return True
+
+    def _fit(self) -> Recommender:
+        stat = self._file_stat()
+        digest, _ = self._file_digest()
+        started = time.time()
+        model = Recommender(system_csv=self.system_csv, engine=self.engine, lsa_dim=self.lsa_dim)
+        artifact = artifact_path(self.artifact_dir, digest) if self.artifact_dir else None
+        dataset = dataset_path(self.artifact_dir, digest) if self.artifact_dir else None
+        embedding = embedding_path(self.artifact_dir, digest, self.lsa_dim) if self.artifact_dir else None
+        model.fit(artifact=artifact, dataset=dataset, embedding=embedding)
+        if model.artifact_path:
+            prune_artifacts(self.artifact_dir, keep=model.artifact_path, prefix="tfidf-")
+        if model.dataset_path:
+            prune_artifacts(self.artifact_dir, keep=model.dataset_path, prefix="dataset-")
+        if self.artifact_dir:
+            prune_artifacts(self.artifact_dir, keep=model.embedding_path, prefix="lsa-")
+        if self.artifact_dir:
+            model.neighbors_path = neighbors_path(self.artifact_dir, digest)
+            prune_artifacts(self.artifact_dir, keep=model.neighbors_path, prefix="neighbors-")
+        model.version = digest[:12]
+        model.feature_version = model.version if model.engine == "sparse" else f"{model.version}-{model.engine_label}"
+        model.fitted_at = time.time()
+        model.fit_seconds = model.fitted_at - started
+        self._publish(model, stat, digest)
+        self._last_full_fit = model.fitted_at
+        self.fit_count += 1
+        return model
+
+    def _publish(self, model: Recommender, stat, digest: str):
+        self._stat = stat
+        self._digest = digest
+        self._ends_with_newline = self._tail_is_newline()
+        self._last_check = time.time()
+        self._model = model
+
+    def _ingest(self) -> Optional[Recommender]:
+        """Extend the active snapshot with rows appended to the file since it was published.
+
+        Returns None when the change is not a pure append of whole rows, or when the result would
+        drift too far from the fitted vocabulary; the caller then refits.
+        """
+        model = self._model
+        if model is None or self._stat is None or not self._ends_with_newline:
+            return None
+        offset = self._stat[1]
+        stat = self._file_stat()
+        digest, prefix = self._file_digest(prefix_size=offset)
+        if prefix != self._digest or stat[1] <= offset:
+            return None
+        started = time.time()
+        header = pd.read_csv(self.system_csv, nrows=0).columns
+        with open(self.system_csv, "rb") as f:
+            f.seek(offset)
+            rows = pd.read_csv(io.BytesIO(f.read(stat[1] - offset)), header=None, names=list(header))
+        extended = model.extend(rows)
+        if extended.vocab_drift > self.drift_threshold:
+            return None
+        extended.version = digest[:12]
+        if self.artifact_dir:
+            extended.neighbors_path = neighbors_path(self.artifact_dir, digest)
+        extended.fitted_at = time.time()
+        extended.fit_seconds = extended.fitted_at - started
+        self._publish(extended, stat, digest)
+        self.ingest_count += 1
+        return extended
+
+    def _update(self) -> Recommender:
+        """Bring the snapshot up to date: ingest appended rows when possible, otherwise refit."""
+        try:
+            model = self._ingest()
+        except Exception:
+            model = None
+        return model if model is not None else self._fit()
+
+    def _refit_due(self, model: Recommender) -> bool:
+        """Scheduled full refit of a snapshot that has been grown incrementally."""
+        return (model.appended_rows > 0 and self.refit_interval > 0
+                and time.time() - self._last_full_fit >= self.refit_interval)
+
+    @timed("model_get")
+    def get(self) -> Recommender:
+        """Return the active fitted snapshot, fitting or refitting only if needed.
+
+        While a refit is running, callers that already have a snapshot keep being served the
+        previous one instead of waiting.
+        """
+        model = self._model
+        if model is not None:
+            try:
+                stale = self._is_stale()
+            except OSError:
+                stale = False
+            due = not stale and self._refit_due(model)
+            if not stale and not due:
+                return model
+            if not self._fit_lock.acquire(blocking=False):
+                return model
+            try:
+                return self._fit() if due else self._update()
+            finally:
+                self._fit_lock.release()
+
+        with self._fit_lock:
+            if self._model is not None:
+                return self._model
+            return self._fit()
+
+    def current(self) -> Optional[Recommender]:
+        """Return the active snapshot without triggering a fit (None if not fitted yet)."""
+        return self._model
+
+    def sync(self) -> Recommender:
+        """Check the dataset now (ignoring `check_interval`), e.g. right after appending to it."""
+        self._last_check = 0.0
+        return self.get()
+
+    def refresh(self, engine: Optional[str] = None, lsa_dim: Optional[int] = None) -> Recommender:
+        """Force a refit regardless of the dataset fingerprint, switching to `engine`/`lsa_dim` if given."""
+        with self._fit_lock:
+            if engine is not None:
+                Recommender(engine=engine)  # validates the name before it is stored
+                self.engine = engine
+            if lsa_dim is not None:
+                self.lsa_dim = lsa_dim
+            return self._fit()
+
+    def status(self) -> dict:
+        model = self._model
+        return {
+            "ready": model is not None,
+            "version": model.version if model is not None else None,
+            "feature_version": model.feature_version if model is not None else None,
+            "engine": model.engine_label if model is not None else self.engine,
+            "fitted_at": model.fitted_at if model is not None else None,
+            "fit_seconds": model.fit_seconds if model is not None else None,
+            "fit_count": self.fit_count,
+            "ingest_count": self.ingest_count,
+            "appended_rows": model.appended_rows if model is not None else 0,
+            "vocab_drift": model.vocab_drift if model is not None else 0.0,
+            "rows": int(model.system_df.shape[0]) if model is not None else 0,
+            "dataset": self.system_csv,
+            "artifact": model.artifact_path if model is not None else None,
+            "embedding": model.embedding_path if model is not None else None,
+            "columnar_dataset": model.dataset_path if model is not None else None,
+        }
@@ -0,0 +1,131 @@
+"""Item-to-item neighbour graph over catalog problems.
+
+Each problem keeps its `k` most similar problems by TF-IDF cosine, merged with the explicit
+links in the dataset's `similar_questions` column, as one CSR matrix (row = problem, columns =
+neighbours, data = edge weight). Recommending "more like these" then only touches the
+neighbour lists of the given problems instead of scoring the whole catalog.
+
+Graphs are persisted per dataset version through `artifact_store` and memory-mapped on load.
+"""
+import os
+import re
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.sparse import coo_matrix, csr_matrix
+
+from artifact_store import load_arrays, read_meta, write_artifact
+
+
+# Bump when the on-disk layout changes so old graphs are rebuilt instead of misread
+FORMAT_VERSION = 1
+ARRAYS = ("data", "indices", "indptr")
+_LINK_RE = re.compile(r"\[(.+?), /problems/[^/\]]*/?, [A-Za-z]+\]")
+
+
+def neighbors_path(root: str, digest: str) -> str:
+    """Directory holding the neighbour graph for the dataset with content hash `digest`."""
+    return os.path.join(root, f"neighbors-v{FORMAT_VERSION}-{digest[:16]}")
+
+
+def parse_similar_titles(value) -> List[str]:
+    """Titles listed in one `similar_questions` cell ("[Title, /problems/slug/, Medium], ...")."""
+    if not isinstance(value, str):
+        return []
+    return [t.strip() for t in _LINK_RE.findall(value)]
+
+
+def link_pairs(similar: Sequence, title_index: dict) -> Tuple[np.ndarray, np.ndarray]:
+    """(source rows, target rows) for every `similar_questions` link that resolves to a catalog row."""
+    src, dst = [], []
+    for row, value in enumerate(similar):
+        for title in parse_similar_titles(value):
+            targets = title_index.get(title.lower())
+            if targets is not None:
+                src.extend([row] * len(targets))
+                dst.extend(targets)
+    return np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)
+
+
+def build_neighbor_graph(tfidf_matrix, k: int = 20, links: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                         link_weight: float = 1.0, max_chunk_bytes: int = 64 << 20) -> csr_matrix:
+    """Top-`k` cosine neighbours per row, plus explicit `links` (made symmetric).
+
+    TF-IDF rows are L2-normalized, so cosine is a dot product; similarities are computed a
+    block of rows at a time so the dense block stays under `max_chunk_bytes`. Linked pairs
+    get `link_weight` added to their cosine, which ranks them above purely textual neighbours.
+    Self-edges and zero-similarity pairs are dropped.
+    """
+    X = csr_matrix(tfidf_matrix)
+    n = X.shape[0]
+    k = min(k, max(0, n - 1))
+    XT = X.T.tocsr()
+    chunk = max(1, int(max_chunk_bytes // (8 * max(1, n))))
+    rows, cols, vals = [], [], []
+    for start in range(0, n if k else 0, chunk):
+        stop = min(n, start + chunk)
+        sims = (X[start:stop] @ XT).toarray()
+        sims[np.arange(stop - start), np.arange(start, stop)] = 0.0
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        weights = np.take_along_axis(sims, top, axis=1)
+        keep = weights > 0
+        rows.append(np.broadcast_to(np.arange(start, stop)[:, None], top.shape)[keep])
+        cols.append(top[keep])
+        vals.append(weights[keep])
+    graph = coo_matrix((_concat(vals, np.float32), (_concat(rows, np.int64), _concat(cols, np.int64))),
+                       shape=(n, n)).tocsr()
+
+    if links is not None and len(links[0]):
+        src = np.concatenate([links[0], links[1]])
+        dst = np.concatenate([links[1], links[0]])
+        pairs = np.unique(src[src != dst] * n + dst[src != dst])
+        src, dst = pairs // n, pairs % n
+        cos = np.asarray(X[src].multiply(X[dst]).sum(axis=1)).ravel()
+        linked = coo_matrix(((cos + link_weight).astype(np.float32), (src, dst)), shape=(n, n)).tocsr()
+        graph = graph.maximum(linked)
+
+    graph = graph.tocsr()
+    graph.eliminate_zeros()
+    graph.sort_indices()
+    # one index dtype for both arrays, so scipy keeps the memory-mapped arrays as they are on load
+    index_dtype = np.int32 if graph.nnz < np.iinfo(np.int32).max else np.int64
+    return csr_matrix((graph.data.astype(np.float32), graph.indices.astype(index_dtype),
+                       graph.indptr.astype(index_dtype)), shape=(n, n))
+
+
+def _concat(parts: List[np.ndarray], dtype) -> np.ndarray:
+    return np.concatenate(parts).astype(dtype) if parts else np.zeros(0, dtype=dtype)
+
+
+def aggregate(graph: csr_matrix, rows: Iterable[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """(neighbour rows, summed edge weights) over the neighbour lists of `rows`.
+
+    Cost is proportional to the number of edges read, not to the catalog size.
+    """
+    rows = np.asarray(list(rows), dtype=np.int64)
+    if len(rows) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    starts = np.asarray(graph.indptr[rows], dtype=np.int64)
+    stops = np.asarray(graph.indptr[rows + 1], dtype=np.int64)
+    if int((stops - starts).sum()) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+    lengths = stops - starts
+    # positions of every edge of every requested row, without a Python loop
+    idx = np.arange(int(lengths.sum())) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    ids, inverse = np.unique(graph.indices[idx], return_inverse=True)
+    return ids.astype(np.int64), np.bincount(inverse, weights=graph.data[idx])
+
+
+def save_graph(path: str, graph: csr_matrix, k: int) -> str:
+    """Write `graph` to `path` (see `artifact_store.write_artifact`)."""
+    arrays = {name: getattr(graph, name) for name in ARRAYS}
+    return write_artifact(path, arrays, {"shape": list(map(int, graph.shape)), "k": k}, FORMAT_VERSION)
+
+
+def load_graph(path: str) -> Optional[csr_matrix]:
+    """Memory-map a graph written by `save_graph`, or return None if missing/incompatible."""
+    meta = read_meta(path, FORMAT_VERSION)
+    if meta is None:
+        return None
+    arrays = load_arrays(path, ARRAYS)
+    return csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]), shape=tuple(meta["shape"]), copy=False)
@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import tempfile
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# fetch_from(skip) -> (total, questions from offset `skip` to the end of the upstream list)
+FetchFrom = Callable[[int], Tuple[int, List[Dict]]]
+
+
+class ProblemCatalog:
+    """Local store of LeetCode problem metadata (title, difficulty, topicTags, acRate).
+
+    The catalog is the same for every user, so it is synced once and refreshed every
+    `refresh_interval` seconds instead of being paged through on each request. Syncs are
+    incremental: LeetCode appends new problems to the end of the list, so a refresh resumes at
+    `skip = len(problems)` and only falls back to a full resync if the upstream list shrank.
+    The store is a JSON file written atomically, so several workers can share it.
+    """
+
+    def __init__(self, path: Optional[str] = None, refresh_interval: float = 24 * 3600):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.problems: List[Dict] = []
+        self.total = 0
+        self.synced_at = 0.0
+        self._by_title: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self._set(data.get("problems", []), data.get("total", 0), data.get("synced_at", 0.0))
+
+    def _save(self):
+        if not self.path:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(prefix=".catalog-", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"problems": self.problems, "total": self.total, "synced_at": self.synced_at}, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+    def _set(self, problems: List[Dict], total: int, synced_at: float):
+        self.problems = problems
+        self.total = total
+        self.synced_at = synced_at
+        self._by_title = {p["title"]: p for p in problems}
+
+    def needs_refresh(self) -> bool:
+        return not self.problems or time.time() - self.synced_at >= self.refresh_interval
+
+    def lookup(self, title: str) -> Optional[Dict]:
+        return self._by_title.get(title)
+
+    def sync(self, fetch_from: FetchFrom, force: bool = False) -> int:
+        """Fetch problems added upstream since the last sync. Returns the number of new problems."""
+        with self._lock:
+            if not force and not self.needs_refresh():
+                return 0
+            problems = list(self.problems)
+            total, new = fetch_from(len(problems))
+            if total < len(problems):
+                # upstream removed problems; offsets no longer line up, start over
+                problems = []
+                total, new = fetch_from(0)
+            start = len(problems)
+            problems.extend(_slim(p) for p in new)
+            self._set(problems, total, time.time())
+            self._save()
+            return len(problems) - start
+
+    def stats(self) -> dict:
+        return {
+            "problems": len(self.problems),
+            "total": self.total,
+            "synced_at": self.synced_at,
+            "refresh_interval": self.refresh_interval,
+        }
+
+
+def _slim(question: Dict) -> Dict:
+    """Keep only the user-independent fields of a `questionList` entry."""
+    return {
+        "title": question["title"],
+        "difficulty": question.get("difficulty", ""),
+        "topicTags": [t["name"] for t in question.get("topicTags") or []],
+        "acRate": question.get("acRate"),
+    }
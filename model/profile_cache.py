@@ -0,0 +1,48 @@
+import hashlib
+
+from cache import TTLCache
+from user_context import UserContext
+
+
+class ProfileCache:
+    """LRU+TTL cache of per-user TF-IDF profile vectors.
+
+    Entries are keyed by (username, solved-set fingerprint, feature version), so a new solve or a
+    refitted vocabulary naturally misses instead of serving a stale vector. A hit skips building the
+    user's text rows and re-tokenizing them with the vectorizer.
+    """
+
+    def __init__(self, maxsize: int = 2048, ttl: float = 600.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def fingerprint(user_df) -> str:
+        """Order-independent hash of the user's normalized solved titles (frame or `UserContext`)."""
+        if isinstance(user_df, UserContext):
+            if user_df.empty or "title" not in user_df.user_df.columns:
+                return ""
+            titles = sorted(user_df.titles)
+        elif user_df is None or user_df.empty or "title" not in user_df.columns:
+            return ""
+        else:
+            titles = sorted(set(user_df["title"].astype(str).str.lower().str.strip()))
+        return hashlib.sha1("\n".join(titles).encode("utf-8")).hexdigest()
+
+    def get(self, username: str, user_df, recommender):
+        """Return the profile vector for this user, building it with `recommender` on a miss.
+
+        Anonymous (CSV upload) requests have no stable identity and are never cached. Given a
+        `UserContext`, the context's vector is used on a miss and a cached one is handed to it.
+        """
+        if isinstance(user_df, UserContext):
+            if not username:
+                return user_df.profile
+            key = (username, self.fingerprint(user_df), recommender.feature_version)
+            return user_df.set_profile(self._cache.get_or_set(key, lambda: user_df.profile))
+        if not username:
+            return recommender.user_profile(user_df)
+        key = (username, self.fingerprint(user_df), recommender.feature_version)
+        return self._cache.get_or_set(key, lambda: recommender.user_profile(user_df))
+
+    def stats(self) -> dict:
+        return self._cache.stats()
@@ -1,32 +1,100 @@
 import os
-import io
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import linear_kernel
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.preprocessing import LabelEncoder
-from scipy.sparse import hstack
+from scipy.sparse import csr_matrix, hstack, issparse, vstack
 import numpy as np
 import urllib.parse
 
+from dataset_store import ColumnarDataset, build_dataset
+from filter_index import FilterIndex
+from lsa_embedding import ENGINES, fit_lsa, load_embedding, project, save_embedding
+from metrics import stage, timed
+from neighbor_graph import aggregate, build_neighbor_graph, link_pairs, load_graph, save_graph
+from tfidf_artifact import load_artifact, save_artifact
+from user_context import UserContext
+
+
+def fit_forest(X, y, n_estimators: int = 100, random_state: int = 42) -> RandomForestClassifier:
+    """Train the per-user classifier. Module-level so it can run in a worker process."""
+    clf = RandomForestClassifier(n_estimators=n_estimators, random_state=random_state)
+    clf.fit(X, y)
+    return clf
+
+
+def _split_topics(x) -> List[str]:
+    """Normalize a comma-joined topic string into lowercase topic names."""
+    try:
+        return [t.strip().lower() for t in str(x).split(",") if t.strip()]
+    except Exception:
+        return []
+
 
 class Recommender:
     """Content-based recommender for LeetCode problems.
 
     Features:
     - Builds TF-IDF on `title` + `topic_tags` and recommends similar problems.
+    - With `engine="lsa"`, scores queries against a dense `lsa_dim`-dimensional LSA embedding of
+      the TF-IDF rows (see `lsa_embedding`) instead of the sparse matrix itself.
     - Analyzes user's solved problems to find weak topics.
     - Appends new problems from user data into the system CSV if requested.
     """
 
-    def __init__(self, system_csv: str = "cleaned_leetcode_dataset.csv"):
+    # Catalog columns the recommender reads; `fit` loads only these
+    DATA_COLUMNS = ("title", "difficulty", "topic_tags", "company")
+    # Columns behind `FilterIndex`; indexed at fit time but not kept in `system_df`
+    FILTER_COLUMNS = ("difficulty", "companies", "asked_by_faang", "acceptance_rate")
+    # Filtered ranking scores only the qualifying rows unless they are more than this share of
+    # the catalog, where scoring everything and masking is cheaper than slicing the matrix
+    SLICE_FRACTION = 0.3
+
+    def __init__(self, system_csv: str = "cleaned_leetcode_dataset.csv", engine: str = "sparse",
+                 lsa_dim: int = 64):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}; expected one of {', '.join(ENGINES)}")
         self.system_csv = system_csv
         self.system_df = None
+        self.dataset_path = None
         self.vectorizer = None
         self.tfidf_matrix = None
-
-    def load_data(self):
+        self.engine = engine
+        self.lsa_dim = lsa_dim
+        # LSA engine only: feature -> latent projection and the normalized float32 catalog rows
+        self.lsa_components = None
+        self.embedding = None
+        self.embedding_path = None
+        self.title_norm = None
+        self.title_index = None
+        self.topic_names = []
+        self.topic_ids = {}
+        self.topic_matrix = None
+        self.display = {}
+        self.filters = None
+        self._rf_features = None
+        self._neighbors = None
+        # Where the neighbour graph for this snapshot is persisted (set by ModelRegistry)
+        self.neighbors_path = None
+        # Rows added by `extend` since the vocabulary was fitted, and their out-of-vocabulary terms
+        self.appended_rows = 0
+        self.new_terms = frozenset()
+        # Set by ModelRegistry when this instance is published as a fitted snapshot
+        self.version = None
+        # Identifies the fitted vocabulary; snapshots grown with `extend` keep their base's value
+        self.feature_version = None
+        self.fitted_at = None
+        self.fit_seconds = None
+        self.artifact_path = None
+
+    def load_data(self, columns: Optional[List[str]] = None, dataset: Optional[str] = None):
+        """Load the catalog into `system_df`, keeping only `columns` (all when None).
+
+        With `dataset`, the typed columnar copy of the CSV at that path (see `dataset_store`) is
+        read instead, and built first if it does not exist yet; it must correspond to the CSV's
+        current content, which `ModelRegistry` ensures by naming it after the content hash.
+        """
         # Resolve relative paths against the model package directory
         path = self.system_csv
         if not os.path.isabs(path):
@@ -34,151 +102,553 @@ class Recommender:
             path = os.path.join(base, path)
         if not os.path.exists(path):
             raise FileNotFoundError(f"System CSV not found: {path}")
-        self.system_df = pd.read_csv(path)
         # store resolved absolute path for future operations (append etc.)
         self.system_csv = path
+        if dataset and not os.path.isdir(dataset):
+            try:
+                build_dataset(path, dataset)
+            except OSError:
+                # read-only deploys still work, they just parse the CSV
+                dataset = None
+        store = ColumnarDataset.open(dataset) if dataset else None
+        if store is not None:
+            self.system_df = store.read(columns)
+            self.dataset_path = dataset
+        else:
+            wanted = None if columns is None else set(columns)
+            self.system_df = pd.read_csv(path, usecols=None if wanted is None else (lambda c: c in wanted))
         # Ensure required columns exist
         for c in ["title", "topic_tags"]:
             if c not in self.system_df.columns:
                 self.system_df[c] = ""
 
+    @staticmethod
+    def _corpus_text(df: pd.DataFrame) -> pd.Series:
+        """The document indexed for each catalog row: topic tags followed by the title."""
+        # only the text columns: a categorical `difficulty` from the columnar store cannot take ""
+        tags = df["topic_tags"].astype(object).fillna("").astype(str)
+        titles = df["title"].astype(object).fillna("").astype(str) if "title" in df.columns else ""
+        return tags + " " + titles
+
     def build_vectorizer(self, max_features: int = 5000):
-        # Create a combined text field
-        df = self.system_df
-        df = df.fillna("")
-        df["_text"] = df["topic_tags"].astype(str) + " " + df.get("title", "").astype(str)
         self.vectorizer = TfidfVectorizer(max_features=max_features, stop_words="english")
-        self.tfidf_matrix = self.vectorizer.fit_transform(df["_text"])
+        self.tfidf_matrix = self.vectorizer.fit_transform(self._corpus_text(self.system_df))
+
+    def build_embedding(self, path: Optional[str] = None):
+        """Fit the LSA embedding of `tfidf_matrix` (LSA engine), or memory-map it from `path`.
 
-    def fit(self):
-        """Load data and build vectorizer."""
-        self.load_data()
-        self.build_vectorizer()
+        A freshly fitted embedding is written to `path` for other workers, when given.
+        """
+        loaded = load_embedding(path) if path else None
+        if loaded is not None and loaded[1].shape[0] == self.tfidf_matrix.shape[0]:
+            self.lsa_components, self.embedding = loaded
+            self.embedding_path = path
+            return
+        with stage("lsa_fit"):
+            self.lsa_components, self.embedding = fit_lsa(self.tfidf_matrix, self.lsa_dim)
+        if path:
+            try:
+                save_embedding(path, self.lsa_components, self.embedding)
+                self.embedding_path = path
+            except OSError:
+                pass
+
+    @property
+    def engine_label(self) -> str:
+        """"sparse", or "lsa-<dim>" with the fitted embedding's dimension."""
+        if self.engine == "lsa" and self.embedding is not None:
+            return f"lsa-{self.embedding.shape[1]}"
+        return self.engine
+
+    @property
+    def score_matrix(self):
+        """The catalog rows queries are scored against: the LSA embedding, or the TF-IDF matrix."""
+        return self.tfidf_matrix if self.embedding is None else self.embedding
+
+    @timed("fit")
+    def fit(self, artifact: Optional[str] = None, dataset: Optional[str] = None, embedding: Optional[str] = None):
+        """Load data and build vectorizer.
+
+        If `artifact` is given, the vectorizer and TF-IDF matrix are memory-mapped from that
+        directory when it exists; otherwise they are fitted and written there for other workers.
+        `dataset` is the columnar copy of the catalog to load from (see `load_data`), and
+        `embedding` the directory for the LSA embedding (see `build_embedding`; LSA engine only).
+        """
+        self.load_data(list(self.DATA_COLUMNS), dataset=dataset)
+        self.filters = self.load_filters()
+        loaded = load_artifact(artifact) if artifact else None
+        if loaded is not None and loaded[1].shape[0] == self.system_df.shape[0]:
+            self.vectorizer, self.tfidf_matrix, _ = loaded
+            self.artifact_path = artifact
+        else:
+            self.build_vectorizer()
+            if artifact:
+                try:
+                    save_artifact(artifact, self.vectorizer, self.tfidf_matrix)
+                    self.artifact_path = artifact
+                except OSError:
+                    # read-only deploys still work, they just fit in every worker
+                    pass
+        if self.engine == "lsa":
+            self.build_embedding(embedding)
+        self.build_index()
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, max_features: int = 5000, engine: str = "sparse",
+                       lsa_dim: int = 64) -> "Recommender":
+        """Build a fitted recommender from an in-memory catalog instead of the system CSV."""
+        rec = cls(engine=engine, lsa_dim=lsa_dim)
+        rec.system_df = df.copy()
+        for c in ["title", "topic_tags"]:
+            if c not in rec.system_df.columns:
+                rec.system_df[c] = ""
+        rec.build_vectorizer(max_features=max_features)
+        if engine == "lsa":
+            rec.build_embedding()
+        rec.filters = FilterIndex.from_frame(rec.system_df)
+        rec.build_index()
+        return rec
+
+    def load_filters(self) -> FilterIndex:
+        """Build the `FilterIndex` for the loaded catalog, from the columnar copy when there is one."""
+        store = ColumnarDataset.open(self.dataset_path) if self.dataset_path else None
+        if store is not None:
+            return FilterIndex.from_dataset(store)
+        wanted = set(self.FILTER_COLUMNS)
+        try:
+            df = pd.read_csv(self.system_csv, usecols=lambda c: c in wanted)
+        except (OSError, ValueError):
+            df = self.system_df
+        if len(df) != len(self.system_df):
+            df = self.system_df
+        return FilterIndex.from_frame(df)
+
+    def candidate_rows(self, filters: Optional[dict]) -> Optional[np.ndarray]:
+        """Sorted catalog row ids matching `filters` (see `filter_index`), or None for no filter."""
+        if not filters:
+            return None
+        if self.filters is None:
+            self.filters = FilterIndex.from_frame(self.system_df)
+        return self.filters.select(filters)
+
+    @timed("ingest")
+    def extend(self, new_rows: pd.DataFrame) -> "Recommender":
+        """Return a new snapshot with `new_rows` appended after the current catalog rows.
+
+        The new rows are vectorized with the existing vocabulary and IDF weights and stacked under
+        the current matrix (and projected with the existing LSA components), so existing row ids,
+        user profiles and RF features stay valid. `self` is not modified. Terms the vocabulary does not know are collected in `new_terms`; see
+        `vocab_drift`.
+        """
+        filters = self.filters.extend(new_rows) if self.filters is not None else None
+        rows = new_rows.copy()
+        for c in ["title", "topic_tags"]:
+            if c not in rows.columns:
+                rows[c] = ""
+        rows = rows.reindex(columns=self.system_df.columns)
+        text = self._corpus_text(rows)
+
+        rec = Recommender(system_csv=self.system_csv, engine=self.engine, lsa_dim=self.lsa_dim)
+        rec.vectorizer = self.vectorizer
+        added = self.vectorizer.transform(text)
+        rec.tfidf_matrix = vstack([self.tfidf_matrix, added]).tocsr()
+        if self.embedding is not None:
+            rec.lsa_components = self.lsa_components
+            rec.embedding = np.vstack([self.embedding, project(added, self.lsa_components)])
+            rec.embedding_path = self.embedding_path
+        rec.system_df = pd.concat([self.system_df, rows], ignore_index=True)
+        analyzer = self.vectorizer.build_analyzer()
+        vocabulary = self.vectorizer.vocabulary_
+        unseen = {term for doc in text for term in analyzer(doc) if term not in vocabulary}
+        rec.new_terms = self.new_terms | unseen
+        rec.appended_rows = self.appended_rows + len(rows)
+        rec.feature_version = self.feature_version
+        rec.artifact_path = self.artifact_path
+        rec.filters = filters
+        rec.build_index()
+        return rec
+
+    @property
+    def vocab_drift(self) -> float:
+        """Out-of-vocabulary terms from appended rows, as a fraction of the vocabulary size."""
+        if self.vectorizer is None or not self.new_terms:
+            return 0.0
+        return len(self.new_terms) / max(1, len(self.vectorizer.vocabulary_))
+
+    def build_index(self):
+        """Precompute per-row lookup structures used on the request path.
+
+        - `title_norm`: lowercased/stripped title per row (object array aligned with `tfidf_matrix`).
+        - `title_index`: normalized title -> array of row ids, so excluding a user's solved titles
+          costs O(solved) rather than a pass over the catalog.
+        - `topic_matrix`: sparse problem x topic incidence over `topic_names`, which makes weak-topic
+          scoring a couple of sparse matrix-vector products.
+        - `display`: per-row response fields (see `display_columns`).
+        """
+        self.system_df = self.system_df.reset_index(drop=True)
+        titles = self.system_df["title"].fillna("").astype(str).str.lower().str.strip()
+        self.title_norm = titles.to_numpy(dtype=object)
+        self.title_index = pd.Series(np.arange(len(titles))).groupby(titles.values).indices
+
+        # Topic vocabulary in first-appearance order, plus a sparse problem x topic incidence matrix
+        names = {}
+        for value in pd.unique(self.system_df["topic_tags"].astype(object)):
+            for t in _split_topics(value):
+                names.setdefault(t, len(names))
+        self.topic_names = list(names)
+        self.topic_ids = names
+        self.topic_matrix = self.topic_incidence(self.system_df["topic_tags"])
+        self.display = self.display_columns()
+
+    def display_columns(self) -> dict:
+        """Object arrays, aligned with the catalog rows, holding every field a response shows.
+
+        The primary topic (first tag) and its GfG / Striver links are derived once per distinct
+        `topic_tags` value, so serializing a result is an array gather per field. Missing values
+        are blank strings.
+        """
+        df = self.system_df
+        n = len(df)
+
+        def column(name):
+            if name not in df.columns:
+                return np.full(n, "", dtype=object)
+            values = df[name].astype(object)
+            return values.where(values.notna(), "").to_numpy(dtype=object)
+
+        tags = column("topic_tags")
+        codes, uniques = pd.factorize(tags)
+        primary = [str(u).split(",")[0].strip() for u in uniques]
+        gfg = [self.gfg_link_for_topic(t) if t else "" for t in primary]
+        striver = [self.striver_search_link(t) if t else "" for t in primary]
+        return {
+            "title": column("title"),
+            "difficulty": column("difficulty"),
+            "topic_tags": tags,
+            "company": column("company"),
+            "primary_topic": np.array(primary, dtype=object)[codes],
+            "gfg_link": np.array(gfg, dtype=object)[codes],
+            "striver_link": np.array(striver, dtype=object)[codes],
+        }
+
+    def topic_incidence(self, topic_tags: pd.Series) -> csr_matrix:
+        """Binary (rows x catalog topics) matrix for comma-joined topic strings.
+
+        Each distinct string is split once; topics not in the catalog are ignored.
+        """
+        codes, uniques = pd.factorize(pd.Series(topic_tags, dtype=object), use_na_sentinel=False)
+        rows, cols = [], []
+        for u, value in enumerate(uniques):
+            for t in set(_split_topics(value)):
+                col = self.topic_ids.get(t)
+                if col is not None:
+                    rows.append(u)
+                    cols.append(col)
+        per_unique = csr_matrix(
+            (np.ones(len(rows)), (rows, cols)), shape=(len(uniques), len(self.topic_names))
+        )
+        return per_unique[codes]
+
+    def exclusion_mask(self, titles) -> np.ndarray:
+        """Boolean mask over catalog rows whose normalized title is in `titles`."""
+        mask = np.zeros(len(self.title_norm), dtype=bool)
+        for t in titles:
+            rows = self.title_index.get(t)
+            if rows is not None:
+                mask[rows] = True
+        return mask
+
+    @staticmethod
+    def top_k(scores: np.ndarray, k: int, exclude: Optional[np.ndarray] = None) -> np.ndarray:
+        """Row ids of the `k` highest `scores`, best first, skipping rows set in `exclude`.
+
+        Uses `argpartition` so ranking is O(n + k log k) instead of a full sort. Ties keep row
+        order, also at the k-th place: rows scoring exactly the k-th score are taken first-come.
+        """
+        if exclude is not None:
+            scores = np.where(exclude, -np.inf, scores)
+            available = len(scores) - int(exclude.sum())
+        else:
+            available = len(scores)
+        k = min(k, available)
+        if k <= 0:
+            return np.empty(0, dtype=np.intp)
+        if k < len(scores):
+            part = np.argpartition(-scores, k - 1)[:k]
+            kth = scores[part].min()
+            if np.count_nonzero(scores == kth) > np.count_nonzero(scores[part] == kth):
+                # the k-th score is tied with rows left out: keep the earliest tied rows instead
+                above = scores > kth
+                tied = scores == kth
+                if exclude is not None:
+                    tied &= ~exclude
+                part = np.flatnonzero(above | (tied & (np.cumsum(tied) <= k - int(above.sum()))))
+            else:
+                part = np.sort(part)
+        else:
+            part = np.arange(len(scores))
+        return part[np.argsort(-scores[part], kind="stable")]
 
     def _text_for_row(self, row: pd.Series) -> str:
         return str(row.get("topic_tags", "")) + " " + str(row.get("title", ""))
 
-    def recommend(self, user_df: pd.DataFrame, top_n: int = 10) -> pd.DataFrame:
+    def _user_text(self, user_df: pd.DataFrame) -> Optional[str]:
+        """All of the user's rows joined into the single query document, or None if empty."""
+        if user_df is None or not isinstance(user_df, pd.DataFrame) or user_df.empty:
+            return None
+        # Column-wise equivalent of joining `_text_for_row` over every row
+        n = len(user_df)
+        tags = user_df["topic_tags"].map(str).tolist() if "topic_tags" in user_df.columns else [""] * n
+        titles = user_df["title"].map(str).tolist() if "title" in user_df.columns else [""] * n
+        return " ".join(f"{t} {title}" for t, title in zip(tags, titles))
+
+    def user_context(self, user_df, profile=None) -> UserContext:
+        """The per-request `UserContext` for `user_df` (a frame, CSV text or None).
+
+        A context built by this snapshot is returned as is (adopting `profile` if it has none
+        yet); one from another snapshot is rebuilt from its rows.
+        """
+        if isinstance(user_df, UserContext):
+            if user_df.recommender is self:
+                if profile is not None:
+                    user_df.set_profile(profile)
+                return user_df
+            user_df = user_df.user_df
+        return UserContext(self, user_df, profile=profile)
+
+    @timed("profile")
+    def user_profile(self, user_df: pd.DataFrame):
+        """Return the user's query vector, or None if there are no rows.
+
+        That is the TF-IDF vector (sparse, 1 x n_features), or with the LSA engine its normalized
+        projection (dense float32, 1 x lsa_dim). All of the user's rows are joined into a single
+        document, matching how `recommend` queries.
+        """
+        text = self._user_text(user_df)
+        if text is None:
+            return None
+        return self._queries([text])
+
+    def _queries(self, texts: List[str]):
+        """Query rows for `score_matrix`: the texts' TF-IDF rows, projected with the LSA engine."""
+        tfidf = self.vectorizer.transform(texts)
+        return tfidf if self.embedding is None else project(tfidf, self.lsa_components)
+
+    def recommend(self, user_df, top_n: int = 10, profile=None, filters: Optional[dict] = None) -> pd.DataFrame:
         """Recommend `top_n` problems for the user.
 
         Strategy:
         - If user dataframe contains solved problems, we compute user's weak topics and prioritize
           problems from those topics.
         - Otherwise we use the user's provided rows (if any) as queries and find similar problems.
+
+        `user_df` is the user's rows or their `UserContext`. `profile` may be a query vector
+        previously returned by `user_profile` for the same rows (e.g. from `ProfileCache`), which
+        skips rebuilding and re-tokenizing the user text.
+        `filters` restricts results to matching problems (see `filter_index.parse_filters`).
         """
         if self.system_df is None or self.tfidf_matrix is None:
             self.fit()
 
-        system = self.system_df.copy().reset_index(drop=True)
-
-        # Coerce user_df to a DataFrame if it's not already (handle uploaded CSV content or None)
-        if not isinstance(user_df, pd.DataFrame):
-            try:
-                if isinstance(user_df, str):
-                    stream = io.StringIO(user_df)
-                    user_df = pd.read_csv(stream)
-                else:
-                    user_df = pd.DataFrame()
-            except Exception:
-                user_df = pd.DataFrame()
-
-        # Build user query text
-        if user_df.empty:
-            user_texts = []
-        else:
-            user_texts = user_df.apply(self._text_for_row, axis=1).tolist()
-        if len(user_texts) == 0:
+        # Uploaded CSV content or None is coerced to a frame by the context
+        ctx = self.user_context(user_df, profile)
+        if ctx.profile is None:
             # Fallback: recommend most common topics
-            return system.head(top_n)
+            rows = self.candidate_rows(filters)
+            return self.system_df.head(top_n).copy() if rows is None else self.system_df.iloc[rows[:top_n]].copy()
 
-        user_corpus = [" ".join(user_texts)]
-        user_vec = self.vectorizer.transform(user_corpus)
+        rec_indices, scores = self.rank(ctx, top_n, filters=filters)
+        recs = self.system_df.iloc[rec_indices].copy()
+        recs["score"] = scores
+        return recs
 
-        # Compute cosine similarities
-        cosine_similarities = linear_kernel(user_vec, self.tfidf_matrix).flatten()
-        top_idx = cosine_similarities.argsort()[::-1]
+    @timed("score")
+    def rank(self, user_df, limit: int, profile=None, exclude_titles=(),
+             filters: Optional[dict] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (row ids, scores) of up to `limit` catalog rows ranked by similarity to the user.
 
-        # Filter out problems already in user's data (by title)
-        user_titles = set(user_df.get("title", pd.Series([], dtype=object)).astype(str).str.lower())
-        recommendations = []
-        for idx in top_idx:
-            title = str(system.at[idx, "title"]).lower()
-            if title in user_titles:
-                continue
-            recommendations.append((idx, cosine_similarities[idx]))
-            if len(recommendations) >= top_n:
+        Rows whose normalized title is in the user's data or in `exclude_titles` are skipped, and
+        with `filters` only matching rows are scored. Without any user rows, the catalog order
+        is returned with zero scores.
+        """
+        ctx = self.user_context(user_df, profile)
+        user_vec = ctx.profile
+        exclude = ctx.exclusion_mask(exclude_titles)
+
+        rows = self.candidate_rows(filters)
+        n = len(self.title_norm)
+        if rows is not None and len(rows) > self.SLICE_FRACTION * n:
+            outside = np.ones(n, dtype=bool)
+            outside[rows] = False
+            exclude |= outside
+            rows = None
+        if rows is not None:
+            scores = np.zeros(len(rows)) if user_vec is None else self.similarity(user_vec, rows)
+            top = self.top_k(scores, limit, exclude=exclude[rows])
+            return rows[top], scores[top]
+
+        scores = np.zeros(n) if user_vec is None else self.similarity(user_vec)
+        rec_indices = self.top_k(scores, limit, exclude=exclude)
+        return rec_indices, scores[rec_indices]
+
+    def similarity(self, user_vec, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Cosine similarity of a query vector to every catalog row, or to just `rows`.
+
+        TF-IDF rows are L2-normalized, so this is the sparse matrix times the densified query,
+        which is several times cheaper than `linear_kernel`'s sparse x sparse product. With the
+        LSA engine it is a dense float32 matrix-vector product over the embedding.
+        """
+        matrix = self.score_matrix if rows is None else self.score_matrix[rows]
+        query = user_vec.toarray().ravel() if issparse(user_vec) else np.asarray(user_vec).ravel()
+        return np.asarray(matrix @ query).ravel()
+
+    @timed("others")
+    def sample_others(self, user_df=None, n: int = 20, exclude_titles=(), filters: Optional[dict] = None,
+                      seed: Optional[int] = None) -> np.ndarray:
+        """Row ids of up to `n` distinct random problems outside the user's titles and `exclude_titles`.
+
+        Random row ids (among the `filters` matches, if given) are drawn in small batches and
+        excluded ones rejected with a binary search over the excluded rows from `title_index`,
+        so the cost follows `n` and the number of excluded titles, not the catalog size. When
+        most candidates are excluded, the remaining rows are listed and sampled directly.
+        """
+        ctx = self.user_context(user_df)
+        extra = [self.title_index[t] for t in set(exclude_titles) - ctx.titles if t in self.title_index]
+        excluded = np.union1d(ctx.rows, np.concatenate(extra)) if extra else ctx.rows
+        pool = self.candidate_rows(filters)
+        size = len(self.title_norm) if pool is None else len(pool)
+        rng = np.random.default_rng(seed)
+        picked = {}
+        # a few rounds of twice the missing count cover any exclusion share up to ~75%
+        for _ in range(4):
+            need = n - len(picked)
+            if need <= 0 or size == 0:
                 break
+            draws = rng.integers(0, size, size=2 * need + 4)
+            rows = draws if pool is None else pool[draws]
+            if len(excluded):
+                pos = np.minimum(np.searchsorted(excluded, rows), len(excluded) - 1)
+                rows = rows[excluded[pos] != rows]
+            for r in rows.tolist():
+                picked.setdefault(r, None)
+                if len(picked) == n:
+                    break
+        need = n - len(picked)
+        if need > 0 and size > 0:
+            rest = np.setdiff1d(np.arange(size) if pool is None else pool, excluded, assume_unique=True)
+            rest = rest[~np.isin(rest, list(picked))]
+            picked.update(dict.fromkeys(rng.choice(rest, size=min(need, len(rest)), replace=False).tolist()))
+        return np.fromiter(picked, dtype=np.int64, count=len(picked))
+
+    @timed("score_batch")
+    def recommend_many(self, user_dfs: List[pd.DataFrame], top_n: int = 10, profiles=None,
+                       max_chunk_bytes: int = 64 << 20, filters: Optional[dict] = None) -> List[pd.DataFrame]:
+        """Batch form of `recommend`: one result frame per entry of `user_dfs`, in order.
+
+        All users' texts are tokenized in one `vectorizer.transform` call and their profiles stacked
+        into one matrix, so similarities come from one matrix product per chunk of users
+        instead of one `linear_kernel` per user. Chunks are sized so the dense (users x catalog)
+        score block stays under `max_chunk_bytes`. `filters` applies to every user and limits
+        the score block to the matching rows.
+        """
+        if self.system_df is None or self.tfidf_matrix is None:
+            self.fit()
+        candidates = self.candidate_rows(filters)
+        top_n = max(0, top_n)
 
-        rec_indices = [i for i, _ in recommendations]
-        recs = system.iloc[rec_indices].copy()
-        recs["score"] = [s for _, s in recommendations]
-        return recs
-
-    def analyze_weak_topics(self, user_df: pd.DataFrame, top_k: int = 5) -> List[Tuple[str, float]]:
+        if profiles is None:
+            texts = [self._user_text(df) for df in user_dfs]
+            active = [i for i, t in enumerate(texts) if t is not None]
+            stacked = self._queries([texts[i] for i in active]) if active else None
+        else:
+            active = [i for i, p in enumerate(profiles) if p is not None]
+            if active and self.embedding is not None:
+                stacked = np.vstack([profiles[i] for i in active])
+            elif active:
+                stacked = vstack([profiles[i] for i in active]).tocsr()
+            else:
+                stacked = None
+
+        # Users without rows get the same fallback as `recommend`
+        results = [None] * len(user_dfs)
+        for i in set(range(len(user_dfs))) - set(active):
+            fallback = self.system_df.head(top_n) if candidates is None else self.system_df.iloc[candidates[:top_n]]
+            results[i] = fallback.copy()
+        if not active:
+            return results
+
+        matrix = self.score_matrix if candidates is None else self.score_matrix[candidates]
+        n_items = matrix.shape[0]
+        if n_items == 0 or top_n == 0:
+            for i in active:
+                results[i] = self.system_df.iloc[:0].assign(score=[])
+            return results
+        chunk = max(1, int(max_chunk_bytes // (8 * max(1, n_items))))
+        k = min(top_n, n_items)
+        for start in range(0, len(active), chunk):
+            users = active[start:start + chunk]
+            sims = linear_kernel(stacked[start:start + chunk], matrix)
+            for r, i in enumerate(users):
+                titles = user_dfs[i]["title"].tolist() if "title" in user_dfs[i].columns else []
+                for t in {str(t).lower().strip() for t in titles}:
+                    rows = self.title_index.get(t)
+                    if rows is not None and candidates is not None:
+                        # catalog row ids -> columns of the filtered score block
+                        pos = np.minimum(np.searchsorted(candidates, rows), len(candidates) - 1)
+                        rows = pos[candidates[pos] == rows]
+                    if rows is not None:
+                        sims[r, rows] = -np.inf
+            if k < n_items:
+                part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+                picked = np.take_along_axis(sims, part, axis=1)
+                kth = picked.min(axis=1, keepdims=True)
+                # users whose k-th score is tied with rows left out are re-ranked as in `top_k`
+                crossing = (sims == kth).sum(axis=1) > (picked == kth).sum(axis=1)
+                for r in np.flatnonzero(crossing):
+                    part[r] = self.top_k(sims[r], k)
+                # sorted so ties keep catalog order, as in `top_k`
+                part = np.sort(part, axis=1)
+            else:
+                part = np.tile(np.arange(n_items), (len(users), 1))
+            part_scores = np.take_along_axis(sims, part, axis=1)
+            order = np.argsort(-part_scores, axis=1, kind="stable")
+            top = np.take_along_axis(part, order, axis=1)
+            top_scores = np.take_along_axis(part_scores, order, axis=1)
+            if candidates is not None:
+                top = candidates[top]
+            for r, i in enumerate(users):
+                keep = np.isfinite(top_scores[r])
+                recs = self.system_df.iloc[top[r][keep]].copy()
+                recs["score"] = top_scores[r][keep]
+                results[i] = recs
+        return results
+
+    @timed("weak_topics")
+    def analyze_weak_topics(self, user_df, top_k: int = 5) -> List[Tuple[str, float]]:
         """Return a list of (topic, score) where lower score means weaker for user.
 
         Heuristic:
         - If user_df has a column indicating solved/completed or accuracy, use it to compute per-topic proficiency.
         - Otherwise, topics not present in user_df are considered weak and ranked by system frequency.
         """
-        # Ensure user_df is a DataFrame
-        if not isinstance(user_df, pd.DataFrame):
-            try:
-                if isinstance(user_df, str):
-                    stream = io.StringIO(user_df)
-                    user_df = pd.read_csv(stream)
-                else:
-                    user_df = pd.DataFrame()
-            except Exception:
-                user_df = pd.DataFrame()
-
-        # Normalize topic tags into lists
-        def split_topics(x):
-            try:
-                return [t.strip().lower() for t in str(x).split(",") if t.strip()]
-            except Exception:
-                return []
-
-        system = self.system_df.copy()
-        system["_topics_list"] = system["topic_tags"].apply(split_topics)
-
-        # Build global topic frequency
-        from collections import Counter
-        global_counter = Counter()
-        for lst in system["_topics_list"]:
-            global_counter.update(lst)
-
-        # Build user topic stats
-        user_df = user_df.fillna("")
-        user_df["_topics_list"] = user_df.get("topic_tags", "").apply(split_topics)
-
-        # Try to detect solved indicator
-        solved_col = None
-        for c in ["status", "solved", "is_solved", "result"]:
-            if c in user_df.columns:
-                solved_col = c
-                break
+        if self.topic_matrix is None:
+            self.build_index()
+
+        # Per-topic counts of the user's rows and, if labelled, of their solved rows
+        attempted, success = self.user_context(user_df).topic_counts
+        touched = attempted > 0
+        scores = np.zeros(len(self.topic_names))
+        if success is not None:
+            # solved counts truthy values like 1, True, 'solved'
+            scores[touched] = success[touched] / attempted[touched]
+        else:
+            # presence implies some familiarity; assign a weak-medium score
+            scores[touched] = 0.4 + np.minimum(0.5, attempted[touched] / 50)
+        # not attempted -> weak (0.0)
 
-        topic_scores = {}
-        for topic in global_counter:
-            # Collect user rows with this topic
-            rows_with_topic = user_df[user_df["_topics_list"].apply(lambda L, t=topic: t in L)]
-            if rows_with_topic.empty:
-                # not attempted -> weak
-                topic_scores[topic] = 0.0
-            else:
-                if solved_col:
-                    # consider solved as truthy values like 1, True, 'solved'
-                    solved_vals = rows_with_topic[solved_col].astype(str).str.lower()
-                    success_count = solved_vals.apply(lambda x: x in ["1", "true", "t", "yes", "solved"]).sum()
-                    topic_scores[topic] = success_count / len(rows_with_topic)
-                else:
-                    # presence implies some familiarity; assign a weak-medium score
-                    topic_scores[topic] = 0.4 + min(0.5, len(rows_with_topic) / 50)
-
-        # Sort by increasing score (weaker first)
-        sorted_topics = sorted(topic_scores.items(), key=lambda x: x[1])
-        return sorted_topics[:top_k]
+        # Sort by increasing score (weaker first); stable so ties keep catalog topic order
+        order = np.argsort(scores, kind="stable")[:top_k]
+        return [(self.topic_names[i], float(scores[i])) for i in order]
 
     def gfg_link_for_topic(self, topic: str) -> str:
         """Return a GeeksforGeeks search/tag URL for the topic."""
@@ -197,85 +667,170 @@ class Recommender:
         q = urllib.parse.quote_plus(f"striver {t} dsa")
         return f"https://www.youtube.com/results?search_query={q}"
 
-    def train_random_forest(self, user_df: pd.DataFrame, min_samples: int = 10) -> Tuple[bool, dict]:
-        """Train a RandomForestClassifier using user-labeled solved/not-solved data.
+    def rf_features(self) -> csr_matrix:
+        """Candidate feature matrix for the RandomForest path: TF-IDF row + encoded difficulty.
 
-        Returns (success_flag, info_dict). info_dict includes trained_model and training_size.
+        Built once per fitted model (on first use) and indexed by catalog row id, so training and
+        inference slice rows instead of re-transforming titles.
         """
-        # Detect solved column
-        solved_col = None
-        for c in ["status", "solved", "is_solved", "result"]:
-            if c in user_df.columns:
-                solved_col = c
-                break
-
-        if solved_col is None:
+        if self._rf_features is None:
+            diff_map = {"easy": 0, "medium": 1, "hard": 2}
+            diffs = self.system_df.get("difficulty", pd.Series("", index=self.system_df.index))
+            diffs = diffs.astype(str).str.lower().map(diff_map).fillna(-1).astype(int).values.reshape(-1, 1)
+            self._rf_features = hstack([self.tfidf_matrix, diffs]).tocsr()
+        return self._rf_features
+
+    def rf_training_data(self, user_df, min_samples: int = 10) -> Tuple[bool, dict]:
+        """Match the user's labelled rows to catalog rows by normalized title.
+
+        Returns (success_flag, info_dict); on success info_dict has `rows` (catalog row ids) and
+        `labels` (1 = solved), one entry per matched (catalog row, user row) pair.
+        """
+        ctx = self.user_context(user_df)
+        if ctx.solved is None:
             return False, {"reason": "No solved/status column found in user data."}
 
         # Map user labels to system rows by title
-        system = self.system_df.copy()
-        system["_title_norm"] = system.get("title", "").astype(str).str.lower().str.strip()
-        user = user_df.copy()
-        user["_title_norm"] = user.get("title", "").astype(str).str.lower().str.strip()
-
-        merged = pd.merge(system.reset_index(), user[["_title_norm", solved_col]], on="_title_norm", how="inner")
-        if merged.shape[0] < min_samples:
-            return False, {"reason": f"Not enough matched labeled examples (found {merged.shape[0]}). Require >= {min_samples}."}
-
-        # Prepare features: TF-IDF vectors + difficulty encoded
-        text_feats = self.vectorizer.transform(merged["topic_tags"].astype(str) + " " + merged.get("title", "").astype(str))
-        # Difficulty numeric
-        diff_map = {"easy": 0, "medium": 1, "hard": 2}
-        diffs = merged.get("difficulty", "").astype(str).str.lower().map(diff_map).fillna(-1).astype(int).values.reshape(-1, 1)
-        X = hstack([text_feats, diffs])
+        rows, labels = ctx.labelled_rows()
+        if len(rows) < min_samples:
+            return False, {"reason": f"Not enough matched labeled examples (found {len(rows)}). Require >= {min_samples}."}
+        if len(np.unique(labels)) < 2:
+            return False, {"reason": "Need both solved and unsolved examples to train."}
+        return True, {"rows": rows, "labels": labels}
+
+    def train_random_forest(self, user_df, min_samples: int = 10) -> Tuple[bool, dict]:
+        """Train a RandomForestClassifier using user-labeled solved/not-solved data.
 
-        # Build labels
-        y = merged[solved_col].astype(str).str.lower().apply(lambda x: 1 if x in ["1", "true", "t", "yes", "solved"] else 0).values
+        Returns (success_flag, info_dict). info_dict includes trained_model and training_size.
+        """
+        ok, info = self.rf_training_data(user_df, min_samples=min_samples)
+        if not ok:
+            return False, info
+
+        clf = fit_forest(self.rf_features()[info["rows"]], info["labels"])
+        return True, {"model": clf, "train_size": len(info["rows"]), "merged_index": info["rows"]}
+
+    def _similar_questions(self) -> list:
+        """The `similar_questions` cell of every catalog row (heavy, so not part of `DATA_COLUMNS`)."""
+        n = len(self.system_df)
+        if "similar_questions" in self.system_df.columns:
+            return self.system_df["similar_questions"].tolist()
+        values = []
+        store = ColumnarDataset.open(self.dataset_path) if self.dataset_path else None
+        if store is not None and "similar_questions" in store.specs:
+            values = store.text("similar_questions").to_list()
+        elif self.system_csv and os.path.isabs(self.system_csv) and os.path.exists(self.system_csv):
+            # an absolute path means load_data read this CSV; rows appended later come after ours
+            try:
+                values = pd.read_csv(self.system_csv, usecols=["similar_questions"])["similar_questions"].tolist()
+            except ValueError:
+                values = []
+        return (values + [None] * n)[:n]
 
-        clf = RandomForestClassifier(n_estimators=100, random_state=42)
-        clf.fit(X, y)
+    def neighbor_graph(self, k: int = 20) -> csr_matrix:
+        """Item-to-item neighbour graph (see `neighbor_graph`), built on first use.
 
-        return True, {"model": clf, "train_size": merged.shape[0], "merged_index": merged["index"].values}
+        Loaded from `neighbors_path` when another worker already built it for this dataset,
+        otherwise built from the TF-IDF matrix and `similar_questions` links and saved there.
+        """
+        if self._neighbors is None:
+            n = self.tfidf_matrix.shape[0]
+            graph = load_graph(self.neighbors_path) if self.neighbors_path else None
+            if graph is None or graph.shape[0] != n:
+                with stage("neighbor_graph_build"):
+                    links = link_pairs(self._similar_questions(), self.title_index)
+                    graph = build_neighbor_graph(self.tfidf_matrix, k=k, links=links)
+                if self.neighbors_path:
+                    try:
+                        save_graph(self.neighbors_path, graph, k)
+                    except OSError:
+                        pass
+            self._neighbors = graph
+        return self._neighbors
+
+    def similar_to(self, rows, limit: int, exclude_titles=(), candidates: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(row ids, scores) of up to `limit` problems most linked to catalog `rows`.
+
+        Scores are summed neighbour-edge weights, so only the neighbour lists of `rows` are read.
+        The given rows and titles in `exclude_titles` are skipped, and with `candidates` (sorted
+        row ids) only those rows are returned; ties keep catalog order.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        ids, scores = aggregate(self.neighbor_graph(), rows)
+        keep = ~np.isin(ids, rows)
+        if candidates is not None:
+            keep &= np.isin(ids, candidates)
+        for t in exclude_titles:
+            hit = self.title_index.get(t)
+            if hit is not None:
+                keep &= ~np.isin(ids, hit)
+        ids, scores = ids[keep], scores[keep]
+        order = np.lexsort((ids, -scores))[:limit]
+        return ids[order], scores[order]
+
+    @timed("similar")
+    def recommend_similar(self, user_df, top_n: int = 10, exclude_titles=(),
+                          filters: Optional[dict] = None) -> pd.DataFrame:
+        """"More like these": problems neighbouring the user's solved problems in the graph.
+
+        Per-request cost depends on the number of solved problems, not the catalog size. Returns
+        an empty frame when none of the user's problems are in the catalog.
+        """
+        if self.system_df is None or self.tfidf_matrix is None:
+            self.fit()
+        rows = self.user_context(user_df).rows
+        if len(rows) == 0:
+            return pd.DataFrame()
+        ids, scores = self.similar_to(rows, top_n, exclude_titles=exclude_titles, candidates=self.candidate_rows(filters))
+        recs = self.system_df.iloc[ids].copy()
+        recs["score"] = scores
+        return recs
 
-    def recommend_with_rf(self, user_df: pd.DataFrame, top_n: int = 10) -> pd.DataFrame:
+    @timed("rf_predict")
+    def recommend_with_rf(self, user_df, top_n: int = 10, model=None,
+                          filters: Optional[dict] = None) -> pd.DataFrame:
         """Use RF trained on user's solved labels to recommend problems (highest predicted probability of solvability).
 
-        If training is not possible, returns empty dataframe.
+        `model` may be a classifier already trained for this user (see `ForestCache`); otherwise
+        one is trained inline. If training is not possible, returns empty dataframe. With
+        `filters`, only the matching rows are scored by the forest.
         """
         if self.system_df is None or self.tfidf_matrix is None:
             self.fit()
 
-        ok, info = self.train_random_forest(user_df)
-        if not ok:
-            # Fallback: empty
-            return pd.DataFrame()
-
-        clf = info["model"]
+        ctx = self.user_context(user_df)
+        clf = model
+        if clf is None:
+            ok, info = self.train_random_forest(ctx)
+            if not ok:
+                # Fallback: empty
+                return pd.DataFrame()
+            clf = info["model"]
 
-        system = self.system_df.copy().reset_index()
         # Exclude problems the user already has
-        user_titles = set(user_df.get("title", pd.Series([], dtype=object)).astype(str).str.lower().str.strip())
-        candidates = system[~system.get("title", "").astype(str).str.lower().str.strip().isin(user_titles)].reset_index(drop=True)
-
-        text_feats = self.vectorizer.transform(candidates["topic_tags"].astype(str) + " " + candidates.get("title", "").astype(str))
-        diff_map = {"easy": 0, "medium": 1, "hard": 2}
-        diffs = candidates.get("difficulty", "").astype(str).str.lower().map(diff_map).fillna(-1).astype(int).values.reshape(-1, 1)
-        X_cand = hstack([text_feats, diffs])
-
-        probs = clf.predict_proba(X_cand)[:, 1]
-        top_idx = np.argsort(probs)[::-1][:top_n]
+        rows = self.candidate_rows(filters)
+        features = self.rf_features() if rows is None else self.rf_features()[rows]
+        exclude = ctx.exclusion_mask()
+        if features.shape[0] == 0:
+            return pd.DataFrame()
+        probs = clf.predict_proba(features)[:, list(clf.classes_).index(1)]
+        top_idx = self.top_k(probs, top_n, exclude=exclude if rows is None else exclude[rows])
 
-        recs = candidates.iloc[top_idx].copy()
+        recs = self.system_df.iloc[top_idx if rows is None else rows[top_idx]].copy()
         recs["score"] = probs[top_idx]
         return recs
 
+    @timed("append")
     def append_new_problems(self, user_df: pd.DataFrame) -> int:
         """Append new problems from user_df into the system CSV. Match by title (case-insensitive).
 
+        Rows are written in the CSV's column order. The in-memory snapshot is not changed;
+        `ModelRegistry` picks the appended rows up and ingests them with `extend`.
+
         Returns number of appended rows.
         """
-        system = pd.read_csv(self.system_csv)
-        existing_titles = set(system.get("title", pd.Series([], dtype=object)).astype(str).str.lower())
+        header = pd.read_csv(self.system_csv, nrows=0).columns
+        existing_titles = set(pd.read_csv(self.system_csv, usecols=["title"])["title"].astype(str).str.lower())
 
         to_append = []
         for _, row in user_df.iterrows():
@@ -284,12 +839,13 @@ class Recommender:
                 continue
             if title.lower() in existing_titles:
                 continue
+            existing_titles.add(title.lower())
             to_append.append(row)
 
         if len(to_append) == 0:
             return 0
 
-        append_df = pd.DataFrame(to_append)
+        append_df = pd.DataFrame(to_append).reindex(columns=header)
         append_df.to_csv(self.system_csv, mode="a", header=False, index=False)
         return len(append_df)
 
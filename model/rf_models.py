@@ -0,0 +1,112 @@
+import os
+import time
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from cache import TTLCache
+from metrics import observe_stage
+from recommender import fit_forest
+
+
+class ForestCache:
+    """Per-user RandomForest models, trained off the request thread.
+
+    Models are keyed by user and tagged with a fingerprint of the user's labelled catalog rows
+    (plus the feature version, since features depend on the vocabulary). A request gets:
+
+    - the cached classifier when the fingerprint matches (no training at all);
+    - the previous classifier for that user while a retrain for new solves runs in the pool;
+    - None while the user's first model is training, so the caller can serve TF-IDF
+      recommendations in the meantime.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, maxsize: int = 256, ttl: float = 6 * 3600,
+                 executor: Optional[Executor] = None):
+        if max_workers is None:
+            max_workers = int(os.environ.get("RF_TRAIN_WORKERS", 1))
+        self.max_workers = max_workers
+        self._executor = executor
+        self._models = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.trained = 0
+        self.failed = 0
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            # spawn, not fork: the server's other threads may hold locks a forked child would inherit
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    @staticmethod
+    def fingerprint(version: str, rows: np.ndarray, labels: np.ndarray) -> str:
+        order = np.lexsort((labels, rows))
+        h = hashlib.sha1(str(version).encode("utf-8"))
+        h.update(np.ascontiguousarray(rows[order], dtype=np.int64).tobytes())
+        h.update(np.ascontiguousarray(labels[order], dtype=np.int8).tobytes())
+        return h.hexdigest()
+
+    def get(self, user_key: str, recommender, user_df: pd.DataFrame):
+        """Return a classifier usable for this user right now, scheduling training if needed."""
+        ok, info = recommender.rf_training_data(user_df)
+        if not ok:
+            return None
+        fp = self.fingerprint(recommender.feature_version, info["rows"], info["labels"])
+        key = user_key or fp
+        entry = self._models.get(key)
+        if entry is not None and entry[0] == fp:
+            return entry[2]
+
+        self._schedule(key, fp, recommender, info)
+        if entry is not None and entry[1] == recommender.feature_version:
+            # same feature space: keep serving the previous model until the retrain lands
+            return entry[2]
+        return None
+
+    def _schedule(self, key: str, fp: str, recommender, info: dict):
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None and pending[0] == fp:
+                return
+            X = recommender.rf_features()[info["rows"]]
+            submitted = time.perf_counter()
+            future = self._pool().submit(fit_forest, X, info["labels"])
+            self._pending[key] = (fp, future)
+        version = recommender.feature_version
+
+        def done(fut):
+            try:
+                clf = fut.result()
+                observe_stage("rf_train", time.perf_counter() - submitted)
+                self.trained += 1
+                self._models.set(key, (fp, version, clf))
+            except Exception:
+                self.failed += 1
+            with self._lock:
+                if self._pending.get(key, (None,))[0] == fp:
+                    del self._pending[key]
+
+        future.add_done_callback(done)
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until all scheduled trainings finish (used by tests and benchmarks)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._pending:
+            if deadline is not None and time.monotonic() > deadline:
+                return
+            time.sleep(0.01)
+
+    def stats(self) -> dict:
+        return {
+            "models": self._models.stats(),
+            "pending": len(self._pending),
+            "trained": self.trained,
+            "failed": self.failed,
+        }
@@ -0,0 +1,35 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from metrics import timed
+
+
+# Fields of one problem in API responses (plus `score` for ranked results)
+RESPONSE_FIELDS = ("title", "difficulty", "topic_tags", "company", "gfg_link", "striver_link")
+
+
+@timed("serialize")
+def problem_records(recommender, row_ids: Iterable[int], scores: Optional[Iterable[float]] = None) -> List[Dict]:
+    """Response dicts for catalog rows `row_ids`, built column-wise from `recommender.display`.
+
+    Each field is one fancy-index plus `tolist()` (which also turns numpy scalars into plain
+    Python values for JSON); rows are then zipped together, like `DataFrame.to_dict('records')`
+    without constructing a frame.
+    """
+    ids = np.asarray(row_ids, dtype=np.intp)
+    columns = {name: recommender.display[name][ids].tolist() for name in RESPONSE_FIELDS}
+    if scores is not None:
+        columns["score"] = np.asarray(scores, dtype=float).tolist()
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def frame_records(recommender, recs: pd.DataFrame) -> List[Dict]:
+    """`problem_records` for a result frame from `Recommender.recommend*` (indexed by row id).
+
+    Frames without a `score` column (the no-profile fallback) are reported with score 0.
+    """
+    scores = recs["score"] if "score" in recs.columns else np.zeros(len(recs))
+    return problem_records(recommender, recs.index, scores)
@@ -0,0 +1,138 @@
+"""Concurrent request stages and the production server for the model service.
+
+Routes start their independent stages as futures and only block where they need a result:
+
+- `pool.io(fn, ...)`: upstream calls and SQLite (LeetCode fetch, history read) on a wide pool,
+  so a slow upstream overlaps the request's local work;
+- `pool.cpu(fn, ...)`: scoring and weak-topic analysis on a small pool, so
+  at most `SERVE_CPU_WORKERS` stages compute at once however many requests are in flight
+  (numpy/scipy kernels release the GIL for the heavy parts).
+
+The request thread still blocks on the futures it needs, so a serve worker is held for the
+whole request, upstream waits included. Overlap shortens each request (the upstream fetch runs
+alongside local work) but does not free workers: once the CPU pool is saturated, throughput is
+the same as running the stages in sequence.
+
+Scope: this is a thread-per-request server, not an async one. While upstream is slow, the
+users one process serves at once are bounded by its threads (SERVE_THREADS, SERVE_IO_WORKERS
+and the LeetCode client's LEETCODE_LOOKUP_WORKERS); otherwise by the CPU spent scoring.
+Releasing workers during upstream I/O would take an ASGI server, async views and an async HTTP
+client, none of which the service depends on, so there is no such path here.
+
+Configuration: SERVE_IO_WORKERS (default 32), SERVE_CPU_WORKERS (default: CPU count) and
+SERVE_OVERLAP (default 1; 0 runs every stage inline, the sequential baseline).
+
+`serve(app)` is the production server: werkzeug's WSGI server without the debugger and reloader,
+handling connections on a fixed pool of SERVE_THREADS workers (default 64).
+"""
+import os
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+from werkzeug.serving import ThreadedWSGIServer, WSGIRequestHandler
+
+from metrics import current_profile, use_profile
+
+
+logger = logging.getLogger(__name__)
+
+
+class StagePool:
+    """IO and CPU executors for request stages; stage timings land in the submitting request's profile."""
+
+    def __init__(self, io_workers: Optional[int] = None, cpu_workers: Optional[int] = None,
+                 overlap: Optional[bool] = None):
+        if io_workers is None:
+            io_workers = int(os.environ.get("SERVE_IO_WORKERS", 32))
+        if cpu_workers is None:
+            cpu_workers = int(os.environ.get("SERVE_CPU_WORKERS", os.cpu_count() or 2))
+        if overlap is None:
+            overlap = os.environ.get("SERVE_OVERLAP", "1") != "0"
+        self.overlap = overlap
+        self._pools = {
+            "io": ThreadPoolExecutor(max_workers=max(1, io_workers), thread_name_prefix="stage-io"),
+            "cpu": ThreadPoolExecutor(max_workers=max(1, cpu_workers), thread_name_prefix="stage-cpu"),
+        }
+        self.workers = {"io": max(1, io_workers), "cpu": max(1, cpu_workers)}
+        self.inflight = {"io": 0, "cpu": 0}
+        self.submitted = {"io": 0, "cpu": 0}
+        self._lock = threading.Lock()
+
+    def _track(self, kind: str, delta: int):
+        with self._lock:
+            self.inflight[kind] += delta
+            if delta > 0:
+                self.submitted[kind] += 1
+
+    def _submit(self, kind: str, fn, args, kwargs) -> Future:
+        if not self.overlap:
+            future = Future()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            return future
+
+        stages = current_profile()
+        self._track(kind, 1)
+
+        def run():
+            try:
+                with use_profile(stages):
+                    return fn(*args, **kwargs)
+            finally:
+                self._track(kind, -1)
+
+        return self._pools[kind].submit(run)
+
+    def io(self, fn, *args, **kwargs) -> Future:
+        """Run blocking I/O (upstream HTTP, SQLite) off the request thread."""
+        return self._submit("io", fn, args, kwargs)
+
+    def cpu(self, fn, *args, **kwargs) -> Future:
+        """Run CPU-heavy work on the bounded compute pool."""
+        return self._submit("cpu", fn, args, kwargs)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"overlap": self.overlap, "workers": dict(self.workers),
+                    "inflight": dict(self.inflight), "submitted": dict(self.submitted)}
+
+    def shutdown(self):
+        for pool in self._pools.values():
+            pool.shutdown(wait=False)
+
+
+class _RequestHandler(WSGIRequestHandler):
+    # one request per connection: an idle keep-alive client would otherwise pin a pool worker
+    protocol_version = "HTTP/1.0"
+
+
+class PooledWSGIServer(ThreadedWSGIServer):
+    """Werkzeug's threaded server with a fixed pool of workers instead of a thread per connection."""
+
+    def __init__(self, host: str, port: int, app, threads: int):
+        super().__init__(host, port, app, handler=_RequestHandler)
+        self.threads = threads
+        self._workers = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="serve")
+
+    def process_request(self, request, client_address):
+        self._workers.submit(self.process_request_thread, request, client_address)
+
+    def server_close(self):
+        super().server_close()
+        self._workers.shutdown(wait=False)
+
+
+def serve(app, host: str = "0.0.0.0", port: int = 8501, threads: Optional[int] = None):
+    """Serve `app` until interrupted (production mode)."""
+    if threads is None:
+        threads = int(os.environ.get("SERVE_THREADS", 64))
+    server = PooledWSGIServer(host, port, app, threads)
+    logger.info("Serving on http://%s:%d with %d workers", host, server.server_port, threads)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -0,0 +1,158 @@
+"""Synthetic LeetCode-shaped catalogs and user histories for benchmarks and tests.
+
+    catalog = synthetic_catalog(100_000, full=True)  # every column of the bundled CSV
+    user = synthetic_user(catalog, 500, attempted=100)
+    write_catalog("/tmp/catalog.csv", catalog)
+    FakeLeetCode(leetcode_problems(catalog), solved=set(user["title"]))
+
+Generation is seeded; a full million-row catalog takes about 15 seconds.
+Full catalogs carry a `topic_tags` column (equal to `related_topics`) so the recommender
+has topics to index.
+"""
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+
+TOPICS = [
+    "Array", "String", "Hash Table", "Dynamic Programming", "Math", "Sorting", "Greedy",
+    "Depth-First Search", "Breadth-First Search", "Binary Search", "Tree", "Binary Tree",
+    "Matrix", "Two Pointers", "Bit Manipulation", "Stack", "Heap (Priority Queue)", "Graph",
+    "Design", "Prefix Sum", "Simulation", "Backtracking", "Sliding Window", "Union Find",
+    "Linked List", "Trie", "Recursion", "Divide and Conquer", "Queue", "Monotonic Stack",
+]
+WORDS = [
+    "maximum", "minimum", "sum", "subarray", "substring", "path", "tree", "node", "graph",
+    "palindrome", "sequence", "number", "count", "ways", "string", "array", "matrix", "range",
+    "query", "interval", "distance", "cost", "valid", "longest", "shortest", "k", "pairs",
+    "binary", "search", "sorted", "unique", "island", "window", "stack", "queue", "design",
+    "partition", "merge", "reverse", "rotate", "jump", "game", "coins", "schedule", "word",
+]
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
+FAANG = ["Facebook", "Amazon", "Apple", "Netflix", "Google"]
+COMPANIES = FAANG + [
+    "Microsoft", "Bloomberg", "Adobe", "Uber", "Oracle", "LinkedIn", "Twitter", "Goldman Sachs",
+    "Airbnb", "ByteDance", "Salesforce", "Yahoo", "Cisco", "Walmart Labs", "Intuit", "Nvidia",
+]
+# Column order of the bundled cleaned_leetcode_dataset.csv
+CSV_COLUMNS = [
+    "id", "title", "is_premium", "difficulty", "acceptance_rate", "url", "discuss_count", "accepted",
+    "submissions", "companies", "related_topics", "likes", "dislikes", "rating", "asked_by_faang",
+    "similar_questions",
+]
+
+
+def _join_choices(rng, names: List[str], counts: np.ndarray, chunk: int = 100_000) -> List[str]:
+    """One comma-joined string per row, with `counts[i]` distinct names."""
+    out = []
+    width = int(counts.max()) if len(counts) else 0
+    for start in range(0, len(counts), chunk):
+        # the first k columns of a random permutation per row are k distinct names
+        perm = np.argsort(rng.random((min(chunk, len(counts) - start), len(names))), axis=1)[:, :width]
+        for row, k in zip(perm.tolist(), counts[start:start + chunk].tolist()):
+            out.append(",".join([names[j] for j in row[:k]]))
+    return out
+
+
+def _abbreviate(values: np.ndarray) -> List[str]:
+    """Counts written the way the CSV has them ("4.1M", "512.3K", "87")."""
+    out = []
+    for v in values.tolist():
+        if v >= 1_000_000:
+            out.append(f"{v / 1_000_000:.1f}M")
+        elif v >= 1_000:
+            out.append(f"{v / 1_000:.1f}K")
+        else:
+            out.append(str(v))
+    return out
+
+
+def synthetic_catalog(n: int, seed: int = 0, full: bool = False) -> pd.DataFrame:
+    """Catalog of `n` problems with unique titles and 1-4 comma-joined topic tags.
+
+    With `full`, every column of the bundled CSV is generated too (companies, counts,
+    acceptance rate, FAANG flag, `similar_questions` links, ...), in the CSV's order.
+    """
+    rng = np.random.default_rng(seed)
+    words = np.array(WORDS, dtype=object)
+    picks = rng.integers(0, len(words), size=(n, 3))
+    titles = [f"{words[a].title()} {words[b]} {words[c]} {i}" for i, (a, b, c) in enumerate(picks)]
+    tags = _join_choices(rng, TOPICS, rng.integers(1, 5, size=n))
+    difficulty = rng.choice(DIFFICULTIES, size=n, p=[0.3, 0.5, 0.2])
+    if not full:
+        return pd.DataFrame({
+            "id": np.arange(1, n + 1),
+            "title": titles,
+            "difficulty": difficulty,
+            "topic_tags": tags,
+        })
+
+    companies = _join_choices(rng, COMPANIES, rng.integers(0, 7, size=n))
+    faang_names = set(FAANG)
+    faang = np.array([any(c in faang_names for c in row.split(",")) for row in companies], dtype=np.int64)
+    submissions = rng.lognormal(11, 1.5, size=n).astype(np.int64) + 10
+    acceptance = rng.uniform(15, 85, size=n)
+    accepted = (submissions * acceptance / 100).astype(np.int64)
+    slugs = [t.lower().replace(" ", "-") for t in titles]
+    # 0-3 links to random other problems, in the CSV's "[Title, /problems/slug/, Difficulty]" form
+    n_links = rng.integers(0, 4, size=n)
+    targets = rng.integers(0, n, size=int(n_links.sum()))
+    similar, pos = [], 0
+    for k in n_links.tolist():
+        links = targets[pos:pos + k].tolist()
+        pos += k
+        similar.append(", ".join(f"[{titles[j]}, /problems/{slugs[j]}/, {difficulty[j]}]" for j in links))
+    likes = rng.integers(0, 20000, size=n)
+    return pd.DataFrame({
+        "id": np.arange(1, n + 1),
+        "title": titles,
+        "is_premium": (rng.random(n) < 0.15).astype(np.int64),
+        "difficulty": difficulty,
+        "acceptance_rate": acceptance.round(1),
+        "url": [f"https://leetcode.com/problems/{s}" for s in slugs],
+        "discuss_count": rng.integers(0, 1000, size=n),
+        "accepted": _abbreviate(accepted),
+        "submissions": _abbreviate(submissions),
+        "companies": companies,
+        "related_topics": tags,
+        "likes": likes,
+        "dislikes": rng.integers(0, 5000, size=n),
+        "rating": rng.integers(0, 100, size=n),
+        "asked_by_faang": faang,
+        "similar_questions": similar,
+        "topic_tags": tags,
+    })
+
+
+def synthetic_user(catalog: pd.DataFrame, n_solved: int, seed: int = 1, attempted: int = 0) -> pd.DataFrame:
+    """Solved-problem rows shaped like `LeetCodeClient.get_user_solved_problems` output.
+
+    `attempted` adds that many unsolved rows (status "attempted"), which the RandomForest
+    path needs as negative examples.
+    """
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(catalog), size=min(n_solved + attempted, len(catalog)), replace=False)
+    user = catalog.iloc[rows][["title", "difficulty", "topic_tags"]].reset_index(drop=True)
+    user["status"] = ["solved" if i < n_solved else "attempted" for i in range(len(user))]
+    return user
+
+
+def leetcode_problems(catalog: pd.DataFrame) -> List[Dict]:
+    """The catalog as `problemsetQuestionList` entries, for `fake_leetcode.FakeLeetCode`."""
+    acceptance = catalog["acceptance_rate"] if "acceptance_rate" in catalog.columns else pd.Series(50.0, index=catalog.index)
+    return [{
+        "title": title,
+        "difficulty": difficulty,
+        "topicTags": [{"name": t} for t in tags.split(",") if t],
+        "acRate": float(rate),
+    } for title, difficulty, tags, rate in zip(catalog["title"], catalog["difficulty"],
+                                               catalog["topic_tags"].fillna(""), acceptance)]
+
+
+def write_catalog(path: str, catalog: pd.DataFrame) -> str:
+    """Write a catalog as the system CSV (bundled column order first, extra columns after)."""
+    order = [c for c in CSV_COLUMNS if c in catalog.columns]
+    order += [c for c in catalog.columns if c not in order]
+    catalog[order].to_csv(path, index=False)
+    return path
@@ -0,0 +1,42 @@
+import os
+
+import numpy as np
+
+from artifact_store import load_arrays, prune_artifacts, read_meta, write_artifact
+
+
+def test_round_trip_is_memory_mapped(tmp_path):
+    path = str(tmp_path / "thing-v1-abc")
+    arrays = {"a": np.arange(5, dtype=np.int64), "b.codes": np.array([1, 0], dtype=np.int8)}
+    assert write_artifact(path, arrays, {"rows": 5}, format_version=1) == path
+
+    assert read_meta(path, 1) == {"format": 1, "rows": 5}
+    loaded = load_arrays(path, ("a", "b.codes"))
+    assert isinstance(loaded["a"], np.memmap) and not loaded["a"].flags.writeable
+    assert loaded["a"].tolist() == list(range(5)) and loaded["b.codes"].dtype == np.int8
+    # no temporary directory is left behind
+    assert os.listdir(tmp_path) == ["thing-v1-abc"]
+
+
+def test_other_format_or_missing_meta_reads_as_none(tmp_path):
+    path = str(tmp_path / "thing")
+    write_artifact(path, {}, {}, format_version=1, meta_file="schema.json")
+    assert read_meta(path, 1, meta_file="schema.json") is not None
+    assert read_meta(path, 2, meta_file="schema.json") is None
+    assert read_meta(path, 1) is None
+    assert read_meta(str(tmp_path / "missing"), 1) is None
+
+
+def test_existing_artifact_is_kept(tmp_path):
+    path = str(tmp_path / "thing")
+    write_artifact(path, {"a": np.zeros(2)}, {"n": 1}, format_version=1)
+    write_artifact(path, {"a": np.ones(3)}, {"n": 2}, format_version=1)
+    assert read_meta(path, 1)["n"] == 1 and load_arrays(path, ("a",))["a"].tolist() == [0.0, 0.0]
+
+
+def test_prune_keeps_current_and_other_kinds(tmp_path):
+    for name in ("tfidf-v1-old", "tfidf-v1-new", "lsa-v1-old"):
+        write_artifact(str(tmp_path / name), {}, {}, format_version=1)
+    prune_artifacts(str(tmp_path), keep=str(tmp_path / "tfidf-v1-new"), prefix="tfidf-")
+    assert sorted(os.listdir(tmp_path)) == ["lsa-v1-old", "tfidf-v1-new"]
+    prune_artifacts(str(tmp_path / "missing"), keep=None, prefix="tfidf-")
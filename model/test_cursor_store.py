@@ -0,0 +1,64 @@
+import io
+import time
+import types
+
+import numpy as np
+
+from cursor_store import CursorStore
+
+
+def _model(version="v1"):
+    return types.SimpleNamespace(version=version)
+
+
+def test_pages_until_exhausted_and_expires(tmp_path):
+    for store in (CursorStore(ttl=0.2), CursorStore(ttl=0.2, path=str(tmp_path / "history.db"))):
+        token = store.create(_model(), np.arange(5), np.linspace(1, 0, 5), username="alice")
+        cursor = store.get(token)
+        ids, scores = cursor.next_page(2)
+        assert ids.tolist() == [0, 1] and scores.tolist() == [1.0, 0.75] and cursor.has_more
+        assert store.get(token).next_page(2)[0].tolist() == [2, 3]
+        ids, _ = store.get(token).next_page(2)
+        assert ids.tolist() == [4] and not store.get(token).has_more
+        assert store.get(token).next_page(2)[0].tolist() == []
+
+        idle = store.create(_model(), np.arange(3), np.zeros(3))
+        time.sleep(0.3)
+        assert store.get(idle) is None and store.get("unknown") is None
+        store.discard(token)
+        assert store.get(token) is None
+
+
+def test_shared_store_continues_on_another_worker(tmp_path):
+    path = str(tmp_path / "history.db")
+    first, second = CursorStore(path=path), CursorStore(path=path)
+    token = first.create(_model(), np.arange(10, 20), np.ones(10), username="bob")
+    assert first.get(token).next_page(4)[0].tolist() == [10, 11, 12, 13]
+
+    # another worker on the same model version picks up where the first left off
+    cursor = second.get(token, _model())
+    assert cursor.username == "bob" and cursor.next_page(4)[0].tolist() == [14, 15, 16, 17]
+    assert first.get(token).next_page(4)[0].tolist() == [18, 19] and not first.get(token).has_more
+    # a worker that has since moved to another model cannot serve the row ids
+    assert CursorStore(path=path).get(token, _model("v2")) is None
+
+    second.discard(token)
+    assert first.get(token) is None
+
+
+def test_recommend_more_pages_and_answers_410(tmp_path, monkeypatch):
+    monkeypatch.setenv("HISTORY_DB", str(tmp_path / "history.db"))
+    monkeypatch.setenv("MODEL_ARTIFACT_DIR", str(tmp_path / "artifacts"))
+    import app
+
+    client = app.app.test_client()
+    upload = b"title,topic_tags\nTwo Sum,\"Array,Hash Table\"\n"
+    first = client.post("/recommend/more", data={"file": (io.BytesIO(upload), "u.csv")},
+                        content_type="multipart/form-data").get_json()
+    assert len(first["recommended"]) == 12 and first["has_more"]
+    second = client.post("/recommend/more", json={"cursor": first["cursor"], "page_size": 5}).get_json()
+    assert len(second["recommended"]) == 5
+    assert not {r["title"] for r in second["recommended"]} & {r["title"] for r in first["recommended"]}
+
+    gone = client.post("/recommend/more", json={"cursor": "no-such-cursor"})
+    assert gone.status_code == 410 and gone.get_json()["expired"] is True
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from dataset_store import ColumnarDataset, build_dataset, parse_count
+from model_registry import ModelRegistry
+
+
+CSV = (
+    "id,title,difficulty,acceptance_rate,accepted,submissions,companies,related_topics,similar_questions\n"
+    "1,Two Sum,Easy,46.7,4.1M,8.7M,\"Amazon,Google\",\"Array,Hash Table\",\"[3Sum, /problems/3sum/, Medium]\"\n"
+    "2,\"Median of Two Sorted Arrays, Again\",Hard,31.2,904K,\"2,900\",,\"Array,Binary Search\",\n"
+    "3,Add Two Numbers,Medium,35.1,1.2B,x,Amazon,,\n"
+)
+
+
+def test_parse_count():
+    assert parse_count("4.1M") == 4_100_000
+    assert parse_count("904K") == 904_000
+    assert parse_count("2,900") == 2900
+    assert parse_count(float("nan")) == -1 and parse_count("x") == -1
+
+
+def test_round_trip_matches_csv(tmp_path):
+    csv = tmp_path / "problems.csv"
+    csv.write_text(CSV)
+    dataset = ColumnarDataset(build_dataset(str(csv), str(tmp_path / "dataset")))
+    expected = pd.read_csv(csv)
+
+    df = dataset.read()
+    assert list(df.columns) == list(expected.columns)
+    assert df["title"].tolist() == expected["title"].tolist()
+    assert np.array_equal(df["acceptance_rate"].to_numpy(), expected["acceptance_rate"].to_numpy())
+    assert isinstance(df["difficulty"].dtype, pd.CategoricalDtype)
+    assert df["difficulty"].astype(str).tolist() == ["Easy", "Hard", "Medium"]
+    assert df["accepted"].tolist() == [4_100_000, 904_000, 1_200_000_000]
+    assert df["submissions"].tolist() == [8_700_000, 2900, -1]
+    assert df["companies"].tolist()[::2] == ["Amazon,Google", "Amazon"] and pd.isna(df["companies"][1])
+    assert pd.isna(df["similar_questions"][1])
+
+    indptr, indices, vocab = dataset.list_column("companies")
+    assert [vocab[i] for i in indices[indptr[0]:indptr[1]]] == ["Amazon", "Google"]
+    assert dataset.text("similar_questions")[0] == "[3Sum, /problems/3sum/, Medium]"
+    # only the requested columns are materialized
+    assert list(dataset.read(["title", "missing"]).columns) == ["title"]
+
+
+def test_registry_fits_from_columnar_copy(tmp_path):
+    csv = tmp_path / "problems.csv"
+    csv.write_text(CSV)
+    artifacts = tmp_path / "artifacts"
+    first = ModelRegistry(system_csv=str(csv), artifact_dir=str(artifacts)).get()
+    second = ModelRegistry(system_csv=str(csv), artifact_dir=str(artifacts)).get()
+    assert first.dataset_path and second.dataset_path == first.dataset_path
+    assert set(second.system_df.columns) == {"title", "difficulty", "topic_tags"}
+    assert second.system_df["title"].tolist() == pd.read_csv(csv)["title"].tolist()
+
+
+def test_registry_fits_with_blank_difficulty(tmp_path):
+    csv = tmp_path / "problems.csv"
+    csv.write_text(CSV + "4,Blank Difficulty,,50.0,1K,2K,,Array,\n")
+    artifacts = tmp_path / "artifacts"
+    model = ModelRegistry(system_csv=str(csv), artifact_dir=str(artifacts)).get()
+    assert isinstance(model.system_df["difficulty"].dtype, pd.CategoricalDtype)
+    assert pd.isna(model.system_df["difficulty"][3])
+
+    # a title-only append leaves blank difficulties behind for the next full fit
+    assert model.append_new_problems(pd.DataFrame({"title": ["Only A Title"]})) == 1
+    refit = ModelRegistry(system_csv=str(csv), artifact_dir=str(artifacts)).get()
+    assert refit.system_df["title"].tolist()[-1] == "Only A Title"
+    recs = refit.recommend(pd.DataFrame({"title": ["Two Sum"], "topic_tags": ["Array"]}), top_n=2)
+    assert len(recs) == 2
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+from werkzeug.datastructures import MultiDict
+
+from dataset_store import ColumnarDataset, build_dataset
+from filter_index import FilterIndex, parse_filters
+from recommender import Recommender
+from synthetic import synthetic_catalog, synthetic_user
+
+
+CATALOG = pd.DataFrame({
+    "title": ["Two Sum", "LRU Cache", "Word Ladder", "Merge Intervals", "Jump Game"],
+    "difficulty": ["Easy", "Medium", "Hard", "Medium", "Medium"],
+    "topic_tags": ["Array", "Design", "Graph", "Array,Sorting", "Array,Greedy"],
+    "companies": ["Google,Amazon", "amazon,Microsoft", "Google", np.nan, "Google,Bloomberg"],
+    "asked_by_faang": [1, 1, 1, 0, 1],
+    "acceptance_rate": [46.7, 38.5, np.nan, 41.0, 35.2],
+})
+
+
+def test_select_intersects_postings_and_masks(tmp_path):
+    index = FilterIndex.from_frame(CATALOG)
+    assert index.select(None) is None and index.select({}) is None
+    assert index.select({"companies": ["google"]}).tolist() == [0, 2, 4]
+    # one company spelled two ways is one posting list; several companies are OR-ed
+    assert index.select({"companies": ["AMAZON"]}).tolist() == [0, 1]
+    assert index.select({"companies": ["Google", "Microsoft"]}).tolist() == [0, 1, 2, 4]
+    assert index.select({"companies": ["google"], "difficulty": ["medium"]}).tolist() == [4]
+    assert index.select({"difficulty": ["easy", "Hard"]}).tolist() == [0, 2]
+    assert index.select({"faang": False}).tolist() == [3]
+    # unknown acceptance never matches a range
+    assert index.select({"min_acceptance": 36, "max_acceptance": 45}).tolist() == [1, 3]
+    assert index.select({"companies": ["Netflix"]}).tolist() == []
+
+    csv = tmp_path / "catalog.csv"
+    CATALOG.to_csv(csv, index=False)
+    stored = FilterIndex.from_dataset(ColumnarDataset(build_dataset(str(csv), str(tmp_path / "dataset"))))
+    for spec in ({"companies": ["google"], "faang": True}, {"difficulty": ["medium"], "max_acceptance": 40}):
+        assert stored.select(spec).tolist() == index.select(spec).tolist()
+
+    grown = FilterIndex.from_frame(CATALOG.head(3)).extend(CATALOG.tail(2))
+    for spec in ({"companies": ["google"]}, {"companies": ["bloomberg"]}, {"difficulty": ["medium"], "faang": True}):
+        assert grown.select(spec).tolist() == index.select(spec).tolist()
+
+
+def test_parse_filters_from_form_and_json():
+    form = MultiDict([("company", "Google"), ("company", "Amazon,Uber"), ("difficulty", "medium"),
+                      ("faang", "1"), ("min_acceptance", "30"), ("max_acceptance", "")])
+    assert parse_filters(form) == {"companies": ["Google", "Amazon", "Uber"], "difficulty": ["medium"],
+                                   "faang": True, "min_acceptance": 30.0}
+    assert parse_filters({"companies": ["Google"], "faang": False}) == {"companies": ["Google"], "faang": False}
+    assert parse_filters({"leetcode_username": "x"}) is None
+    try:
+        parse_filters({"min_acceptance": "lots"})
+    except ValueError as e:
+        assert "min_acceptance" in str(e)
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def test_filtered_ranking_matches_post_filtering():
+    rec = Recommender.from_dataframe(synthetic_catalog(3000, full=True))
+    user = synthetic_user(rec.system_df, 60, attempted=20)
+    full_ids, full_scores = rec.rank(user, 3000)
+    # narrow (scored on the sliced rows) and broad (scored everywhere, then masked) filters
+    for spec in ({"companies": ["Google"], "difficulty": ["Medium"]}, {"difficulty": ["Medium", "Hard"]}):
+        allowed = rec.candidate_rows(spec)
+        expected = full_ids[np.isin(full_ids, allowed)][:12]
+        ids, scores = rec.rank(user, 12, filters=spec)
+        assert np.allclose(scores, full_scores[np.isin(full_ids, allowed)][:12])
+        assert set(ids) <= set(allowed) and len(ids) == len(expected)
+        recs = rec.recommend(user, 12, filters=spec)
+        assert set(recs.index) <= set(allowed)
+        batch = rec.recommend_many([user], 12, filters=spec)[0]
+        assert np.allclose(batch["score"].to_numpy(), scores)
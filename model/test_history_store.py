@@ -0,0 +1,33 @@
+import json
+from multiprocessing import get_context
+
+from history_store import HistoryStore
+
+
+def _append(args):
+    path, worker = args
+    store = HistoryStore(path)
+    for i in range(50):
+        store.add("shared", [f"Problem {worker}-{i}"])
+
+
+def test_appends_from_several_processes_are_not_lost(tmp_path):
+    path = str(tmp_path / "history.db")
+    HistoryStore(path)
+    with get_context("spawn").Pool(4) as pool:
+        pool.map(_append, [(path, w) for w in range(4)])
+    assert len(HistoryStore(path).get("shared")) == 200
+
+
+def test_migrates_legacy_json_once(tmp_path):
+    legacy = tmp_path / "user_history.json"
+    legacy.write_text(json.dumps({"alice": ["Two Sum", " Add Two Numbers"], "bob": []}))
+    path = str(tmp_path / "history.db")
+    store = HistoryStore(path, legacy_json=str(legacy))
+    assert store.get("alice") == {"two sum", "add two numbers"}
+    store.add("alice", ["Reverse Integer"])
+
+    # a later start must not re-import (or duplicate) anything
+    assert HistoryStore(path, legacy_json=str(legacy)).migrate_json(str(legacy)) == 0
+    assert store.get("alice") == {"two sum", "add two numbers", "reverse integer"}
+    assert store.get("bob") == set()
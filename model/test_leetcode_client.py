@@ -0,0 +1,95 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fake_leetcode import FakeLeetCode, make_problems
+from leetcode_client import CoalescingLeetCodeClient, LeetCodeClient
+from problem_catalog import ProblemCatalog
+
+
+def _skips(fake, filters=None):
+    return [v["skip"] for op, v in fake.calls
+            if op == "problemsetQuestionList" and (v.get("filters") or {}) == (filters or {})]
+
+
+def test_user_fetch_joins_catalog_metadata():
+    with FakeLeetCode(make_problems(250), solved={"Problem 3", "Problem 200"}) as fake:
+        client = LeetCodeClient(base_url=fake.url, page_size=100, rate=1000)
+        df = client.get_user_solved_problems("someone")
+        assert sorted(df["title"]) == ["Problem 200", "Problem 3"]
+        row = df[df["title"] == "Problem 3"].iloc[0]
+        assert row["difficulty"] == "easy"
+        assert row["topic_tags"] == "Dynamic Programming,Graph"
+        assert row["status"] == "solved"
+        assert sorted(_skips(fake)) == [0, 100, 200]
+
+        # second user call reuses the catalog and only asks for accepted titles
+        fake.calls.clear()
+        client.get_user_solved_problems("someone")
+        assert _skips(fake) == []
+        assert _skips(fake, {"status": "AC"}) == [0]
+
+
+def test_missing_difficulty_is_blank():
+    problems = make_problems(5)
+    problems[2]["difficulty"] = None
+    with FakeLeetCode(problems, solved={"Problem 2"}) as fake:
+        df = LeetCodeClient(base_url=fake.url, rate=1000).get_user_solved_problems("someone")
+        assert df["difficulty"].tolist() == [""]
+
+
+def test_incremental_sync_resumes_at_offset(tmp_path):
+    path = str(tmp_path / "catalog.json")
+    with FakeLeetCode(make_problems(120)) as fake:
+        client = LeetCodeClient(base_url=fake.url, catalog_path=path, page_size=50, rate=1000)
+        assert client.sync_catalog() == 120
+
+        fake.problems.extend(make_problems(130)[120:])
+        fake.calls.clear()
+        assert client.sync_catalog(force=True) == 10
+        assert _skips(fake) == [120]
+
+    reloaded = ProblemCatalog(path=path)
+    assert len(reloaded.problems) == 130
+    assert reloaded.lookup("Problem 125")["topicTags"] == ["Tree", "Array"]
+    assert not reloaded.needs_refresh()
+
+
+def test_retries_throttled_pages():
+    with FakeLeetCode(make_problems(300)) as fake:
+        client = LeetCodeClient(base_url=fake.url, page_size=100, rate=1000)
+        client.http.backoff = 0.01
+        fake.fail_next(2, status=429)
+        assert client.sync_catalog() == 300
+        assert client.http.retries == 2
+        assert [p["title"] for p in client.catalog.problems[:3]] == ["Problem 0", "Problem 1", "Problem 2"]
+        assert client.catalog.problems[-1]["title"] == "Problem 299"
+
+
+def test_concurrent_user_fetches_are_coalesced():
+    with FakeLeetCode(make_problems(50), solved={"Problem 1"}, latency=0.2) as fake:
+        client = CoalescingLeetCodeClient(base_url=fake.url, rate=1000)
+        client.sync_catalog()
+        fake.calls.clear()
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            frames = list(pool.map(client.get_user_solved_problems, ["someone"] * 4))
+        assert all(list(df["title"]) == ["Problem 1"] for df in frames)
+        assert [op for op, _ in fake.calls].count("userProblemsSolved") == 1
+        assert client.flight.coalesced == 3
+
+        client.get_user_solved_problems("someone")
+        assert client.results.hits == 1
+        assert [op for op, _ in fake.calls].count("userProblemsSolved") == 1
+
+
+def test_distinct_users_are_fetched_concurrently():
+    # the lookup executor is shared by every fetch; it must not cap users at page `concurrency`
+    with FakeLeetCode(make_problems(50), solved={"Problem 1"}, latency=0.3) as fake:
+        client = LeetCodeClient(base_url=fake.url, rate=1000, concurrency=4)
+        client.sync_catalog()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            frames = list(pool.map(client.get_user_solved_problems, [f"user{i}" for i in range(16)]))
+        elapsed = time.perf_counter() - started
+        assert all(list(df["title"]) == ["Problem 1"] for df in frames)
+        # one round trip each, in parallel; four lookups at a time would take four rounds
+        assert elapsed < 3 * fake.latency, elapsed
@@ -0,0 +1,46 @@
+import time
+
+from fake_llm import FakeCompletions
+from llm_client import LLMClient
+
+
+RECS = [{"title": "Two Sum"}, {"title": "3Sum"}]
+WEAK = [("graph", 0.1), ("tree", 0.2)]
+
+
+def _client(fake, **kw):
+    return LLMClient(base_url=fake.url, api_key="test", **kw)
+
+
+def test_reply_is_cached_by_topics_and_titles():
+    with FakeCompletions("Start with arrays.") as fake:
+        llm = _client(fake)
+        assert llm.generate_reply("recommend problems", recommendations=RECS, weak_topics=WEAK) == "Start with arrays."
+        # a differently worded message with the same context reuses the reply
+        assert llm.generate_reply("give me practice", recommendations=RECS, weak_topics=WEAK) == "Start with arrays."
+        assert len(fake.calls) == 1
+        assert llm.generate_reply("recommend problems", recommendations=RECS[:1], weak_topics=WEAK)
+        assert len(fake.calls) == 2
+
+
+def test_slow_completion_hits_the_budget_and_is_not_queued():
+    with FakeCompletions("late", latency=0.6) as fake:
+        llm = _client(fake, timeout=0.1, max_concurrency=1)
+        started = time.monotonic()
+        assert llm.generate_reply("recommend problems", recommendations=RECS) is None
+        assert time.monotonic() - started < 0.5
+        # the only slot is still held by the running completion: skip instead of waiting
+        assert llm.generate_reply("recommend problems", recommendations=RECS[:1]) is None
+        stats = llm.stats()
+        assert stats["timeouts"] == 1 and stats["rejected"] == 1
+    assert LLMClient(api_key="").generate_reply("recommend problems") is None
+
+
+def test_stream_yields_pieces_and_fills_cache():
+    with FakeCompletions("Focus on graphs first, then trees.", token_delay=0.01) as fake:
+        llm = _client(fake)
+        pieces = list(llm.stream_reply("recommend problems", recommendations=RECS, weak_topics=WEAK))
+        assert len(pieces) > 1 and "".join(pieces) == fake.reply
+        assert fake.calls[0]["stream"] is True
+        assert llm.generate_reply("recommend problems", recommendations=RECS, weak_topics=WEAK) == fake.reply
+        assert len(fake.calls) == 1
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from model_registry import ModelRegistry
+from recommender import Recommender
+from synthetic import synthetic_catalog, synthetic_user
+
+
+def test_lsa_engine_scores_against_the_embedding():
+    catalog = synthetic_catalog(3000)
+    sparse = Recommender.from_dataframe(catalog)
+    lsa = Recommender.from_dataframe(catalog, engine="lsa", lsa_dim=64)
+    assert lsa.embedding.shape == (3000, 64) and lsa.embedding.dtype == np.float32
+    assert lsa.engine_label == "lsa-64" and sparse.engine_label == "sparse"
+
+    users = [synthetic_user(catalog, 30, seed=s) for s in range(3)]
+    profile = lsa.user_profile(users[0])
+    assert isinstance(profile, np.ndarray) and profile.shape == (1, 64)
+    assert np.isclose(np.linalg.norm(profile), 1.0, atol=1e-5)
+    dense_top = lsa.recommend(users[0], 10).index
+    assert len(set(dense_top) & set(sparse.recommend(users[0], 10).index)) >= 5
+    # the batch path, with and without precomputed profiles, ranks like `recommend`
+    batch = lsa.recommend_many(users, top_n=10)
+    cached = lsa.recommend_many(users, top_n=10, profiles=[lsa.user_profile(u) for u in users])
+    assert batch[0].index.tolist() == cached[0].index.tolist() == dense_top.tolist()
+
+    grown = lsa.extend(pd.DataFrame({"title": ["Brand New Problem"], "topic_tags": ["Array"]}))
+    assert grown.embedding.shape == (3001, 64) and np.array_equal(grown.embedding[:3000], lsa.embedding)
+    with pytest.raises(ValueError):
+        Recommender(engine="dense")
+
+
+def test_registry_engine_is_per_version(tmp_path):
+    path = tmp_path / "problems.csv"
+    synthetic_catalog(300).to_csv(path, index=False)
+    artifacts = str(tmp_path / "artifacts")
+    registry = ModelRegistry(system_csv=str(path), artifact_dir=artifacts, engine="lsa", lsa_dim=16)
+    first = registry.get()
+    assert registry.status()["engine"] == "lsa-16" and first.feature_version == f"{first.version}-lsa-16"
+    # another worker maps the saved embedding instead of fitting it
+    second = ModelRegistry(system_csv=str(path), artifact_dir=artifacts, engine="lsa", lsa_dim=16).get()
+    assert not second.embedding.flags.writeable and np.array_equal(first.embedding, second.embedding)
+
+    sparse = registry.refresh(engine="sparse")
+    assert sparse.embedding is None and sparse.feature_version == sparse.version == first.version
+    assert registry.status()["engine"] == "sparse" and registry.status()["embedding"] is None
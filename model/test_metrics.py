@@ -0,0 +1,53 @@
+import pandas as pd
+
+from metrics import STAGE_SECONDS, MetricsRegistry, finish_profile, server_timing, stage, start_profile
+from recommender import Recommender
+
+
+def test_render_uses_prometheus_text_format():
+    reg = MetricsRegistry()
+    hist = reg.histogram("t_seconds", "Test latency.", ("stage",), buckets=(0.1, 1.0))
+    hist.observe(0.05, stage="a")
+    hist.observe(0.5, stage="a")
+    reg.counter("t_total", "Test calls.", ("outcome",)).inc(outcome="ok")
+    reg.add_collector(lambda: [("t_info", "Test info.", "gauge", {"version": 'v"1'}, 1)])
+    text = reg.render()
+    assert "# TYPE t_seconds histogram" in text
+    assert 't_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 't_seconds_bucket{stage="a",le="1.0"} 2' in text
+    assert 't_seconds_bucket{stage="a",le="+Inf"} 2' in text
+    assert 't_seconds_count{stage="a"} 2' in text
+    assert 't_total{outcome="ok"} 1' in text
+    assert 't_info{version="v\\"1"} 1' in text
+
+
+def test_profile_collects_stages_only_when_enabled():
+    start_profile(False)
+    with stage("t_off"):
+        pass
+    assert finish_profile() is None
+    assert STAGE_SECONDS.count(stage="t_off") == 1
+
+    start_profile(True)
+    with stage("t_on"):
+        pass
+    with stage("t_on"):
+        pass
+    stages = finish_profile()
+    assert [name for name, _ in stages] == ["t_on", "t_on"]
+    assert server_timing(stages).startswith("t_on;dur=")
+    assert server_timing(stages).count("t_on") == 1
+
+
+def test_recommender_hot_path_is_timed():
+    df = pd.DataFrame({
+        "title": ["Two Sum", "Binary Tree Paths", "Graph Valid Tree"],
+        "difficulty": ["Easy", "Easy", "Medium"],
+        "topic_tags": ["Array,Hash Table", "Tree,Depth-First Search", "Graph,Union Find"],
+        "company": ["", "", ""],
+    })
+    rec = Recommender.from_dataframe(df)
+    start_profile(True)
+    rec.rank(pd.DataFrame({"title": ["Two Sum"], "topic_tags": ["Array"]}), 2)
+    names = [name for name, _ in finish_profile()]
+    assert names == ["profile", "score"]
@@ -0,0 +1,116 @@
+import os
+
+import pandas as pd
+
+from model_registry import ModelRegistry
+
+
+CSV = "id,title,difficulty,topic_tags\n1,Two Sum,Easy,\"Array,Hash Table\"\n2,Add Two Numbers,Medium,\"Linked List,Math\"\n"
+
+
+def _registry(tmp_path):
+    path = tmp_path / "problems.csv"
+    path.write_text(CSV)
+    return ModelRegistry(system_csv=str(path), check_interval=0), path
+
+
+def test_fits_once(tmp_path):
+    registry, _ = _registry(tmp_path)
+    first = registry.get()
+    assert registry.get() is first
+    assert registry.fit_count == 1
+    assert registry.status()["version"] == first.version
+
+
+def test_touch_does_not_refit(tmp_path):
+    registry, path = _registry(tmp_path)
+    first = registry.get()
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000))
+    assert registry.get() is first
+    assert registry.fit_count == 1
+
+
+def test_content_change_refits(tmp_path):
+    registry, path = _registry(tmp_path)
+    first = registry.get()
+    with open(path, "a") as f:
+        f.write("3,Longest Substring Without Repeating Characters,Medium,String\n")
+    second = registry.get()
+    assert second is not first
+    assert second.version != first.version
+    assert second.system_df.shape[0] == 3
+    # the published snapshot is left untouched
+    assert first.system_df.shape[0] == 2
+    # the new row's terms are far past the default drift threshold, so this was a full fit
+    assert registry.fit_count == 2 and registry.ingest_count == 0
+    assert second.feature_version != first.feature_version
+
+
+def test_rewritten_rows_refit(tmp_path):
+    registry, path = _registry(tmp_path)
+    first = registry.get()
+    path.write_text(CSV.replace("Two Sum,Easy", "Three Sum,Medium"))
+    second = registry.get()
+    assert registry.fit_count == 2 and registry.ingest_count == 0
+    assert second.appended_rows == 0 and second.title_norm[0] == "three sum"
+    assert second.feature_version != first.feature_version
+
+
+def test_artifact_is_reused_across_workers(tmp_path):
+    path = tmp_path / "problems.csv"
+    path.write_text(CSV)
+    artifacts = tmp_path / "artifacts"
+    first = ModelRegistry(system_csv=str(path), artifact_dir=str(artifacts)).get()
+    second = ModelRegistry(system_csv=str(path), artifact_dir=str(artifacts)).get()
+    assert second.artifact_path == first.artifact_path
+    assert not second.tfidf_matrix.data.flags.writeable  # memory-mapped, not refitted
+    assert (first.tfidf_matrix != second.tfidf_matrix).nnz == 0
+    query = ["hash table array"]
+    assert (first.vectorizer.transform(query) != second.vectorizer.transform(query)).nnz == 0
+
+
+def test_append_is_ingested_without_refit(tmp_path):
+    path = tmp_path / "problems.csv"
+    path.write_text(CSV)
+    registry = ModelRegistry(system_csv=str(path), check_interval=0, drift_threshold=1.0)
+    first = registry.get()
+    first.append_new_problems(pd.DataFrame({"title": ["Add Two Numbers", "Two Sum II"], "topic_tags": ["Math", "Array,Two Pointers"]}))
+    second = registry.sync()
+
+    assert registry.fit_count == 1 and registry.ingest_count == 1
+    assert second.system_df.shape[0] == 3 and first.system_df.shape[0] == 2
+    assert second.vectorizer is first.vectorizer
+    assert second.feature_version == first.feature_version and second.version != first.version
+    assert second.title_norm[2] == "two sum ii" and second.tfidf_matrix.shape[0] == 3
+    # the ingested row has the CSV's column order and is recommendable
+    assert second.system_df.loc[2, "topic_tags"] == "Array,Two Pointers"
+    recs = second.recommend(pd.DataFrame({"title": ["Two Sum"], "topic_tags": ["Array"]}), top_n=1)
+    assert recs["title"].tolist() == ["Two Sum II"]
+    assert (second.tfidf_matrix[:2] != first.tfidf_matrix).nnz == 0
+
+
+def test_vocab_drift_triggers_refit(tmp_path):
+    path = tmp_path / "problems.csv"
+    path.write_text(CSV)
+    registry = ModelRegistry(system_csv=str(path), check_interval=0, drift_threshold=0.5)
+    first = registry.get()
+    with open(path, "a") as f:
+        f.write("3,Trapping Rain Water,Hard,\"Stack,Monotonic Stack\"\n")
+    second = registry.get()
+    assert registry.fit_count == 2 and registry.ingest_count == 0
+    assert second.feature_version != first.feature_version
+    assert "trapping" in second.vectorizer.vocabulary_
+
+
+def test_scheduled_refit_after_ingest(tmp_path):
+    path = tmp_path / "problems.csv"
+    path.write_text(CSV)
+    registry = ModelRegistry(system_csv=str(path), check_interval=0, drift_threshold=1.0, refit_interval=60)
+    registry.get()
+    with open(path, "a") as f:
+        f.write("3,Two Sum II,Easy,Array\n")
+    assert registry.get().appended_rows == 1 and registry.fit_count == 1
+    registry._last_full_fit -= 61
+    refitted = registry.get()
+    assert registry.fit_count == 2 and refitted.appended_rows == 0
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from model_registry import ModelRegistry
+from neighbor_graph import load_graph, parse_similar_titles
+from recommender import Recommender
+
+
+CSV = (
+    "id,title,difficulty,related_topics,similar_questions\n"
+    "1,Two Sum,Easy,\"Array,Hash Table\",\"[3Sum, /problems/3sum/, Medium], [Premium Only, /problems/premium-only/, Hard]\"\n"
+    "2,3Sum,Medium,\"Array,Two Pointers\",\n"
+    "3,Two Sum II,Medium,\"Array,Two Pointers\",\"[Two Sum, /problems/two-sum/, Easy]\"\n"
+    "4,Word Ladder,Hard,\"String,Breadth-First Search\",\n"
+    "5,Word Ladder II,Hard,\"String,Backtracking\",\n"
+)
+
+
+def test_parse_similar_titles():
+    cell = "[Two Sum II - Input array is sorted, /problems/two-sum-ii/, Easy], [Pow(x, n), /problems/powx-n/, Medium]"
+    assert parse_similar_titles(cell) == ["Two Sum II - Input array is sorted", "Pow(x, n)"]
+    assert parse_similar_titles(float("nan")) == []
+
+
+def test_graph_merges_links_and_cosine(tmp_path):
+    csv = tmp_path / "problems.csv"
+    csv.write_text(CSV)
+    rec = ModelRegistry(system_csv=str(csv), artifact_dir=str(tmp_path / "artifacts")).get()
+    graph = rec.neighbor_graph(k=2)
+
+    # explicit links are symmetric and outrank textual neighbours; unknown titles are ignored
+    assert graph[0, 1] >= 1 and graph[1, 0] >= 1 and graph[2, 0] > 1
+    assert graph[3, 4] > 0 and graph[3, 4] < 1
+    assert all(graph[i, i] == 0 for i in range(5))
+    # persisted for other workers, memory-mapped on load
+    assert (load_graph(rec.neighbors_path) != graph).nnz == 0
+
+
+def test_recommend_similar_reads_only_neighbours():
+    rec = Recommender.from_dataframe(pd.DataFrame({
+        "title": ["Two Sum", "Two Sum II", "Two Sum III", "Word Ladder", "Word Ladder II"],
+        "topic_tags": ["Array", "Array", "Array", "String", "String"],
+    }))
+    recs = rec.recommend_similar(pd.DataFrame({"title": ["two sum"]}), top_n=5)
+    assert recs["title"].tolist() == ["Two Sum II", "Two Sum III"]
+    assert np.all(np.diff(recs["score"].to_numpy()) <= 0)
+
+    recs = rec.recommend_similar(pd.DataFrame({"title": ["Two Sum"]}), top_n=5, exclude_titles={"two sum ii"})
+    assert recs["title"].tolist() == ["Two Sum III"]
+    assert rec.recommend_similar(pd.DataFrame({"title": ["Unknown"]})).empty
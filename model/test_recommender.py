@@ -12,3 +12,122 @@ def main():
 
 if __name__ == '__main__':
     main()
+
+
+# pytest checks against the pre-optimization implementations kept in benchmark.py
+
+import numpy as np
+import pandas as pd
+
+from benchmark import legacy_analyze_weak_topics, legacy_recommend
+from synthetic import synthetic_catalog, synthetic_user
+
+
+def _reference_top_k(scores, k, exclude):
+    """Full argsort plus a Python loop skipping excluded rows (stable, so ties keep row order)."""
+    picked = []
+    for i in np.argsort(-scores, kind="stable"):
+        if len(picked) >= k:
+            break
+        if exclude is None or not exclude[i]:
+            picked.append(i)
+    return picked
+
+
+def test_top_k_matches_a_full_sort():
+    rng = np.random.default_rng(3)
+    for n in (1, 7, 50, 400):
+        # few distinct values, so most of the ranking is decided by ties
+        scores = rng.integers(0, 4, size=n).astype(float)
+        for exclude in (None, rng.random(n) < 0.3, np.ones(n, dtype=bool)):
+            available = n if exclude is None else int((~exclude).sum())
+            for k in (0, 1, 5, available, n + 10):
+                got = Recommender.top_k(scores, k, exclude=exclude).tolist()
+                assert got == _reference_top_k(scores, k, exclude)
+                assert len(got) == min(k, available)
+
+
+def test_recommend_matches_the_legacy_loop_and_masks_titles():
+    catalog = synthetic_catalog(800)
+    # a duplicated title: both rows are excluded once the user has it
+    catalog.loc[10, "title"] = catalog.loc[11, "title"]
+    rec = Recommender.from_dataframe(catalog)
+    user = synthetic_user(rec.system_df, 40).drop(columns="status")
+    user.loc[0, "title"] = "  " + catalog.loc[11, "title"].upper()
+    mask = rec.exclusion_mask({catalog.loc[11, "title"].lower(), "not in the catalog"})
+    assert np.flatnonzero(mask).tolist() == [10, 11]
+
+    # the legacy loop broke ties with an unstable reversed argsort, so compare scores
+    for top_n in (1, 10, 790):
+        new = rec.recommend(user, top_n)
+        old = legacy_recommend(rec, user.assign(title=user["title"].str.strip()), top_n)
+        assert np.allclose(new["score"].to_numpy(), old["score"].to_numpy())
+        assert not {10, 11} & set(new.index)
+    # more than the remaining candidates: every row the user does not have, once
+    everything = rec.recommend(user, 10_000)
+    assert len(everything) == len(set(everything.index)) == 800 - len(rec.user_context(user).rows)
+
+
+def test_weak_topics_match_the_per_topic_loop():
+    rec = Recommender.from_dataframe(synthetic_catalog(600))
+    labelled = synthetic_user(rec.system_df, 30, attempted=30)
+    unlabelled = labelled.drop(columns="status")
+    # one row per topic with a single status: many topics tie at 0.0 and at 1.0
+    tied = pd.DataFrame({"title": ["a", "b", "c"], "topic_tags": [rec.topic_names[2], rec.topic_names[0], rec.topic_names[1]],
+                         "status": ["solved", "failed", "solved"]})
+    for user in (labelled, unlabelled, tied, pd.DataFrame({"title": [], "topic_tags": []})):
+        for top_k in (1, 5, len(rec.topic_names) + 3):
+            expected = [(t, float(s)) for t, s in legacy_analyze_weak_topics(rec, user.copy(), top_k)]
+            assert rec.analyze_weak_topics(user, top_k) == expected
+
+
+def test_recommend_many_matches_recommend_per_user():
+    rec = Recommender.from_dataframe(synthetic_catalog(1500))
+    users = [synthetic_user(rec.system_df, n, seed=n) for n in (5, 40, 120)]
+    users.append(pd.DataFrame())  # no rows: catalog-order fallback
+    users.append(pd.DataFrame({"title": ["Not A Catalog Problem"], "topic_tags": ["Graph"]}))  # unknown titles
+    singles = [rec.recommend(u, 8) for u in users]
+
+    # one chunk for the whole batch, and one user per chunk
+    for max_chunk_bytes in (64 << 20, 1):
+        batch = rec.recommend_many(users, top_n=8, max_chunk_bytes=max_chunk_bytes)
+        for one, many in zip(singles, batch):
+            assert one.index.tolist() == many.index.tolist()
+            if "score" in one.columns:
+                assert np.allclose(one["score"].to_numpy(), many["score"].to_numpy())
+    assert singles[3].index.tolist() == list(range(8)) and "score" not in singles[3].columns
+    assert len(singles[4]) == 8
+
+    profiles = [rec.user_profile(u) for u in users]
+    cached = rec.recommend_many(users, top_n=8, profiles=profiles)
+    assert [r.index.tolist() for r in cached] == [r.index.tolist() for r in singles]
+    assert rec.recommend_many([pd.DataFrame()], top_n=3)[0].index.tolist() == [0, 1, 2]
+
+    # every score tied: both paths return the first rows in catalog order
+    flat = Recommender.from_dataframe(pd.DataFrame({"title": [f"Same {i}" for i in range(50)], "topic_tags": "Array"}))
+    user = pd.DataFrame({"title": ["Same 3"], "topic_tags": ["Array"]})
+    expected = [0, 1, 2, 4, 5]
+    assert flat.recommend(user, 5).index.tolist() == expected
+    assert flat.recommend_many([user, user], top_n=5, max_chunk_bytes=1)[1].index.tolist() == expected
+
+
+def test_recommend_many_without_room_returns_empty_frames():
+    rec = Recommender.from_dataframe(synthetic_catalog(200))
+    users = [synthetic_user(rec.system_df, 10, seed=1), pd.DataFrame()]
+    for top_n in (0, -3):
+        batch = rec.recommend_many(users, top_n=top_n)
+        assert [len(r) for r in batch] == [0, 0]
+        assert list(batch[0].columns) == list(rec.recommend(users[0], top_n).columns)
+
+
+def test_batch_route_rejects_bad_top_n(tmp_path, monkeypatch):
+    monkeypatch.setenv("HISTORY_DB", str(tmp_path / "history.db"))
+    monkeypatch.setenv("MODEL_ARTIFACT_DIR", str(tmp_path / "artifacts"))
+    import app
+
+    client = app.app.test_client()
+    for top_n in (0, -1, "x", 2.5, True):
+        response = client.post("/recommend/batch", json={"users": [{"id": 1, "solved": ["Two Sum"]}], "top_n": top_n})
+        assert response.status_code == 400 and "top_n" in response.get_json()["error"]
+    ok = client.post("/recommend/batch", json={"users": [{"id": 1, "solved": ["Two Sum"]}], "top_n": "3"})
+    assert ok.status_code == 200 and len(ok.get_json()["results"][0]["recommended"]) == 3
@@ -0,0 +1,77 @@
+import os
+import runpy
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from recommender import Recommender
+from rf_models import ForestCache
+
+
+def _catalog(n=40):
+    return pd.DataFrame({
+        "title": [f"Problem {i}" for i in range(n)],
+        "difficulty": ["Easy", "Medium", "Hard", "Medium"] * (n // 4),
+        "topic_tags": [["Array", "Graph", "Tree", "String"][i % 4] for i in range(n)],
+    })
+
+
+def _user(titles):
+    return pd.DataFrame({"title": titles, "status": ["solved" if i % 3 else "failed" for i in range(len(titles))]})
+
+
+def test_trains_in_background_and_reuses_model():
+    rec = Recommender.from_dataframe(_catalog())
+    forests = ForestCache(executor=ThreadPoolExecutor(max_workers=1))
+    user = _user([f"Problem {i}" for i in range(20)])
+
+    first = forests.get("alice", rec, user)
+    forests.wait(30)
+    clf = forests.get("alice", rec, user)
+    assert first is None and clf is not None
+    assert forests.get("alice", rec, user) is clf
+    assert forests.stats()["trained"] == 1
+
+    recs = rec.recommend_with_rf(user, top_n=5, model=clf)
+    assert len(recs) == 5
+    assert not set(recs["title"]) & set(user["title"])
+
+    # a new solve retrains, serving the previous model meanwhile
+    more = _user([f"Problem {i}" for i in range(21)])
+    assert forests.get("alice", rec, more) is clf
+    forests.wait(30)
+    assert forests.get("alice", rec, more) is not clf
+    assert forests.stats()["trained"] == 2
+
+
+def test_single_class_labels_fall_back():
+    rec = Recommender.from_dataframe(_catalog())
+    user = pd.DataFrame({"title": [f"Problem {i}" for i in range(20)], "status": "solved"})
+    assert rec.recommend_with_rf(user).empty
+    assert ForestCache(executor=ThreadPoolExecutor(max_workers=1)).get("bob", rec, user) is None
+
+
+def test_trains_in_a_spawned_worker_process():
+    rec = Recommender.from_dataframe(_catalog())
+    forests = ForestCache(max_workers=1)
+    user = _user([f"Problem {i}" for i in range(20)])
+    try:
+        assert forests.get("carol", rec, user) is None
+        assert forests._pool()._mp_context.get_start_method() == "spawn"
+        forests.wait(120)
+        clf = forests.get("carol", rec, user)
+        assert clf is not None and forests.stats()["failed"] == 0
+        assert len(rec.recommend_with_rf(user, top_n=5, model=clf)) == 5
+    finally:
+        forests._pool().shutdown()
+
+
+def test_spawned_worker_skips_the_service_startup(tmp_path, monkeypatch):
+    # a spawned child re-runs the launching script like this before taking a job
+    monkeypatch.setenv("HISTORY_DB", str(tmp_path / "history.db"))
+    monkeypatch.setenv("MODEL_ARTIFACT_DIR", str(tmp_path / "artifacts"))
+    app_path = os.path.join(os.path.dirname(__file__), "app.py")
+    namespace = runpy.run_path(app_path, run_name="__mp_main__")
+    assert namespace["IS_SERVICE"] is False
+    assert not {"registry", "history", "cursors", "pool", "forests"} & set(namespace)
+    assert not os.listdir(tmp_path)
@@ -0,0 +1,38 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from recommender import Recommender
+from serialization import frame_records, problem_records
+
+
+def _catalog():
+    return pd.DataFrame({
+        "title": ["Two Sum", "Word Ladder", "Course Schedule", "Untagged"],
+        "difficulty": ["Easy", "Hard", "Medium", None],
+        "topic_tags": ["Array, Hash Table", "Breadth-First Search,String", "Graph", np.nan],
+    })
+
+
+def test_records_use_precomputed_links():
+    rec = Recommender.from_dataframe(_catalog())
+    records = problem_records(rec, [1, 3], np.array([0.5, 0.25], dtype=np.float32))
+
+    assert [r["title"] for r in records] == ["Word Ladder", "Untagged"]
+    assert records[0]["gfg_link"] == rec.gfg_link_for_topic("Breadth-First Search")
+    assert records[0]["striver_link"] == rec.striver_search_link("Breadth-First Search")
+    assert records[0]["score"] == 0.5 and type(records[0]["score"]) is float
+    # missing values come out blank rather than NaN, so the payload is valid JSON
+    assert records[1]["difficulty"] == "" and records[1]["gfg_link"] == "" and records[1]["company"] == ""
+    json.dumps(records, allow_nan=False)
+
+
+def test_frame_records_follow_result_order():
+    rec = Recommender.from_dataframe(_catalog())
+    recs = rec.recommend(pd.DataFrame({"title": ["Two Sum"], "topic_tags": ["Array"]}), top_n=3)
+
+    records = frame_records(rec, recs)
+    assert [r["title"] for r in records] == recs["title"].tolist()
+    assert [r["score"] for r in records] == recs["score"].tolist()
+    assert frame_records(rec, rec.system_df.head(2))[0]["score"] == 0.0
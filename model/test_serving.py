@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+import requests
+from flask import Flask
+
+from metrics import finish_profile, stage, start_profile
+from serving import PooledWSGIServer, StagePool
+
+
+def test_stages_overlap_and_report_into_the_request_profile():
+    pool = StagePool(io_workers=2, cpu_workers=1)
+    gate = threading.Event()
+
+    def fetch():
+        with stage("fetch"):
+            gate.wait(5)
+            return "user"
+
+    start_profile(True)
+    fetching = pool.io(fetch)
+    # the request thread keeps working while the fetch is blocked
+    scoring = pool.cpu(lambda: 6 * 7)
+    assert scoring.result(5) == 42 and not fetching.done()
+    gate.set()
+    assert fetching.result(5) == "user"
+    assert [name for name, _ in finish_profile()] == ["fetch"]
+    assert pool.stats()["submitted"] == {"io": 1, "cpu": 1}
+
+    inline = StagePool(overlap=False)
+    assert inline.cpu(sum, [1, 2]).result() == 3
+    with pytest.raises(ZeroDivisionError):
+        inline.io(lambda: 1 / 0).result()
+    pool.shutdown()
+    inline.shutdown()
+
+
+def test_pooled_server_serves_requests():
+    app = Flask(__name__)
+    app.add_url_rule("/ping", "ping", lambda: "pong")
+    server = PooledWSGIServer("127.0.0.1", 0, app, threads=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/ping"
+        assert [requests.get(url, timeout=5).text for _ in range(5)] == ["pong"] * 5
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,31 @@
+from fake_leetcode import FakeLeetCode
+from leetcode_client import LeetCodeClient
+from neighbor_graph import parse_similar_titles
+from recommender import Recommender
+from synthetic import CSV_COLUMNS, leetcode_problems, synthetic_catalog, synthetic_user, write_catalog
+
+
+def test_full_catalog_has_the_csv_schema(tmp_path):
+    catalog = synthetic_catalog(300, full=True)
+    assert list(catalog.columns) == CSV_COLUMNS + ["topic_tags"]
+    assert catalog["title"].is_unique
+    assert synthetic_catalog(300, full=True).equals(catalog)
+    titles = set(catalog["title"])
+    assert all(t in titles for v in catalog["similar_questions"] for t in parse_similar_titles(v))
+
+    rec = Recommender(system_csv=write_catalog(str(tmp_path / "catalog.csv"), catalog))
+    rec.fit()
+    assert rec.system_df.shape[0] == 300 and rec.neighbor_graph().nnz > 0
+
+
+def test_user_history_round_trips_through_fake_upstream():
+    catalog = synthetic_catalog(250, full=True)
+    user = synthetic_user(catalog, 20, attempted=5)
+    assert (user["status"] == "solved").sum() == 20 and (user["status"] == "attempted").sum() == 5
+
+    solved = set(user.loc[user["status"] == "solved", "title"])
+    with FakeLeetCode(leetcode_problems(catalog), solved=solved) as fake:
+        df = LeetCodeClient(base_url=fake.url, rate=1000).get_user_solved_problems("bench")
+    assert set(df["title"]) == solved
+    expected = dict(zip(catalog["title"], catalog["topic_tags"]))
+    assert all(expected[t] == tags for t, tags in zip(df["title"], df["topic_tags"]))
@@ -0,0 +1,45 @@
+import io
+
+import pytest
+
+from recommender import Recommender
+from synthetic import synthetic_catalog
+from upload_parser import USER_COLUMNS, UploadTooLarge, read_csv_stream
+
+
+UPLOAD = (
+    "﻿Title , Topic_Tags,Difficulty,Status,notes,likes\n"
+    "Two Sum,\"Array,Hash Table\",Easy,solved,first one,12\n"
+    "LRU Cache,,Medium,attempted,,7\n"
+).encode("utf-8")
+
+
+def test_projects_recognized_columns_as_text():
+    df = read_csv_stream(io.BytesIO(UPLOAD))
+    # BOM and header spacing/case are normalized; unknown columns are never materialized
+    assert list(df.columns) == ["title", "topic_tags", "difficulty", "status"]
+    assert df["topic_tags"].tolist() == ["Array,Hash Table", ""]
+    assert df["status"].tolist() == ["solved", "attempted"]
+    assert list(read_csv_stream(io.BytesIO(UPLOAD), columns=None).columns) == \
+        ["Title", "Topic_Tags", "Difficulty", "Status", "notes", "likes"]
+
+    rec = Recommender.from_dataframe(synthetic_catalog(500))
+    weak = rec.analyze_weak_topics(df, top_k=3)
+    assert len(weak) == 3
+    assert not rec.recommend(df, 5).empty
+
+
+def test_caps_stop_oversized_uploads():
+    with pytest.raises(UploadTooLarge, match="rows"):
+        read_csv_stream(io.BytesIO(UPLOAD), max_rows=1)
+    with pytest.raises(UploadTooLarge, match="bytes"):
+        read_csv_stream(io.BytesIO(UPLOAD * 200), max_bytes=4096, chunk_size=1024)
+    assert len(read_csv_stream(io.BytesIO(UPLOAD), columns=USER_COLUMNS, max_bytes=len(UPLOAD), max_rows=2)) == 2
+
+
+def test_headers_differing_only_in_case_are_rejected():
+    body = b"Title,title,status\nTwo Sum,Two Sum,solved\n"
+    with pytest.raises(ValueError, match="'title'"):
+        read_csv_stream(io.BytesIO(body))
+    with pytest.raises(ValueError, match="Ambiguous"):
+        read_csv_stream(io.BytesIO(b"status ,status\nsolved,solved\n"), columns=None)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from profile_cache import ProfileCache
+from recommender import Recommender
+from synthetic import synthetic_catalog, synthetic_user
+
+
+def test_context_gives_the_same_answers_as_raw_frames():
+    rec = Recommender.from_dataframe(synthetic_catalog(2000))
+    user = synthetic_user(rec.system_df, 40, attempted=15)
+    user.loc[0, "title"] = "  " + user.loc[0, "title"].upper() + " "
+    ctx = rec.user_context(user)
+    assert len(ctx.rows) == 55 and ctx.solved.sum() == 40
+    assert rec.user_context(ctx) is ctx
+
+    assert rec.recommend(ctx, 10).index.tolist() == rec.recommend(user, 10).index.tolist()
+    assert rec.analyze_weak_topics(ctx, 5) == rec.analyze_weak_topics(user, 5)
+    ok, info = rec.rf_training_data(ctx)
+    ok_raw, info_raw = rec.rf_training_data(user)
+    assert ok and ok_raw and np.array_equal(info["rows"], info_raw["rows"])
+    ids, _ = rec.rank(ctx, 20, exclude_titles={rec.title_norm[0]})
+    assert 0 not in ids and not set(ids) & set(ctx.rows)
+
+    # a context from another snapshot is rebuilt against this one
+    other = Recommender.from_dataframe(synthetic_catalog(2000))
+    assert other.user_context(ctx).recommender is other
+    empty = rec.user_context(None)
+    assert empty.empty and empty.profile is None and len(empty.rows) == 0
+
+
+def test_profile_cache_hands_vectors_to_the_context():
+    rec = Recommender.from_dataframe(synthetic_catalog(500))
+    user = pd.DataFrame({"title": ["Two Sum"], "topic_tags": ["Array"]})
+    cache = ProfileCache()
+    first = cache.get("alice", rec.user_context(user), rec)
+    ctx = rec.user_context(user)
+    assert cache.fingerprint(ctx) == cache.fingerprint(user)
+    assert cache.get("alice", ctx, rec) is first and ctx.profile is first
+
+
+def test_sample_others_skips_excluded_rows():
+    rec = Recommender.from_dataframe(synthetic_catalog(2000, full=True))
+    ctx = rec.user_context(synthetic_user(rec.system_df, 300))
+    extra = set(rec.title_norm[:50])
+    rows = rec.sample_others(ctx, 20, exclude_titles=extra, seed=7)
+    assert len(rows) == len(set(rows.tolist())) == 20
+    assert not set(rows.tolist()) & (set(ctx.rows.tolist()) | set(range(50)))
+    assert rec.sample_others(ctx, 20, exclude_titles=extra, seed=7).tolist() == rows.tolist()
+
+    filters = {"difficulty": ["hard"]}
+    hard = rec.sample_others(ctx, 20, filters=filters, seed=1)
+    assert set(hard.tolist()) <= set(rec.candidate_rows(filters).tolist())
+
+    # all but three rows excluded: the exact fallback returns exactly those three
+    left = {0, 1, 2}
+    everything_else = set(rec.title_norm[3:])
+    assert sorted(rec.sample_others(None, 20, exclude_titles=everything_else).tolist()) == sorted(left)
+    assert len(rec.sample_others(None, 20, exclude_titles=set(rec.title_norm))) == 0
@@ -0,0 +1,69 @@
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from artifact_store import load_arrays, read_meta, write_artifact
+
+
+# Bump when the on-disk layout changes so old artifacts are rebuilt instead of misread
+FORMAT_VERSION = 1
+ARRAYS = ("idf", "data", "indices", "indptr")
+
+
+def artifact_path(root: str, digest: str) -> str:
+    """Directory holding the artifact for the dataset with content hash `digest`."""
+    return os.path.join(root, f"tfidf-v{FORMAT_VERSION}-{digest[:16]}")
+
+
+def save_artifact(path: str, vectorizer: TfidfVectorizer, tfidf_matrix) -> str:
+    """Write a fitted vectorizer and its CSR matrix to `path` (see `artifact_store.write_artifact`).
+
+    Layout: `meta.json` (vectorizer params, vocabulary, shape) plus one raw `.npy` file per
+    array (`idf`, and the CSR `data`/`indices`/`indptr`).
+    """
+    if os.path.isdir(path):
+        return path
+    matrix = csr_matrix(tfidf_matrix)
+    meta = {
+        "shape": [int(matrix.shape[0]), int(matrix.shape[1])],
+        "params": {
+            "max_features": vectorizer.max_features,
+            "stop_words": vectorizer.stop_words,
+        },
+        "vocabulary": {term: int(i) for term, i in vectorizer.vocabulary_.items()},
+    }
+    arrays = {
+        "idf": np.asarray(vectorizer.idf_, dtype=np.float64),
+        "data": matrix.data.astype(np.float64, copy=False),
+        "indices": matrix.indices.astype(np.int32, copy=False),
+        "indptr": matrix.indptr.astype(np.int64, copy=False),
+    }
+    return write_artifact(path, arrays, meta, FORMAT_VERSION)
+
+
+def load_artifact(path: str) -> Optional[Tuple[TfidfVectorizer, csr_matrix, dict]]:
+    """Load an artifact written by `save_artifact`, or return None if it is missing/incompatible.
+
+    The CSR arrays are memory-mapped, so every worker shares one copy of the matrix.
+    """
+    meta = read_meta(path, FORMAT_VERSION)
+    if meta is None:
+        return None
+
+    arrays = load_arrays(path, ARRAYS)
+    params = meta["params"]
+    vectorizer = TfidfVectorizer(
+        max_features=params["max_features"],
+        stop_words=params["stop_words"],
+        vocabulary=meta["vocabulary"],
+    )
+    vectorizer.idf_ = np.asarray(arrays["idf"])
+    tfidf_matrix = csr_matrix(
+        (arrays["data"], arrays["indices"], arrays["indptr"]),
+        shape=tuple(meta["shape"]),
+        copy=False,
+    )
+    return vectorizer, tfidf_matrix, meta
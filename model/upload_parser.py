@@ -0,0 +1,80 @@
+"""Streaming, column-projected parsing of user-uploaded CSVs.
+
+`read_csv_stream` hands the upload's byte stream straight to pandas' C parser, which pulls it in
+buffer-sized blocks and decodes as it goes, so the raw upload is never held as one `bytes` or
+`str`. Only the columns the caller recognizes are materialized, every value is kept as text
+(no type inference, blanks as ""), and byte/row caps stop oversized uploads early:
+
+- MAX_UPLOAD_BYTES: bytes read from the stream (default 16 MiB).
+- MAX_UPLOAD_ROWS: data rows (default 100,000).
+"""
+import io
+import os
+from typing import Iterable, Optional
+
+import pandas as pd
+
+
+# Columns of a user history the recommender reads (title/topics/difficulty + a solved indicator)
+USER_COLUMNS = ("title", "topic_tags", "difficulty", "status", "solved", "is_solved", "result")
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 16 << 20))
+MAX_UPLOAD_ROWS = int(os.environ.get("MAX_UPLOAD_ROWS", 100_000))
+
+
+class UploadTooLarge(ValueError):
+    """The upload exceeds the byte or row cap."""
+
+
+class _CappedStream(io.RawIOBase):
+    """Read-through wrapper that raises `UploadTooLarge` once more than `limit` bytes were read."""
+
+    def __init__(self, stream, limit: int):
+        self.stream = stream
+        self.limit = limit
+        self.seen = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self.stream.read(len(buffer))
+        n = len(data)
+        self.seen += n
+        if self.seen > self.limit:
+            raise UploadTooLarge(f"Upload is larger than {self.limit} bytes")
+        buffer[:n] = data
+        return n
+
+
+def read_csv_stream(stream, columns: Optional[Iterable[str]] = USER_COLUMNS, max_bytes: Optional[int] = None,
+                    max_rows: Optional[int] = None, chunk_size: int = 1 << 16) -> pd.DataFrame:
+    """Parse a CSV from a binary `stream`, keeping only `columns` (all when None).
+
+    Header names are matched case-insensitively and ignoring surrounding spaces, and renamed to
+    the spelling in `columns`. Raises `UploadTooLarge` past the caps, `ValueError` when two
+    headers normalize to the same name (e.g. "Title" and "title"), and pandas' parser errors
+    for malformed input.
+    """
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    max_rows = MAX_UPLOAD_ROWS if max_rows is None else max_rows
+    canonical = None if columns is None else {c.strip().lower(): c for c in columns}
+    reader = io.BufferedReader(_CappedStream(stream, max_bytes), buffer_size=chunk_size)
+    df = pd.read_csv(
+        reader,
+        usecols=None if canonical is None else (lambda c: str(c).strip().lower() in canonical),
+        dtype=str,
+        na_filter=False,
+        encoding="utf-8-sig",
+        # one row past the cap is enough to know the upload is too long
+        nrows=max_rows + 1,
+    )
+    if len(df) > max_rows:
+        raise UploadTooLarge(f"Upload has more than {max_rows} rows")
+    if canonical is not None:
+        df.columns = [canonical.get(str(c).strip().lower(), c) for c in df.columns]
+    else:
+        df.columns = [str(c).strip() for c in df.columns]
+    duplicated = df.columns[df.columns.duplicated()].unique().tolist()
+    if duplicated:
+        raise ValueError(f"Ambiguous CSV header: more than one column named {', '.join(map(repr, duplicated))}")
+    return df
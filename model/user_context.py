@@ -0,0 +1,110 @@
+"""Per-request analysis of one user's rows, shared by every `Recommender` method.
+
+Each method used to take the raw `user_df` and re-derive the same things from it: normalized
+titles, the catalog rows they match, the solved labels, topic counts and the TF-IDF query.
+A `UserContext` derives them once per request:
+
+    ctx = recommender.user_context(user_df, profile=cached_vector)
+    recs = recommender.recommend(ctx, top_n=8)
+    weak = recommender.analyze_weak_topics(ctx, top_k=3)
+
+Methods still accept a DataFrame (and build a context themselves). The query vector and topic
+counts are computed on first use, so a request only pays for what its methods read.
+"""
+import io
+from functools import cached_property
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+SOLVED_COLUMNS = ("status", "solved", "is_solved", "result")
+SOLVED_VALUES = ["1", "true", "t", "yes", "solved"]
+
+
+def as_frame(user_df) -> pd.DataFrame:
+    """Coerce uploaded CSV text or None into a DataFrame (empty when it cannot be parsed)."""
+    if isinstance(user_df, pd.DataFrame):
+        return user_df
+    try:
+        if isinstance(user_df, str):
+            return pd.read_csv(io.StringIO(user_df))
+    except Exception:
+        pass
+    return pd.DataFrame()
+
+
+class UserContext:
+    """One user's rows resolved against one fitted `Recommender` snapshot.
+
+    - `title_norm`: lowercased/stripped title per user row ("" without a title column);
+    - `titles`: the set of those titles, and `rows`: sorted catalog row ids matching them;
+    - `solved`: per-row solved flags from the first of `SOLVED_COLUMNS` present (None if none);
+    - `profile`: TF-IDF query vector (None without rows), `topic_counts`: per-topic
+      (attempted, solved) row counts - both lazy.
+    """
+
+    def __init__(self, recommender, user_df, profile=None):
+        self.recommender = recommender
+        self.user_df = as_frame(user_df)
+        df = self.user_df
+        n = len(df)
+        if "title" in df.columns:
+            self.title_norm = df["title"].astype(str).str.lower().str.strip().to_numpy(dtype=object)
+            self.titles = set(self.title_norm)
+        else:
+            self.title_norm = np.full(n, "", dtype=object)
+            self.titles = set()
+        index = recommender.title_index
+        hits = [index[t] for t in self.titles if t in index]
+        self.rows = np.unique(np.concatenate(hits)) if hits else np.zeros(0, dtype=np.int64)
+        self.solved_column = next((c for c in SOLVED_COLUMNS if c in df.columns), None)
+        self.solved = None
+        if self.solved_column is not None:
+            self.solved = df[self.solved_column].astype(str).str.lower().isin(SOLVED_VALUES).to_numpy()
+        if profile is not None:
+            self.set_profile(profile)
+
+    @property
+    def empty(self) -> bool:
+        return self.user_df.empty
+
+    @cached_property
+    def profile(self):
+        return self.recommender.user_profile(self.user_df)
+
+    def set_profile(self, profile):
+        """Adopt a query vector built elsewhere for these rows (e.g. `ProfileCache`), unless one is set."""
+        return self.__dict__.setdefault("profile", profile)
+
+    @cached_property
+    def topic_counts(self) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """(rows per catalog topic, solved rows per catalog topic or None when unlabelled)."""
+        df = self.user_df
+        tags = df["topic_tags"].fillna("") if "topic_tags" in df.columns else pd.Series([""] * len(df))
+        incidence = self.recommender.topic_incidence(tags)
+        attempted = np.asarray(incidence.T @ np.ones(incidence.shape[0])).ravel()
+        if self.solved is None:
+            return attempted, None
+        return attempted, np.asarray(incidence.T @ self.solved.astype(float)).ravel()
+
+    def labelled_rows(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(catalog row ids, 0/1 labels): one entry per matched (catalog row, user row) pair."""
+        index = self.recommender.title_index
+        rows, labels = [], []
+        for title, label in zip(self.title_norm, self.solved):
+            matched = index.get(title)
+            if matched is not None:
+                rows.extend(matched)
+                labels.extend([int(label)] * len(matched))
+        return np.asarray(rows), np.asarray(labels)
+
+    def exclusion_mask(self, extra_titles: Iterable[str] = ()) -> np.ndarray:
+        """Catalog rows the user already has, plus rows titled as in `extra_titles`."""
+        mask = np.zeros(len(self.recommender.title_norm), dtype=bool)
+        mask[self.rows] = True
+        extra = set(extra_titles) - self.titles
+        if extra:
+            mask |= self.recommender.exclusion_mask(extra)
+        return mask